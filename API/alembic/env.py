@@ -10,8 +10,12 @@ sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), '..'
 
 from app.core.database import Base
 from app.models.device import Device
+from app.models.group import DeviceGroup
 from app.models.ping import StatusPing
 from app.models.status import DeviceStatus
+from app.models.transition import StatusTransition
+from app.models.archive import ArchivedMonth
+from app.models.webhook import Webhook
 from app.config import get_settings
 
 settings = get_settings()
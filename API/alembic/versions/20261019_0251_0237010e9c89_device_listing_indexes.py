@@ -0,0 +1,36 @@
+"""device listing indexes
+
+Supports keyset pagination and name prefix search on device listings.
+
+Revision ID: 0237010e9c89
+Revises: 3de14ed29496
+Create Date: 2026-10-19 02:51:17.774662+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0237010e9c89'
+down_revision: Union[str, None] = '3de14ed29496'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_devices_created_at_device_id", "devices", ["created_at", "device_id"])
+    op.create_index("ix_devices_device_name_device_id", "devices", ["device_name", "device_id"])
+    op.create_index(
+        "ix_devices_device_name_lower",
+        "devices",
+        [sa.text("lower(device_name) text_pattern_ops")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_devices_device_name_lower", table_name="devices")
+    op.drop_index("ix_devices_device_name_device_id", table_name="devices")
+    op.drop_index("ix_devices_created_at_device_id", table_name="devices")
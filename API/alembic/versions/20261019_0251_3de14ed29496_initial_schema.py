@@ -0,0 +1,75 @@
+"""initial schema
+
+Tables as originally created by Base.metadata.create_all. Databases created
+that way before migrations existed should be stamped at this revision
+(`alembic stamp 3de14ed29496`) and then upgraded.
+
+Revision ID: 3de14ed29496
+Revises: 
+Create Date: 2026-10-19 02:51:04.353999+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3de14ed29496'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "devices",
+        sa.Column("device_id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("device_name", sa.String(length=255), nullable=False),
+        sa.Column("api_key_hash", sa.String(length=255), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+    )
+    op.create_index("ix_devices_api_key_hash", "devices", ["api_key_hash"], unique=True)
+
+    op.create_table(
+        "status_pings",
+        sa.Column("ping_id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "device_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("devices.device_id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("ping_timestamp", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_status_pings_device_id", "status_pings", ["device_id"])
+    op.create_index("ix_status_pings_ping_timestamp", "status_pings", ["ping_timestamp"])
+
+    op.create_table(
+        "device_status",
+        sa.Column("status_id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "device_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("devices.device_id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("status", sa.Enum("ONLINE", "OFFLINE", name="statusenum"), nullable=False),
+        sa.Column("last_ping_at", sa.DateTime(), nullable=True),
+        sa.Column("status_changed_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_device_status_device_id", "device_status", ["device_id"], unique=True)
+    op.create_index("ix_device_status_last_ping_at", "device_status", ["last_ping_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("device_status")
+    op.drop_table("status_pings")
+    op.drop_table("devices")
+    sa.Enum(name="statusenum").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,81 @@
+"""device groups and expiry sweep
+
+Adds device groups with their own heartbeat interval and offline threshold,
+per-device threshold overrides, and device_status.expires_at with a partial
+index for the offline sweep. Existing rows get expires_at from the default
+20-minute offline threshold; if OFFLINE_THRESHOLD_MINUTES was changed, pass
+it with `alembic -x offline_threshold_minutes=N upgrade head`.
+
+Revision ID: 45196ee8f55c
+Revises: 0237010e9c89
+Create Date: 2026-10-19 03:05:22.017351+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '45196ee8f55c'
+down_revision: Union[str, None] = '0237010e9c89'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# OFFLINE_THRESHOLD_MINUTES when this revision was written; migrations don't
+# read app settings, so they stay reproducible
+DEFAULT_OFFLINE_THRESHOLD_MINUTES = 20
+
+
+def _offline_threshold_seconds() -> int:
+    x_args = context.get_x_argument(as_dictionary=True)
+    return int(x_args.get("offline_threshold_minutes", DEFAULT_OFFLINE_THRESHOLD_MINUTES)) * 60
+
+
+def upgrade() -> None:
+    op.create_table(
+        "device_groups",
+        sa.Column("group_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("name", sa.String(length=255), nullable=False),
+        sa.Column("heartbeat_interval_seconds", sa.Integer(), nullable=False),
+        sa.Column("offline_threshold_seconds", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("group_id"),
+        sa.UniqueConstraint("name"),
+    )
+
+    op.add_column("devices", sa.Column("group_id", postgresql.UUID(as_uuid=True), nullable=True))
+    op.add_column("devices", sa.Column("offline_threshold_seconds", sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        None, "devices", "device_groups", ["group_id"], ["group_id"], ondelete="SET NULL"
+    )
+    op.create_index("ix_devices_group_id", "devices", ["group_id"])
+
+    op.add_column("device_status", sa.Column("expires_at", sa.DateTime(), nullable=True))
+    op.execute(
+        sa.text(
+            "UPDATE device_status SET expires_at = last_ping_at + :threshold * INTERVAL '1 second' "
+            "WHERE last_ping_at IS NOT NULL"
+        ).bindparams(threshold=_offline_threshold_seconds())
+    )
+    op.create_index(
+        "ix_device_status_expires_at_online",
+        "device_status",
+        ["expires_at"],
+        postgresql_where=sa.text("status = 'ONLINE'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_device_status_expires_at_online", table_name="device_status")
+    op.drop_column("device_status", "expires_at")
+
+    op.drop_index("ix_devices_group_id", table_name="devices")
+    op.drop_constraint("devices_group_id_fkey", "devices", type_="foreignkey")
+    op.drop_column("devices", "offline_threshold_seconds")
+    op.drop_column("devices", "group_id")
+
+    op.drop_table("device_groups")
@@ -0,0 +1,31 @@
+"""learned ping intervals
+
+Stores each device's learned ping interval and jitter (EWMAs), used for
+adaptive expiry.
+
+Revision ID: f347afc077f0
+Revises: 45196ee8f55c
+Create Date: 2026-10-19 03:07:29.657168+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f347afc077f0'
+down_revision: Union[str, None] = '45196ee8f55c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("device_status", sa.Column("ping_interval_seconds", sa.Float(), nullable=True))
+    op.add_column("device_status", sa.Column("ping_jitter_seconds", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("device_status", "ping_jitter_seconds")
+    op.drop_column("device_status", "ping_interval_seconds")
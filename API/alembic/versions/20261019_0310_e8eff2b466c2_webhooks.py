@@ -0,0 +1,39 @@
+"""webhooks
+
+Webhook subscriptions for device status transitions.
+
+Revision ID: e8eff2b466c2
+Revises: f347afc077f0
+Create Date: 2026-10-19 03:10:38.653838+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8eff2b466c2'
+down_revision: Union[str, None] = 'f347afc077f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "webhooks",
+        sa.Column("webhook_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("url", sa.String(length=2048), nullable=False),
+        sa.Column("secret", sa.String(length=255), nullable=True),
+        sa.Column("description", sa.String(length=255), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("webhook_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("webhooks")
@@ -0,0 +1,82 @@
+"""composite and partial query indexes
+
+Replaces the single-column status_pings indexes with ones that serve the
+history and timeline queries directly (filter, order and columns from one
+index), and adds a partial index over online devices.
+
+Indexes are built CONCURRENTLY so pings keep being written during the
+upgrade; that can't run in a transaction, hence the autocommit blocks.
+
+Revision ID: 6c5b76bb1d5b
+Revises: e8eff2b466c2
+Create Date: 2026-10-19 03:29:58.638717+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c5b76bb1d5b'
+down_revision: Union[str, None] = 'e8eff2b466c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_status_pings_device_id_ping_timestamp",
+            "status_pings",
+            ["device_id", sa.text("ping_timestamp DESC")],
+            postgresql_include=["ping_id"],
+            postgresql_concurrently=True,
+        )
+        # Covered by the composite index above
+        op.drop_index("ix_status_pings_device_id", table_name="status_pings", postgresql_concurrently=True)
+
+        op.create_index(
+            "ix_status_pings_ping_timestamp_new",
+            "status_pings",
+            ["ping_timestamp"],
+            postgresql_include=["device_id"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_status_pings_ping_timestamp", table_name="status_pings", postgresql_concurrently=True)
+        op.execute("ALTER INDEX ix_status_pings_ping_timestamp_new RENAME TO ix_status_pings_ping_timestamp")
+
+        op.create_index(
+            "ix_device_status_device_id_online",
+            "device_status",
+            ["device_id"],
+            postgresql_where=sa.text("status = 'ONLINE'"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_device_status_device_id_online", table_name="device_status", postgresql_concurrently=True)
+
+        op.create_index(
+            "ix_status_pings_ping_timestamp_old",
+            "status_pings",
+            ["ping_timestamp"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_status_pings_ping_timestamp", table_name="status_pings", postgresql_concurrently=True)
+        op.execute("ALTER INDEX ix_status_pings_ping_timestamp_old RENAME TO ix_status_pings_ping_timestamp")
+
+        op.create_index(
+            "ix_status_pings_device_id",
+            "status_pings",
+            ["device_id"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_status_pings_device_id_ping_timestamp",
+            table_name="status_pings",
+            postgresql_concurrently=True,
+        )
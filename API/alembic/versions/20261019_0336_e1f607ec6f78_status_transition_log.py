@@ -0,0 +1,59 @@
+"""status transition log
+
+Append-only log of device status changes, for point-in-time status queries.
+Seeded with each device's current status so every existing device has a
+starting point.
+
+Revision ID: e1f607ec6f78
+Revises: 6c5b76bb1d5b
+Create Date: 2026-10-19 03:36:12.418377+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f607ec6f78'
+down_revision: Union[str, None] = '6c5b76bb1d5b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "status_transitions",
+        sa.Column("transition_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("device_id", postgresql.UUID(as_uuid=True), nullable=False),
+        # Reuses the enum type created with device_status
+        sa.Column(
+            "status",
+            postgresql.ENUM("ONLINE", "OFFLINE", name="statusenum", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("changed_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["device_id"], ["devices.device_id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("transition_id"),
+    )
+    op.execute(
+        """
+        INSERT INTO status_transitions (transition_id, device_id, status, changed_at)
+        SELECT gen_random_uuid(), device_id, status, status_changed_at
+        FROM device_status
+        """
+    )
+    # Built after the seed insert; the table is new, so no need for CONCURRENTLY
+    op.create_index(
+        "ix_status_transitions_device_id_changed_at",
+        "status_transitions",
+        ["device_id", sa.text("changed_at DESC")],
+        postgresql_include=["status"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_status_transitions_device_id_changed_at", table_name="status_transitions")
+    op.drop_table("status_transitions")
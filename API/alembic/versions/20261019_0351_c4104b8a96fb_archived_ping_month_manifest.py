@@ -0,0 +1,45 @@
+"""archived ping month manifest
+
+Row counts and newest ping per archived device-month, so history queries
+don't have to open every archive file to count or find archived pings.
+Files archived before this revision are indexed by the next archiver run.
+
+Revision ID: c4104b8a96fb
+Revises: e1f607ec6f78
+Create Date: 2026-10-19 03:51:54.760986+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4104b8a96fb'
+down_revision: Union[str, None] = 'e1f607ec6f78'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "archived_ping_months",
+        sa.Column("device_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("month", sa.DateTime(), nullable=False),
+        sa.Column("ping_count", sa.Integer(), nullable=False),
+        sa.Column("newest_ping_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["device_id"], ["devices.device_id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("device_id", "month"),
+    )
+    op.create_index(
+        "ix_archived_ping_months_newest_ping_at",
+        "archived_ping_months",
+        [sa.text("newest_ping_at DESC")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_archived_ping_months_newest_ping_at", table_name="archived_ping_months")
+    op.drop_table("archived_ping_months")
@@ -0,0 +1,95 @@
+"""reconstruct status transitions from pings
+
+The transition log was seeded with only each device's status at upgrade
+time. Fill in what came before from the pings still in Postgres: offline
+when registered, online at the first ping after a silence longer than the
+device's offline threshold, and offline once that threshold passed without
+another ping. The threshold is the device's or its group's, else the
+default 20 minutes (pass another with
+`alembic -x offline_threshold_minutes=N upgrade head`). Learned ping
+intervals and the minimum dwell time are not replayed. Only times before a
+device's first logged transition are filled, so running this again adds
+nothing.
+
+Revision ID: 11447d111205
+Revises: c4104b8a96fb
+Create Date: 2026-10-19 03:59:55.397867+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '11447d111205'
+down_revision: Union[str, None] = 'c4104b8a96fb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# OFFLINE_THRESHOLD_MINUTES when this revision was written; migrations don't
+# read app settings, so they stay reproducible
+DEFAULT_OFFLINE_THRESHOLD_MINUTES = 20
+
+
+def _offline_threshold_seconds() -> int:
+    x_args = context.get_x_argument(as_dictionary=True)
+    return int(x_args.get("offline_threshold_minutes", DEFAULT_OFFLINE_THRESHOLD_MINUTES)) * 60
+
+
+def upgrade() -> None:
+    op.execute(
+        sa.text(
+            """
+            WITH devices_to_fill AS (
+                SELECT
+                    d.device_id,
+                    d.created_at,
+                    make_interval(secs => coalesce(
+                        d.offline_threshold_seconds, g.offline_threshold_seconds, :threshold
+                    )) AS threshold,
+                    coalesce(
+                        (SELECT min(t.changed_at) FROM status_transitions t WHERE t.device_id = d.device_id),
+                        timezone('utc', now())
+                    ) AS logged_from
+                FROM devices d
+                LEFT JOIN device_groups g ON g.group_id = d.group_id
+            ),
+            pings AS (
+                SELECT
+                    p.device_id,
+                    p.ping_timestamp,
+                    lag(p.ping_timestamp) OVER w AS previous_ping,
+                    lead(p.ping_timestamp) OVER w AS next_ping,
+                    f.threshold,
+                    f.logged_from
+                FROM status_pings p
+                JOIN devices_to_fill f ON f.device_id = p.device_id
+                WHERE p.ping_timestamp < f.logged_from
+                WINDOW w AS (PARTITION BY p.device_id ORDER BY p.ping_timestamp)
+            )
+            INSERT INTO status_transitions (transition_id, device_id, status, changed_at)
+            SELECT gen_random_uuid(), device_id, CAST(status AS statusenum), changed_at
+            FROM (
+                SELECT device_id, 'OFFLINE' AS status, created_at AS changed_at
+                FROM devices_to_fill
+                WHERE created_at < logged_from
+                UNION ALL
+                SELECT device_id, 'ONLINE', ping_timestamp
+                FROM pings
+                WHERE previous_ping IS NULL OR ping_timestamp - previous_ping > threshold
+                UNION ALL
+                SELECT device_id, 'OFFLINE', ping_timestamp + threshold
+                FROM pings
+                WHERE (next_ping IS NULL OR next_ping - ping_timestamp > threshold)
+                  AND ping_timestamp + threshold < logged_from
+            ) reconstructed
+            """
+        ).bindparams(threshold=_offline_threshold_seconds())
+    )
+
+
+def downgrade() -> None:
+    # The reconstructed rows are ordinary history and are left in place
+    pass
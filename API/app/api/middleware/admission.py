@@ -0,0 +1,47 @@
+import json
+from app.core.admission import Overloaded, classify
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class AdmissionControlMiddleware:
+    """
+    Admit each request through its priority class (see core/admission.py),
+    answering 503 with Retry-After when it is shed.
+    Plain ASGI so the slot is held until the response body is fully sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        admission_class = classify(scope["path"]) if scope["type"] == "http" else None
+        if admission_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await admission_class.acquire()
+        except Overloaded:
+            await self._reject(send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission_class.release()
+
+    @staticmethod
+    async def _reject(send):
+        body = json.dumps({"detail": "Server busy, retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(settings.ADMISSION_RETRY_AFTER_SECONDS).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
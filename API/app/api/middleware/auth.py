@@ -1,14 +1,21 @@
 from fastapi import Header, HTTPException, status, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.core.database import get_db
-from app.core.security import hash_api_key
+from typing import Optional
+from uuid import UUID
+from jose import ExpiredSignatureError, JWTError
+from app.core.database import get_db, is_db_unavailable
+from app.core.auth_cache import remember_api_key, lookup_api_key
+from app.core.security import hash_api_key, decode_device_token
+from app.core.revocation import is_token_revoked
 from app.core.email import send_failed_auth_alert
+from app.core.diagnostics import spawn
+from app.core.log import get_logger
 from app.models.device import Device
 from app.config import get_settings
-import asyncio
 
 settings = get_settings()
+logger = get_logger(__name__)
 
 
 async def verify_master_key(
@@ -29,11 +36,12 @@ async def verify_master_key(
     if x_master_key != settings.MASTER_API_KEY:
         # Send alert in background (don't wait for email)
         client_ip = request.client.host if request.client else "unknown"
-        asyncio.create_task(send_failed_auth_alert(
+        logger.warning("auth_failed", extra={"method": "master_key", "client_ip": client_ip})
+        spawn(send_failed_auth_alert(
             failed_key=x_master_key,
             ip_address=client_ip,
             endpoint="Master Key Authentication"
-        ))
+        ), name="failed_auth_alert")
         
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -44,15 +52,12 @@ async def verify_master_key(
     return True
 
 
-async def get_current_device(
+async def _authenticate_api_key(
     request: Request,
-    x_api_key: str = Header(..., description="API Key for authentication"),
-    db: AsyncSession = Depends(get_db),
+    x_api_key: Optional[str],
+    db: AsyncSession,
 ) -> Device:
-    """
-    Dependency to authenticate requests using API key.
-    Returns the authenticated device.
-    """
+    """Look up the active device owning an API key"""
     if not x_api_key:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -74,11 +79,12 @@ async def get_current_device(
     if not device:
         # Send alert in background (don't wait for email)
         client_ip = request.client.host if request.client else "unknown"
-        asyncio.create_task(send_failed_auth_alert(
+        logger.warning("auth_failed", extra={"method": "api_key", "client_ip": client_ip})
+        spawn(send_failed_auth_alert(
             failed_key=x_api_key,
             ip_address=client_ip,
             endpoint="Device API Key Authentication"
-        ))
+        ), name="failed_auth_alert")
         
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -86,4 +92,93 @@ async def get_current_device(
             headers={"WWW-Authenticate": "ApiKey"},
         )
     
+    # Remember the key so pings can still be accepted if Postgres goes down
+    remember_api_key(api_key_hash, device.device_id)
+    
     return device
+
+
+def _authenticate_token(request: Request, token: str) -> UUID:
+    """Verify a signed device token in memory, without touching the database"""
+    try:
+        device_id, issued_at = decode_device_token(token)
+    except ExpiredSignatureError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token expired",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    except (JWTError, ValueError, KeyError):
+        # Send alert in background (don't wait for email)
+        client_ip = request.client.host if request.client else "unknown"
+        logger.warning("auth_failed", extra={"method": "token", "client_ip": client_ip})
+        spawn(send_failed_auth_alert(
+            failed_key=token,
+            ip_address=client_ip,
+            endpoint="Device Token Authentication"
+        ), name="failed_auth_alert")
+
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if is_token_revoked(device_id, issued_at):
+        logger.warning("auth_failed", extra={"method": "token", "reason": "revoked", "device_id": str(device_id)})
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return device_id
+
+
+async def get_current_device(
+    request: Request,
+    x_api_key: str = Header(..., description="API Key for authentication"),
+    db: AsyncSession = Depends(get_db),
+) -> Device:
+    """
+    Dependency to authenticate requests using API key.
+    Returns the authenticated device.
+    """
+    return await _authenticate_api_key(request, x_api_key, db)
+
+
+async def get_current_device_id(
+    request: Request,
+    authorization: Optional[str] = Header(
+        None, description="Bearer token from /token (when device tokens are enabled)"
+    ),
+    x_api_key: Optional[str] = Header(None, description="API Key for authentication"),
+    db: AsyncSession = Depends(get_db),
+) -> UUID:
+    """
+    Dependency to authenticate a device by signed token or API key.
+    Tokens are verified purely in memory; API keys need a database lookup.
+    Returns the authenticated device ID.
+    """
+    if settings.ENABLE_DEVICE_TOKENS and authorization:
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and token:
+            return _authenticate_token(request, token)
+
+    try:
+        device = await _authenticate_api_key(request, x_api_key, db)
+    except HTTPException:
+        raise
+    except Exception as e:
+        # Postgres is down: fall back to keys verified recently so pings can be journaled
+        if not is_db_unavailable(e) or not x_api_key:
+            raise
+        device_id = lookup_api_key(hash_api_key(x_api_key))
+        if device_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Database unavailable",
+            )
+        return device_id
+
+    return device.device_id
@@ -0,0 +1,61 @@
+import random
+import time
+from app.core.log import get_logger, request_id_var, sampled
+from app.config import get_settings
+
+settings = get_settings()
+
+access_logger = get_logger("app.access")
+
+
+class RequestLogMiddleware:
+    """
+    Give every request an ID (from X-Request-ID or generated), echo it in the
+    response and log one access record. Successful pings are sampled at
+    LOG_PING_SAMPLE_RATE; errors, auth failures and shed requests are always logged.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.ping_path = f"/api/{settings.API_VERSION}/ping"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        if not request_id:
+            request_id = f"{random.getrandbits(64):016x}"
+        token = request_id_var.set(request_id)
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            path = scope["path"]
+            rate = settings.LOG_PING_SAMPLE_RATE if path == self.ping_path else settings.LOG_REQUEST_SAMPLE_RATE
+            if status_code >= 400 or sampled(rate):
+                access_logger.info("request", extra={
+                    "method": scope["method"],
+                    "path": path,
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                    "sample_rate": 1 if status_code >= 400 else rate,
+                })
+            request_id_var.reset(token)
@@ -1,17 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status as http_status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status as http_status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from redis.asyncio import Redis
-from typing import List
+from typing import Iterable, List, Optional
 from uuid import UUID
-from app.core.database import get_db
+from app.core.database import AsyncSessionLocal, get_db, get_read_db
 from app.core.redis import get_redis
-from app.schemas.device import DeviceCreate, DeviceResponse, DeviceWithApiKey
+from app.schemas.device import (
+    DeviceCreate,
+    DeviceUpdate,
+    DeviceBulkCreate,
+    DeviceBulkIds,
+    DeviceBulkDeleteResponse,
+    DeviceDeletionProgress,
+    DeviceResponse,
+    DeviceWithApiKey,
+)
 from app.services.device_service import DeviceService
 from app.api.middleware.auth import verify_master_key
+from app.tasks.device_cleanup import start_device_deletion, start_device_deletions, get_deletion_progress
 
 router = APIRouter()
 
 
+def _ndjson(items: Iterable[DeviceWithApiKey]):
+    """Serialize items as newline-delimited JSON"""
+    for item in items:
+        yield item.model_dump_json() + "\n"
+
+
 @router.post("/devices", response_model=DeviceWithApiKey, status_code=http_status.HTTP_201_CREATED)
 async def create_device(
     device_data: DeviceCreate,
@@ -25,23 +42,155 @@ async def create_device(
     Returns the device info with the API key (only shown once).
     """
     device_service = DeviceService(db, redis)
-    result = await device_service.create_device(device_data.device_name)
+    try:
+        result = await device_service.create_device(
+            device_data.device_name,
+            group_id=device_data.group_id,
+            offline_threshold_seconds=device_data.offline_threshold_seconds,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     return result
 
 
+@router.post("/devices/bulk", status_code=http_status.HTTP_201_CREATED)
+async def bulk_create_devices(
+    bulk_data: DeviceBulkCreate,
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+    _: bool = Depends(verify_master_key),
+):
+    """
+    Register many devices at once, optionally all in one group or with one
+    offline threshold override.
+    Requires Master API Key authentication (X-Master-Key header).
+    Streams one device per line (NDJSON), each with its API key (only shown once).
+    Devices are committed in chunks and sent as each chunk commits, so if the
+    stream breaks off, the devices already received exist.
+    """
+    try:
+        await DeviceService(db, redis).check_group(bulk_data.group_id)
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    async def stream():
+        # The request's session is closed before the body is sent, so use our own
+        async with AsyncSessionLocal() as session:
+            devices = DeviceService(session, redis).bulk_create_devices(
+                bulk_data.device_names,
+                group_id=bulk_data.group_id,
+                offline_threshold_seconds=bulk_data.offline_threshold_seconds,
+            )
+            async for device in devices:
+                yield device.model_dump_json() + "\n"
+
+    return StreamingResponse(
+        stream(),
+        status_code=http_status.HTTP_201_CREATED,
+        media_type="application/x-ndjson",
+    )
+
+
+@router.post(
+    "/devices/bulk-delete",
+    response_model=DeviceBulkDeleteResponse,
+    status_code=http_status.HTTP_202_ACCEPTED,
+)
+async def bulk_delete_devices(
+    bulk_data: DeviceBulkIds,
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+    _: bool = Depends(verify_master_key),
+):
+    """
+    Delete many devices and all associated data.
+    Requires Master API Key authentication (X-Master-Key header).
+    The devices are deactivated immediately and deleted one at a time in the
+    background; poll GET /devices/{device_id}/deletion for each one's progress.
+    """
+    device_service = DeviceService(db, redis)
+    deactivated_ids = await device_service.deactivate_devices(bulk_data.device_ids)
+
+    deactivated = set(deactivated_ids)
+    return DeviceBulkDeleteResponse(
+        deletions=await start_device_deletions(deactivated_ids) if deactivated_ids else [],
+        not_found_ids=[device_id for device_id in bulk_data.device_ids if device_id not in deactivated],
+    )
+
+
+@router.post("/devices/rotate-keys")
+async def rotate_api_keys(
+    bulk_data: DeviceBulkIds,
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+    _: bool = Depends(verify_master_key),
+):
+    """
+    Issue new API keys for many devices. Old keys stop working immediately.
+    Requires Master API Key authentication (X-Master-Key header).
+    Streams one device per line (NDJSON) with its new API key (only shown once).
+    Unknown device IDs are skipped.
+    """
+    device_service = DeviceService(db, redis)
+    result = await device_service.rotate_api_keys(bulk_data.device_ids)
+
+    return StreamingResponse(_ndjson(result), media_type="application/x-ndjson")
+
+
+@router.post("/devices/{device_id}/rotate-key", response_model=DeviceWithApiKey)
+async def rotate_api_key(
+    device_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+    _: bool = Depends(verify_master_key),
+):
+    """
+    Issue a new API key for a device. The old key stops working immediately.
+    Requires Master API Key authentication (X-Master-Key header).
+    Returns the device info with the new API key (only shown once).
+    """
+    device_service = DeviceService(db, redis)
+    result = await device_service.rotate_api_key(device_id)
+
+    if not result:
+        raise HTTPException(
+            status_code=http_status.HTTP_404_NOT_FOUND,
+            detail=f"Device {device_id} not found"
+        )
+
+    return result
+
+
 @router.get("/devices", response_model=List[DeviceResponse])
 async def list_devices(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of devices to return"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    is_active: Optional[bool] = Query(None, description="Filter by active flag"),
+    name_prefix: Optional[str] = Query(
+        None, min_length=1, max_length=255, description="Case-insensitive device name prefix"
+    ),
+    db: AsyncSession = Depends(get_read_db),
     redis: Redis = Depends(get_redis),
     _: bool = Depends(verify_master_key),
 ):
     """
-    List all registered devices.
+    List registered devices, newest first.
     Requires Master API Key authentication (X-Master-Key header).
+    Paginated: when more results exist, the X-Next-Cursor response header
+    holds the cursor for the next page.
     """
     device_service = DeviceService(db, redis)
-    devices = await device_service.get_all_devices()
+    try:
+        devices, next_cursor = await device_service.get_all_devices(
+            limit=limit, cursor=cursor, is_active=is_active, name_prefix=name_prefix
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     return devices
 
@@ -69,7 +218,41 @@ async def get_device(
     return device
 
 
-@router.delete("/devices/{device_id}", status_code=http_status.HTTP_204_NO_CONTENT)
+@router.patch("/devices/{device_id}", response_model=DeviceResponse)
+async def update_device(
+    device_id: UUID,
+    device_data: DeviceUpdate,
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+    _: bool = Depends(verify_master_key),
+):
+    """
+    Move a device to another group or set its own offline threshold.
+    Requires Master API Key authentication (X-Master-Key header).
+    Send null to clear a field; omitted fields are unchanged.
+    """
+    device_service = DeviceService(db, redis)
+    try:
+        device = await device_service.update_device(
+            device_id, device_data.model_dump(exclude_unset=True)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if not device:
+        raise HTTPException(
+            status_code=http_status.HTTP_404_NOT_FOUND,
+            detail=f"Device {device_id} not found"
+        )
+
+    return device
+
+
+@router.delete(
+    "/devices/{device_id}",
+    response_model=DeviceDeletionProgress,
+    status_code=http_status.HTTP_202_ACCEPTED,
+)
 async def delete_device(
     device_id: UUID,
     db: AsyncSession = Depends(get_db),
@@ -79,9 +262,11 @@ async def delete_device(
     """
     Delete a device and all associated data.
     Requires Master API Key authentication (X-Master-Key header).
+    The device is deactivated immediately and its ping history is deleted
+    in the background; poll GET /devices/{device_id}/deletion for progress.
     """
     device_service = DeviceService(db, redis)
-    success = await device_service.delete_device(device_id)
+    success = await device_service.deactivate_device(device_id)
     
     if not success:
         raise HTTPException(
@@ -89,4 +274,24 @@ async def delete_device(
             detail=f"Device {device_id} not found"
         )
     
-    return None
+    return await start_device_deletion(device_id)
+
+
+@router.get("/devices/{device_id}/deletion", response_model=DeviceDeletionProgress)
+async def get_device_deletion(
+    device_id: UUID,
+    _: bool = Depends(verify_master_key),
+):
+    """
+    Get progress of a background device deletion.
+    Requires Master API Key authentication (X-Master-Key header).
+    """
+    progress = await get_deletion_progress(device_id)
+
+    if not progress:
+        raise HTTPException(
+            status_code=http_status.HTTP_404_NOT_FOUND,
+            detail=f"No deletion found for device {device_id}"
+        )
+
+    return progress
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status as http_status
+from fastapi.responses import PlainTextResponse
+from app.core import diagnostics
+from app.api.middleware.auth import verify_master_key
+from app.config import get_settings
+
+settings = get_settings()
+
+router = APIRouter()
+
+
+def _check_available():
+    if diagnostics.is_profiling():
+        raise HTTPException(
+            status_code=http_status.HTTP_409_CONFLICT,
+            detail="A profile is already running on this worker",
+        )
+
+
+@router.get("/diagnostics/loop")
+async def get_loop_stats(_: bool = Depends(verify_master_key)):
+    """
+    Event-loop lag and pending task counts for the worker serving the request.
+    Requires Master API Key authentication (X-Master-Key header).
+    """
+    return diagnostics.loop_stats()
+
+
+@router.get("/diagnostics/profile", response_class=PlainTextResponse)
+async def sample_profile(
+    seconds: float = Query(10, gt=0, le=settings.PROFILE_MAX_SECONDS),
+    all_threads: bool = Query(False, description="Also sample worker threads (e.g. asyncio.to_thread)"),
+    _: bool = Depends(verify_master_key),
+):
+    """
+    Sample the serving worker's stacks for N seconds.
+    Returns collapsed stacks ("frame;frame count" per line) for flamegraph tools.
+    Requires Master API Key authentication (X-Master-Key header).
+    """
+    _check_available()
+    return await diagnostics.sample_profile(seconds, all_threads)
+
+
+@router.get("/diagnostics/cprofile", response_class=PlainTextResponse)
+async def cprofile(
+    seconds: float = Query(5, gt=0, le=settings.PROFILE_MAX_SECONDS),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|ncalls)$"),
+    limit: int = Query(100, ge=1, le=1000),
+    _: bool = Depends(verify_master_key),
+):
+    """
+    Run cProfile on the serving worker's event loop for N seconds.
+    Exact call counts, but adds overhead while running; prefer /diagnostics/profile under load.
+    Requires Master API Key authentication (X-Master-Key header).
+    """
+    _check_available()
+    return await diagnostics.cprofile(seconds, sort, limit)
@@ -0,0 +1,115 @@
+from fastapi import APIRouter, Depends, HTTPException, status as http_status
+from sqlalchemy.ext.asyncio import AsyncSession
+from redis.asyncio import Redis
+from typing import List
+from uuid import UUID
+from app.core.database import get_db, get_read_db
+from app.core.redis import get_redis
+from app.schemas.group import DeviceGroupCreate, DeviceGroupUpdate, DeviceGroupResponse
+from app.services.group_service import GroupService
+from app.api.middleware.auth import verify_master_key
+
+router = APIRouter()
+
+
+@router.post("/groups", response_model=DeviceGroupResponse, status_code=http_status.HTTP_201_CREATED)
+async def create_group(
+    group_data: DeviceGroupCreate,
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+    _: bool = Depends(verify_master_key),
+):
+    """
+    Create a device group with its own heartbeat interval and offline threshold.
+    Requires Master API Key authentication (X-Master-Key header).
+    """
+    group_service = GroupService(db, redis)
+    try:
+        return await group_service.create_group(group_data)
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.get("/groups", response_model=List[DeviceGroupResponse])
+async def list_groups(
+    db: AsyncSession = Depends(get_read_db),
+    redis: Redis = Depends(get_redis),
+    _: bool = Depends(verify_master_key),
+):
+    """
+    List all device groups.
+    Requires Master API Key authentication (X-Master-Key header).
+    """
+    group_service = GroupService(db, redis)
+    return await group_service.get_all_groups()
+
+
+@router.get("/groups/{group_id}", response_model=DeviceGroupResponse)
+async def get_group(
+    group_id: UUID,
+    db: AsyncSession = Depends(get_read_db),
+    redis: Redis = Depends(get_redis),
+    _: bool = Depends(verify_master_key),
+):
+    """
+    Get a device group by ID.
+    Requires Master API Key authentication (X-Master-Key header).
+    """
+    group_service = GroupService(db, redis)
+    group = await group_service.get_group(group_id)
+
+    if not group:
+        raise HTTPException(
+            status_code=http_status.HTTP_404_NOT_FOUND,
+            detail=f"Group {group_id} not found"
+        )
+
+    return group
+
+
+@router.patch("/groups/{group_id}", response_model=DeviceGroupResponse)
+async def update_group(
+    group_id: UUID,
+    group_data: DeviceGroupUpdate,
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+    _: bool = Depends(verify_master_key),
+):
+    """
+    Update a device group. Changing the threshold re-evaluates its devices' expiry.
+    Requires Master API Key authentication (X-Master-Key header).
+    """
+    group_service = GroupService(db, redis)
+    try:
+        group = await group_service.update_group(group_id, group_data)
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if not group:
+        raise HTTPException(
+            status_code=http_status.HTTP_404_NOT_FOUND,
+            detail=f"Group {group_id} not found"
+        )
+
+    return group
+
+
+@router.delete("/groups/{group_id}", status_code=http_status.HTTP_204_NO_CONTENT)
+async def delete_group(
+    group_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+    _: bool = Depends(verify_master_key),
+):
+    """
+    Delete a device group. Its devices fall back to the default threshold.
+    Requires Master API Key authentication (X-Master-Key header).
+    """
+    group_service = GroupService(db, redis)
+    success = await group_service.delete_group(group_id)
+
+    if not success:
+        raise HTTPException(
+            status_code=http_status.HTTP_404_NOT_FOUND,
+            detail=f"Group {group_id} not found"
+        )
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from uuid import UUID
-from app.core.database import get_db
-from app.schemas.history import PingHistoryResponse
-from app.services.history_service import HistoryService
+from datetime import datetime, timedelta, timezone
+from app.core.database import get_read_db
+from app.schemas.history import PingHistoryResponse, TimelineResponse
+from app.services.history_service import HistoryService, MAX_TIMELINE_BUCKETS, timeline_bucket_count
 
 router = APIRouter()
 
@@ -16,7 +17,7 @@ async def get_ping_history(
         100, ge=1, le=1000, description="Maximum number of pings to return"
     ),
     days: Optional[int] = Query(None, ge=1, description="Number of days to look back"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Get historical ping data for all devices or a specific device.
@@ -26,6 +27,9 @@ async def get_ping_history(
     - device_id: Optional UUID to filter by specific device
     - limit: Maximum number of pings to return (1-1000, default 100)
     - days: Optional number of days to look back
+
+    With neither device_id nor days, total_pings is Postgres's row estimate
+    for the ping table rather than an exact count.
     """
     history_service = HistoryService(db)
     result = await history_service.get_ping_history(
@@ -33,3 +37,64 @@ async def get_ping_history(
     )
 
     return result
+
+
+def _to_naive_utc(value: datetime) -> datetime:
+    """Normalize a datetime to naive UTC to match stored timestamps"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+@router.get("/history/timeline", response_model=TimelineResponse)
+async def get_ping_timeline(
+    device_id: Optional[UUID] = Query(None, description="Filter by device ID"),
+    start: Optional[datetime] = Query(
+        None, description="Start of the range (default: 1 day before end)"
+    ),
+    end: Optional[datetime] = Query(None, description="End of the range (default: now)"),
+    bucket_minutes: int = Query(
+        60, ge=1, le=43200, description="Width of each bucket in minutes"
+    ),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Get downsampled ping counts for charting, bucketed server-side.
+    This endpoint is public and does not require authentication.
+
+    Query parameters:
+    - device_id: Optional UUID to filter by specific device (adds online/offline state per bucket)
+    - start / end: Time range, ISO 8601 (default: the last 24 hours). end is
+      exclusive and start is rounded down to a bucket boundary
+    - bucket_minutes: Bucket width in minutes (1-43200, default 60)
+
+    At most 2000 buckets can be requested at once.
+    """
+    end = _to_naive_utc(end) if end else datetime.utcnow()
+    start = _to_naive_utc(start) if start else end - timedelta(days=1)
+
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end",
+        )
+
+    bucket_count = timeline_bucket_count(start, end, timedelta(minutes=bucket_minutes))
+    if bucket_count > MAX_TIMELINE_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range too large for bucket width (max {MAX_TIMELINE_BUCKETS} buckets)",
+        )
+
+    history_service = HistoryService(db)
+    result = await history_service.get_timeline(
+        start=start, end=end, bucket_minutes=bucket_minutes, device_id=device_id
+    )
+
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Device {device_id} not found",
+        )
+
+    return result
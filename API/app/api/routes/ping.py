@@ -1,11 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from redis.asyncio import Redis
+from uuid import UUID
 from app.core.database import get_db
 from app.core.redis import get_redis
-from app.schemas.ping import PingResponse
+from app.schemas.ping import PingBatchRequest, PingBatchResponse, PingResponse
 from app.services.ping_service import PingService
-from app.api.middleware.auth import get_current_device
+from app.api.middleware.auth import get_current_device, get_current_device_id
+from app.core.security import create_device_token
+from app.schemas.token import DeviceTokenResponse
+from app.config import get_settings
+
+settings = get_settings()
 
 router = APIRouter()
 
@@ -14,13 +20,59 @@ router = APIRouter()
 async def send_ping(
     db: AsyncSession = Depends(get_db),
     redis: Redis = Depends(get_redis),
-    current_device = Depends(get_current_device),
+    device_id: UUID = Depends(get_current_device_id),
 ):
     """
     Receive a heartbeat ping from a device.
-    Just send the ping with your API key - no request body needed.
+    Just send the ping with your API key (or a bearer token from /token) - no request body needed.
     """
     ping_service = PingService(db, redis)
-    result = await ping_service.record_ping(device_id=current_device.device_id)
+    result = await ping_service.record_ping(device_id=device_id)
     
     return result
+
+
+@router.post("/ping/batch", response_model=PingBatchResponse, status_code=status.HTTP_200_OK)
+async def send_ping_batch(
+    batch: PingBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+    device_id: UUID = Depends(get_current_device_id),
+):
+    """
+    Submit pings buffered while the device could not reach the API.
+    Each ping carries a client-generated ping_id, so resending a batch is safe.
+    Pings outside the accepted time range are counted as rejected.
+    """
+    if len(batch.pings) > settings.PING_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.PING_BATCH_MAX_SIZE} pings per batch",
+        )
+
+    ping_service = PingService(db, redis)
+    return await ping_service.record_ping_batch(device_id, batch.pings)
+
+
+@router.post("/token", response_model=DeviceTokenResponse)
+async def create_token(
+    current_device = Depends(get_current_device),
+):
+    """
+    Exchange a device API key for a short-lived signed token.
+    Send it as "Authorization: Bearer <token>" on /ping to skip the API key lookup.
+    Request a new token before expires_at.
+    """
+    if not settings.ENABLE_DEVICE_TOKENS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Device tokens are disabled",
+        )
+
+    token, expires_at = create_device_token(current_device.device_id)
+
+    return DeviceTokenResponse(
+        access_token=token,
+        device_id=current_device.device_id,
+        expires_at=expires_at,
+    )
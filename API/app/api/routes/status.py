@@ -1,15 +1,82 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 from uuid import UUID
-from app.core.database import get_db
-from app.schemas.status import DeviceStatusResponse
+from datetime import datetime, timezone
+from app.core.database import get_db, get_read_db
+from app.schemas.status import DeviceStatusAt, DeviceStatusResponse, StatusQueryRequest, StatusQueryResponse
 from app.schemas.online import OnlineDevicesResponse
+from app.models.status import StatusEnum
 from app.services.status_service import StatusService
 from app.core.redis import get_redis
 from redis.asyncio import Redis
+from app.config import get_settings
 
 router = APIRouter()
+settings = get_settings()
+
+
+@router.post("/status/query", response_model=StatusQueryResponse)
+async def query_device_statuses(
+    query: StatusQueryRequest,
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+):
+    """
+    Get the status of several devices at once, in request order.
+    Served with one cache read and at most one database query, instead of
+    one /status/{device_id} call per device.
+    """
+    if len(query.device_ids) > settings.STATUS_QUERY_MAX_DEVICES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.STATUS_QUERY_MAX_DEVICES} device IDs per query",
+        )
+
+    status_service = StatusService(db, redis)
+    statuses, not_found = await status_service.get_device_statuses(query.device_ids)
+    return StatusQueryResponse(statuses=statuses, not_found=not_found)
+
+
+@router.get("/status/at", response_model=List[DeviceStatusAt])
+async def get_device_statuses_at(
+    response: Response,
+    ts: datetime = Query(..., description="Point in time (naive timestamps are UTC)"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of devices to return"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    device_status: Optional[StatusEnum] = Query(None, alias="status", description="Filter by status"),
+    name_prefix: Optional[str] = Query(
+        None, min_length=1, max_length=255, description="Case-insensitive device name prefix"
+    ),
+    db: AsyncSession = Depends(get_read_db),
+    redis: Redis = Depends(get_redis),
+):
+    """
+    Get the status every device had at a point in time, from the transition log.
+    Ordered and paginated like /status. Devices created after ts are not listed.
+    Times before the log was added are reconstructed from pings with a plain
+    threshold (no learned intervals or dwell), so they are approximate and
+    read offline for ping months that had been archived.
+    """
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+
+    status_service = StatusService(db, redis)
+    try:
+        results, next_cursor = await status_service.get_statuses_at(
+            ts,
+            limit=limit,
+            cursor=cursor,
+            status=device_status,
+            name_prefix=name_prefix,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return results
 
 
 @router.get("/status/{device_id}", response_model=DeviceStatusResponse)
@@ -33,23 +100,64 @@ async def get_device_status(
 
 @router.get("/status", response_model=List[DeviceStatusResponse])
 async def get_all_device_statuses(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of devices to return"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    device_status: Optional[StatusEnum] = Query(None, alias="status", description="Filter by status"),
+    is_active: Optional[bool] = Query(None, description="Filter by active flag"),
+    name_prefix: Optional[str] = Query(
+        None, min_length=1, max_length=255, description="Case-insensitive device name prefix"
+    ),
+    db: AsyncSession = Depends(get_read_db),
     redis: Redis = Depends(get_redis),
 ):
-    """Get the status of all devices"""
+    """
+    Get the status of all devices, ordered by name.
+    Paginated: when more results exist, the X-Next-Cursor response header
+    holds the cursor for the next page.
+    """
     status_service = StatusService(db, redis)
-    results = await status_service.get_all_device_statuses()
+    try:
+        results, next_cursor = await status_service.get_all_device_statuses(
+            limit=limit,
+            cursor=cursor,
+            status=device_status,
+            is_active=is_active,
+            name_prefix=name_prefix,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     return results
 
 
 @router.get("/online", response_model=OnlineDevicesResponse)
 async def get_online_devices(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of names to return"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    name_prefix: Optional[str] = Query(
+        None, min_length=1, max_length=255, description="Case-insensitive device name prefix"
+    ),
+    db: AsyncSession = Depends(get_read_db),
     redis: Redis = Depends(get_redis),
 ):
-    """Get a list of devices that are currently online"""
+    """
+    Get a list of devices that are currently online.
+    Paginated like /status; online_count is always the total.
+    """
     status_service = StatusService(db, redis)
-    results = await status_service.get_online_devices()
+    try:
+        results, next_cursor = await status_service.get_online_devices(
+            limit=limit, cursor=cursor, name_prefix=name_prefix
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     return results
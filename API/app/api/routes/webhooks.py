@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, HTTPException, status as http_status
+from sqlalchemy.ext.asyncio import AsyncSession
+from redis.asyncio import Redis
+from typing import List
+from uuid import UUID
+from app.core.database import get_db
+from app.core.redis import get_redis
+from app.schemas.webhook import WebhookCreate, WebhookUpdate, WebhookResponse
+from app.services.webhook_service import WebhookService
+from app.api.middleware.auth import verify_master_key
+
+router = APIRouter()
+
+
+@router.post("/webhooks", response_model=WebhookResponse, status_code=http_status.HTTP_201_CREATED)
+async def create_webhook(
+    webhook_data: WebhookCreate,
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+    _: bool = Depends(verify_master_key),
+):
+    """
+    Subscribe an endpoint to device status transitions.
+    Requires Master API Key authentication (X-Master-Key header).
+    """
+    webhook_service = WebhookService(db, redis)
+    return await webhook_service.create_webhook(webhook_data)
+
+
+@router.get("/webhooks", response_model=List[WebhookResponse])
+async def list_webhooks(
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+    _: bool = Depends(verify_master_key),
+):
+    """
+    List webhook subscriptions.
+    Requires Master API Key authentication (X-Master-Key header).
+    """
+    webhook_service = WebhookService(db, redis)
+    return await webhook_service.get_all_webhooks()
+
+
+@router.patch("/webhooks/{webhook_id}", response_model=WebhookResponse)
+async def update_webhook(
+    webhook_id: UUID,
+    webhook_data: WebhookUpdate,
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+    _: bool = Depends(verify_master_key),
+):
+    """
+    Update or pause (is_active=false) a webhook subscription.
+    Requires Master API Key authentication (X-Master-Key header).
+    """
+    webhook_service = WebhookService(db, redis)
+    webhook = await webhook_service.update_webhook(webhook_id, webhook_data)
+
+    if not webhook:
+        raise HTTPException(
+            status_code=http_status.HTTP_404_NOT_FOUND,
+            detail=f"Webhook {webhook_id} not found"
+        )
+
+    return webhook
+
+
+@router.delete("/webhooks/{webhook_id}", status_code=http_status.HTTP_204_NO_CONTENT)
+async def delete_webhook(
+    webhook_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+    _: bool = Depends(verify_master_key),
+):
+    """
+    Delete a webhook subscription.
+    Requires Master API Key authentication (X-Master-Key header).
+    """
+    webhook_service = WebhookService(db, redis)
+    success = await webhook_service.delete_webhook(webhook_id)
+
+    if not success:
+        raise HTTPException(
+            status_code=http_status.HTTP_404_NOT_FOUND,
+            detail=f"Webhook {webhook_id} not found"
+        )
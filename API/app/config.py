@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -11,20 +12,97 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
     DB_ECHO: bool = False
+
+    # Optional read replica for status listings, history and device listings
+    DATABASE_READ_URL: Optional[str] = None
+    DB_READ_POOL_SIZE: int = 10
+    DB_READ_MAX_OVERFLOW: int = 20
+    DB_READ_MAX_LAG_SECONDS: float = 10
+    DB_READ_CHECK_INTERVAL_SECONDS: float = 5
     
     # Redis
     REDIS_URL: str
     REDIS_CACHE_TTL: int = 300
+    LOCAL_CACHE_TTL_SECONDS: float = 5
+    LOCAL_CACHE_MAX_ENTRIES: int = 10000
+    CACHE_EARLY_REFRESH_BETA: float = 1.0
     
     # Security
     SECRET_KEY: str
     API_KEY_LENGTH: int = 32
     MASTER_API_KEY: str
+    ENABLE_DEVICE_TOKENS: bool = False
+    DEVICE_TOKEN_EXPIRE_MINUTES: int = 60
+    AUTH_FALLBACK_TTL_SECONDS: int = 86400
+    AUTH_FALLBACK_MAX_ENTRIES: int = 100000
     
     # Ping Configuration
     OFFLINE_THRESHOLD_MINUTES: int = 20
     STATUS_CHECK_INTERVAL_MINUTES: int = 5
+    PING_INTERVAL_EWMA_ALPHA: float = 0.125
+    PING_JITTER_EWMA_BETA: float = 0.25
+    MISSED_PINGS_BEFORE_OFFLINE: int = 3
+    ADAPTIVE_EXPIRY_MAX_FACTOR: float = 4.0
+    STATUS_MIN_DWELL_SECONDS: int = 300
+
+    # Buffered pings submitted by agents after an outage (/ping/batch)
+    PING_BATCH_MAX_SIZE: int = 1000
+    PING_BATCH_MAX_AGE_HOURS: int = 24
+    PING_BATCH_MAX_CLOCK_SKEW_SECONDS: int = 60
+
+    # Multi-device status lookups (/status/query)
+    STATUS_QUERY_MAX_DEVICES: int = 1000
+
+    # Degraded mode
+    PING_JOURNAL_PATH: str = "journal/pings.jsonl"
+    JOURNAL_REPLAY_INTERVAL_SECONDS: int = 30
+    JOURNAL_REPLAY_BATCH_SIZE: int = 5000
+
+    # Cold archive of old pings
+    ARCHIVE_ENABLED: bool = False
+    ARCHIVE_AFTER_DAYS: int = 90
+    ARCHIVE_PATH: str = "archive/pings"
+    ARCHIVE_INTERVAL_HOURS: int = 24
+    ARCHIVE_BLOCK_ROWS: int = 4096
+
+    # Device deletion
+    DELETE_CHUNK_SIZE: int = 5000
     
+    # Webhooks
+    WEBHOOK_MAX_CONCURRENCY: int = 10
+    WEBHOOK_BATCH_SIZE: int = 100
+    WEBHOOK_TIMEOUT_SECONDS: float = 10
+    WEBHOOK_MAX_ATTEMPTS: int = 10
+    WEBHOOK_RETRY_BASE_SECONDS: float = 5
+    WEBHOOK_RETRY_MAX_SECONDS: float = 3600
+    WEBHOOK_POLL_INTERVAL_SECONDS: float = 1
+    WEBHOOK_SUBSCRIPTION_CACHE_SECONDS: float = 30
+
+    # Admission control (per worker): concurrency limit, wait queue length and
+    # longest wait per priority class before shedding with 503
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_PING_CONCURRENCY: int = 20
+    ADMISSION_PING_QUEUE: int = 1000
+    ADMISSION_PING_MAX_WAIT_SECONDS: float = 10
+    ADMISSION_STATUS_CONCURRENCY: int = 8
+    ADMISSION_STATUS_QUEUE: int = 200
+    ADMISSION_STATUS_MAX_WAIT_SECONDS: float = 2
+    ADMISSION_LOW_CONCURRENCY: int = 2
+    ADMISSION_LOW_QUEUE: int = 20
+    ADMISSION_LOW_MAX_WAIT_SECONDS: float = 0.5
+    ADMISSION_RETRY_AFTER_SECONDS: int = 5
+
+    # Logging (JSON lines on stdout, written by a background thread)
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    LOG_PING_SAMPLE_RATE: float = 0.01
+    LOG_REQUEST_SAMPLE_RATE: float = 1.0
+
+    # Diagnostics
+    PROFILE_MAX_SECONDS: float = 60
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5
+    LOOP_LAG_CHECK_INTERVAL_SECONDS: float = 0.5
+
     # Email Alerts
     ENABLE_EMAIL_ALERTS: bool = False
     SMTP_HOST: str = "smtp.gmail.com"
@@ -0,0 +1,127 @@
+import asyncio
+from collections import deque
+from typing import Dict, Optional
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class Overloaded(Exception):
+    """Request shed: its class is at its concurrency limit and the queue is full or too slow"""
+
+
+class AdmissionClass:
+    """
+    Concurrency limit for one priority class, with a bounded FIFO wait queue.
+    Requests wait at most max_wait seconds for a slot; beyond max_queue
+    waiters they are shed immediately. Per worker, like the connection pool.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters: deque = deque()
+        self.admitted = 0
+        self.shed = 0
+        self.timed_out = 0
+
+    async def acquire(self):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.shed += 1
+            raise Overloaded(self.name)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as we gave up: pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.timed_out += 1
+            self.shed += 1
+            raise Overloaded(self.name)
+        self.admitted += 1
+
+    def release(self):
+        # Hand the slot straight to the oldest live waiter, so it can't be overtaken
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "timed_out": self.timed_out,
+        }
+
+
+# Highest priority first: heartbeats must never queue behind history scans
+PING = AdmissionClass(
+    "ping",
+    settings.ADMISSION_PING_CONCURRENCY,
+    settings.ADMISSION_PING_QUEUE,
+    settings.ADMISSION_PING_MAX_WAIT_SECONDS,
+)
+STATUS = AdmissionClass(
+    "status",
+    settings.ADMISSION_STATUS_CONCURRENCY,
+    settings.ADMISSION_STATUS_QUEUE,
+    settings.ADMISSION_STATUS_MAX_WAIT_SECONDS,
+)
+LOW = AdmissionClass(
+    "low",
+    settings.ADMISSION_LOW_CONCURRENCY,
+    settings.ADMISSION_LOW_QUEUE,
+    settings.ADMISSION_LOW_MAX_WAIT_SECONDS,
+)
+CLASSES = (PING, STATUS, LOW)
+
+API_PREFIX = f"/api/{settings.API_VERSION}"
+_ROUTE_CLASSES = (
+    (f"{API_PREFIX}/ping", PING),
+    (f"{API_PREFIX}/token", PING),
+    (f"{API_PREFIX}/status", STATUS),
+    (f"{API_PREFIX}/online", STATUS),
+    # Diagnostics must keep working while the worker is overloaded
+    (f"{API_PREFIX}/diagnostics", None),
+)
+
+
+def classify(path: str) -> Optional[AdmissionClass]:
+    """Priority class for a request path; None means never limited"""
+    if not path.startswith(API_PREFIX):
+        # /health, /docs and friends
+        return None
+    for prefix, admission_class in _ROUTE_CLASSES:
+        if path == prefix or path.startswith(prefix + "/"):
+            return admission_class
+    # History, device and group management, webhooks
+    return LOW
+
+
+def admission_stats() -> Dict:
+    return {admission_class.name: admission_class.stats() for admission_class in CLASSES}
@@ -0,0 +1,242 @@
+import mmap
+import os
+import struct
+import zlib
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+from uuid import UUID
+import numpy as np
+from app.config import get_settings
+
+settings = get_settings()
+
+# Archived pings live in one file per device and month:
+#   {ARCHIVE_PATH}/{YYYY-MM}/{device_id}.pings
+#
+# File layout (little-endian), columnar and split into blocks of up to
+# ARCHIVE_BLOCK_ROWS pings sorted by time:
+#   header  MAGIC, version (u32), block count (u32), row count (u64)
+#   index   one BLOCK_INDEX_DTYPE record per block
+#   blocks  zlib(delta-encoded int64 microsecond timestamps), then raw 16-byte ping IDs
+# Readers mmap the file and decompress only the blocks overlapping the requested range.
+MAGIC = b"PINGARC1"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQ")
+BLOCK_INDEX_DTYPE = np.dtype([
+    ("min_ts", "<i8"),
+    ("max_ts", "<i8"),
+    ("offset", "<u8"),
+    ("rows", "<u4"),
+    ("ts_bytes", "<u4"),
+])
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_micros(value: datetime) -> int:
+    """Naive UTC datetime -> epoch microseconds"""
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=int(value))
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def next_month(value: datetime) -> datetime:
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def archive_horizon(now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Start of the oldest month still kept in Postgres.
+    Only whole months older than ARCHIVE_AFTER_DAYS are archived; None if archiving is off.
+    """
+    if not settings.ARCHIVE_ENABLED:
+        return None
+    now = now or datetime.utcnow()
+    return month_start(now - timedelta(days=settings.ARCHIVE_AFTER_DAYS))
+
+
+def archive_path(device_id: UUID, month: datetime) -> str:
+    return os.path.join(settings.ARCHIVE_PATH, f"{month:%Y-%m}", f"{device_id}.pings")
+
+
+def _read_index(buffer) -> np.ndarray:
+    magic, version, block_count, _ = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a ping archive")
+    # Slicing the mapping copies just those bytes, touching only the pages needed
+    end = HEADER.size + block_count * BLOCK_INDEX_DTYPE.itemsize
+    return np.frombuffer(buffer[HEADER.size:end], dtype=BLOCK_INDEX_DTYPE)
+
+
+def _read_block(buffer, block) -> Tuple[np.ndarray, np.ndarray]:
+    offset = int(block["offset"])
+    rows = int(block["rows"])
+    ts_end = offset + int(block["ts_bytes"])
+    deltas = np.frombuffer(zlib.decompress(buffer[offset:ts_end]), dtype="<i8")
+    ids = np.frombuffer(buffer[ts_end:ts_end + rows * 16], dtype=np.uint8).reshape(rows, 16)
+    return np.cumsum(deltas), ids
+
+
+def read_archive(
+    path: str, start: Optional[int] = None, end: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Timestamps (epoch microseconds, ascending) and ping IDs (n x 16 bytes)
+    archived in path within [start, end). Missing files read as empty.
+    """
+    empty = np.empty(0, dtype=np.int64), np.empty((0, 16), dtype=np.uint8)
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return empty
+
+    with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        index = _read_index(buffer)
+        selected = np.ones(len(index), dtype=bool)
+        if start is not None:
+            selected &= index["max_ts"] >= start
+        if end is not None:
+            selected &= index["min_ts"] < end
+
+        timestamp_parts, id_parts = [], []
+        for block in index[selected]:
+            timestamps, ids = _read_block(buffer, block)
+            keep = np.ones(len(timestamps), dtype=bool)
+            if start is not None:
+                keep &= timestamps >= start
+            if end is not None:
+                keep &= timestamps < end
+            timestamp_parts.append(timestamps[keep])
+            id_parts.append(ids[keep])
+
+    if not timestamp_parts:
+        return empty
+    return np.concatenate(timestamp_parts), np.concatenate(id_parts)
+
+
+def count_archive(path: str, start: Optional[int] = None, end: Optional[int] = None) -> int:
+    """Number of pings archived in path within [start, end), decompressing only boundary blocks"""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return 0
+
+    with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        index = _read_index(buffer)
+        lower = index["min_ts"] if start is None else np.maximum(index["min_ts"], start)
+        inside = np.ones(len(index), dtype=bool)
+        partial = np.zeros(len(index), dtype=bool)
+        if start is not None:
+            inside &= index["min_ts"] >= start
+            partial |= (index["min_ts"] < start) & (index["max_ts"] >= start)
+        if end is not None:
+            inside &= index["max_ts"] < end
+            partial |= (lower < end) & (index["max_ts"] >= end)
+
+        total = int(index["rows"][inside].sum())
+        for block in index[partial & ~inside]:
+            timestamps, _ = _read_block(buffer, block)
+            keep = np.ones(len(timestamps), dtype=bool)
+            if start is not None:
+                keep &= timestamps >= start
+            if end is not None:
+                keep &= timestamps < end
+            total += int(np.count_nonzero(keep))
+    return total
+
+
+def archive_summary(path: str) -> Tuple[int, int]:
+    """Row count and newest timestamp (epoch us) of an archive file, from its index alone"""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        index = _read_index(buffer)
+        return int(index["rows"].sum()), int(index["max_ts"].max()) if len(index) else 0
+
+
+def write_archive(path: str, ping_ids: List[UUID], timestamps: List[datetime]) -> Tuple[int, int]:
+    """
+    Add pings to an archive file, merging with what is already there.
+    Idempotent: ping IDs already archived are skipped, so a crash between
+    writing the file and deleting the rows from Postgres is harmless.
+    The file is replaced atomically. Returns the file's row count and
+    newest timestamp (epoch us).
+    """
+    new_timestamps = np.array([to_micros(ts) for ts in timestamps], dtype=np.int64)
+    new_ids = np.frombuffer(b"".join(ping_id.bytes for ping_id in ping_ids), dtype=np.uint8)
+    new_ids = new_ids.reshape(len(ping_ids), 16)
+
+    old_timestamps, old_ids = read_archive(path)
+    all_timestamps = np.concatenate([old_timestamps, new_timestamps])
+    all_ids = np.concatenate([old_ids, new_ids])
+
+    # Deduplicate on ping ID, then sort by time
+    _, unique = np.unique(all_ids.view("V16").ravel(), return_index=True)
+    order = unique[np.argsort(all_timestamps[unique], kind="stable")]
+    all_timestamps = all_timestamps[order]
+    all_ids = all_ids[order]
+
+    block_rows = settings.ARCHIVE_BLOCK_ROWS
+    block_count = (len(all_timestamps) + block_rows - 1) // block_rows
+    index = np.zeros(block_count, dtype=BLOCK_INDEX_DTYPE)
+    blocks = []
+    offset = HEADER.size + index.nbytes
+    for i in range(block_count):
+        timestamps = all_timestamps[i * block_rows:(i + 1) * block_rows]
+        ids = all_ids[i * block_rows:(i + 1) * block_rows]
+        # First delta is the absolute value; the rest are small and compress well
+        ts_data = zlib.compress(np.diff(timestamps, prepend=0).astype("<i8").tobytes(), 6)
+        index[i] = (timestamps[0], timestamps[-1], offset, len(timestamps), len(ts_data))
+        blocks.append(ts_data)
+        blocks.append(ids.tobytes())
+        offset += len(ts_data) + ids.nbytes
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, block_count, len(all_timestamps)))
+        f.write(index.tobytes())
+        for block in blocks:
+            f.write(block)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    return len(all_timestamps), int(all_timestamps[-1])
+
+
+def iter_archives(
+    start: Optional[datetime], end: datetime, device_id: Optional[UUID] = None
+) -> Iterator[Tuple[UUID, str]]:
+    """(device_id, path) of archive files for months overlapping [start, end), newest month first"""
+    try:
+        months = sorted(os.listdir(settings.ARCHIVE_PATH), reverse=True)
+    except FileNotFoundError:
+        return
+
+    first = f"{month_start(start):%Y-%m}" if start else ""
+    last = f"{end:%Y-%m}"
+    for month in months:
+        if month > last or month < first:
+            continue
+        month_dir = os.path.join(settings.ARCHIVE_PATH, month)
+        if device_id:
+            path = os.path.join(month_dir, f"{device_id}.pings")
+            if os.path.exists(path):
+                yield device_id, path
+            continue
+        for name in os.listdir(month_dir):
+            if name.endswith(".pings"):
+                yield UUID(name[:-len(".pings")]), os.path.join(month_dir, name)
+
+
+def delete_device_archives(device_id: UUID):
+    """Remove every archived month of a deleted device"""
+    for _, path in list(iter_archives(None, datetime.max, device_id)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,88 @@
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+from redis.asyncio import Redis
+from app.core.revocation import is_token_revoked, now_ms
+from app.config import get_settings
+
+settings = get_settings()
+
+# Last-known-good API key hash -> (device_id, epoch ms when last verified).
+# Only consulted when Postgres is unreachable, so devices can keep pinging
+# (and have their pings journaled) during an outage.
+_known_keys: Dict[str, Tuple[UUID, int]] = {}
+
+# Redis hash of API key hash -> device_id, last written by a worker that read
+# the keys from the database at startup, and the epoch ms it was read at.
+# Lets a worker that starts while Postgres is down fill its fallback cache.
+SNAPSHOT_KEY = "auth_fallback_keys"
+SNAPSHOT_VERIFIED_AT_KEY = "auth_fallback_keys_verified_at"
+SNAPSHOT_WRITE_CHUNK = 5000
+
+
+def remember_api_key(api_key_hash: str, device_id: UUID, verified_at: Optional[int] = None):
+    """Record a key hash that was just verified against the database"""
+    # Move to the end so the oldest entries are evicted first
+    _known_keys.pop(api_key_hash, None)
+    if len(_known_keys) >= settings.AUTH_FALLBACK_MAX_ENTRIES:
+        _known_keys.pop(next(iter(_known_keys)), None)
+    _known_keys[api_key_hash] = (device_id, verified_at or now_ms())
+
+
+def prewarm_api_keys(entries: List[Tuple[str, UUID]], verified_at: Optional[int] = None):
+    """
+    Seed the cache at startup with keys read from the database (or from
+    the Redis snapshot), most important first.
+    """
+    # Insert least important first so they are the first to be evicted
+    for api_key_hash, device_id in reversed(entries[:settings.AUTH_FALLBACK_MAX_ENTRIES]):
+        remember_api_key(api_key_hash, device_id, verified_at)
+
+
+async def save_api_key_snapshot(redis: Redis, entries: List[Tuple[str, UUID]], verified_at: int):
+    """Replace the Redis snapshot with keys just read from the database"""
+    # Build under a private name and swap it in, so readers never see a partial set
+    staging_key = f"{SNAPSHOT_KEY}:{uuid4().hex}"
+    entries = entries[:settings.AUTH_FALLBACK_MAX_ENTRIES]
+    if not entries:
+        await redis.delete(SNAPSHOT_KEY, SNAPSHOT_VERIFIED_AT_KEY)
+        return
+    try:
+        for start in range(0, len(entries), SNAPSHOT_WRITE_CHUNK):
+            chunk = entries[start:start + SNAPSHOT_WRITE_CHUNK]
+            await redis.hset(staging_key, mapping={api_key_hash: str(device_id) for api_key_hash, device_id in chunk})
+        pipe = redis.pipeline(transaction=True)
+        pipe.rename(staging_key, SNAPSHOT_KEY)
+        pipe.set(SNAPSHOT_VERIFIED_AT_KEY, verified_at)
+        await pipe.execute()
+    finally:
+        await redis.delete(staging_key)
+
+
+async def load_api_key_snapshot(redis: Redis) -> Tuple[List[Tuple[str, UUID]], Optional[int]]:
+    """Keys from the Redis snapshot and when they were verified (([], None) if there is none)"""
+    pipe = redis.pipeline(transaction=True)
+    pipe.hgetall(SNAPSHOT_KEY)
+    pipe.get(SNAPSHOT_VERIFIED_AT_KEY)
+    keys, verified_at = await pipe.execute()
+    if not keys or verified_at is None:
+        return [], None
+    return [(api_key_hash, UUID(device_id)) for api_key_hash, device_id in keys.items()], int(verified_at)
+
+
+def lookup_api_key(api_key_hash: str) -> Optional[UUID]:
+    """
+    Resolve a key hash without the database.
+    Entries older than AUTH_FALLBACK_TTL_SECONDS, or for devices whose keys
+    were rotated or revoked since they were verified, are rejected.
+    """
+    entry = _known_keys.get(api_key_hash)
+    if entry is None:
+        return None
+    device_id, verified_at = entry
+    if verified_at < now_ms() - settings.AUTH_FALLBACK_TTL_SECONDS * 1000:
+        _known_keys.pop(api_key_hash, None)
+        return None
+    if is_token_revoked(device_id, verified_at):
+        _known_keys.pop(api_key_hash, None)
+        return None
+    return device_id
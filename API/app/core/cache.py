@@ -0,0 +1,278 @@
+import asyncio
+import json
+import math
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import RedisError
+from app.core.redis import listen
+from app.core.log import get_logger
+from app.config import get_settings
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+# Redis pub/sub channel used to drop process-local entries on every worker
+INVALIDATION_CHANNEL = "cache_invalidation"
+
+# Process-local tier: key -> (expires_at monotonic, value)
+_local_cache: Dict[str, Tuple[float, Any]] = {}
+
+# In-flight loads shared by concurrent misses (singleflight)
+_inflight: Dict[str, asyncio.Task] = {}
+
+# Bumped on every invalidation of a key (and all keys on resubscribe); a load
+# that started before an invalidation must not write its result back
+_generations: Dict[str, int] = {}
+_epoch = 0
+
+_listener_task: asyncio.Task | None = None
+
+
+def device_status_key(device_id) -> str:
+    """Cache key for a single device status"""
+    return f"device_status:{device_id}"
+
+
+def _local_get(key: str) -> Optional[Any]:
+    entry = _local_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, value = entry
+    if expires_at < time.monotonic():
+        _local_cache.pop(key, None)
+        return None
+    return value
+
+
+def _generation(key: str) -> Tuple[int, int]:
+    return _epoch, _generations.get(key, 0)
+
+
+def _drop(key: str):
+    """Forget a key locally and fence off loads already in flight for it"""
+    _local_cache.pop(key, None)
+    _generations[key] = _generations.get(key, 0) + 1
+    # Later readers start a fresh load instead of joining the stale one
+    _inflight.pop(key, None)
+
+
+def _local_set(key: str, value: Any):
+    if settings.LOCAL_CACHE_TTL_SECONDS <= 0:
+        return
+    # Evict the oldest entry when full (dicts keep insertion order)
+    if key not in _local_cache and len(_local_cache) >= settings.LOCAL_CACHE_MAX_ENTRIES:
+        _local_cache.pop(next(iter(_local_cache)), None)
+    _local_cache[key] = (time.monotonic() + settings.LOCAL_CACHE_TTL_SECONDS, value)
+
+
+def _should_refresh_early(envelope: dict) -> bool:
+    """
+    Probabilistic early expiration (XFetch).
+    The closer an entry is to expiry, and the slower it was to compute,
+    the more likely a reader recomputes it ahead of time, so expiry does not
+    send every reader to the database at once.
+    """
+    delta = envelope.get("delta", 0)
+    expiry = envelope.get("expiry", 0)
+    beta = settings.CACHE_EARLY_REFRESH_BETA
+    return time.time() - delta * beta * math.log(1.0 - random.random()) >= expiry
+
+
+async def _load(
+    redis: Redis,
+    key: str,
+    loader: Callable[[], Awaitable[Optional[Any]]],
+    ttl: int,
+) -> Optional[Any]:
+    """
+    Read through Redis, falling back to the loader on a miss or Redis outage.
+    If the key is invalidated while this runs, the result is returned to the
+    callers already waiting but not cached: it may predate the change.
+    """
+    generation = _generation(key)
+    try:
+        cached = await redis.get(key)
+    except RedisError as e:
+        logger.warning("cache_read_failed", extra={"key": key, "error": str(e)})
+        cached = None
+    if cached:
+        envelope = json.loads(cached)
+        if not _should_refresh_early(envelope):
+            if _generation(key) == generation:
+                _local_set(key, envelope["value"])
+            return envelope["value"]
+
+    started = time.time()
+    value = await loader()
+    if value is None or _generation(key) != generation:
+        return value
+
+    envelope = {
+        "value": value,
+        "delta": time.time() - started,
+        "expiry": time.time() + ttl,
+    }
+    try:
+        await redis.setex(key, ttl, json.dumps(envelope))
+    except RedisError as e:
+        logger.warning("cache_write_failed", extra={"key": key, "error": str(e)})
+    _local_set(key, value)
+    return value
+
+
+async def get_or_load(
+    redis: Redis,
+    key: str,
+    loader: Callable[[], Awaitable[Optional[Any]]],
+    ttl: Optional[int] = None,
+) -> Optional[Any]:
+    """
+    Get a JSON-serializable value from the process-local cache, then Redis,
+    then the loader. Concurrent misses for the same key share one load.
+    None results are not cached.
+    """
+    value = _local_get(key)
+    if value is not None:
+        return value
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(
+            _load(redis, key, loader, ttl or settings.REDIS_CACHE_TTL)
+        )
+        _inflight[key] = task
+        task.add_done_callback(lambda done: _inflight.pop(key) if _inflight.get(key) is done else None)
+
+    # Shield so one cancelled request does not fail the others waiting on it
+    return await asyncio.shield(task)
+
+
+async def get_many_or_load(
+    redis: Redis,
+    keys: List[str],
+    loader: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+    ttl: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Batched get_or_load: the process-local cache, then one Redis MGET, then
+    a single loader call for all misses, written back in one pipeline.
+    The loader gets the missing keys and returns {key: value} for those it
+    found. Returns {key: value} for every key that has a value.
+    """
+    ttl = ttl or settings.REDIS_CACHE_TTL
+    found: Dict[str, Any] = {}
+    remote = []
+    for key in dict.fromkeys(keys):
+        value = _local_get(key)
+        if value is not None:
+            found[key] = value
+        else:
+            remote.append(key)
+    if not remote:
+        return found
+    generations = {key: _generation(key) for key in remote}
+
+    try:
+        cached = await redis.mget(remote)
+    except RedisError as e:
+        logger.warning("cache_read_failed", extra={"keys": len(remote), "error": str(e)})
+        cached = [None] * len(remote)
+
+    missing = []
+    for key, raw in zip(remote, cached):
+        if raw:
+            envelope = json.loads(raw)
+            if not _should_refresh_early(envelope):
+                if _generation(key) == generations[key]:
+                    _local_set(key, envelope["value"])
+                found[key] = envelope["value"]
+                continue
+        missing.append(key)
+    if not missing:
+        return found
+
+    started = time.time()
+    loaded = await loader(missing)
+    if not loaded:
+        return found
+
+    found.update(loaded)
+    # Don't cache keys invalidated while loading
+    fresh = {key: value for key, value in loaded.items() if _generation(key) == generations[key]}
+    if not fresh:
+        return found
+
+    delta = time.time() - started
+    expiry = time.time() + ttl
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for key, value in fresh.items():
+            pipe.setex(key, ttl, json.dumps({"value": value, "delta": delta, "expiry": expiry}))
+        await pipe.execute()
+    except RedisError as e:
+        logger.warning("cache_write_failed", extra={"keys": len(fresh), "error": str(e)})
+    for key, value in fresh.items():
+        _local_set(key, value)
+    return found
+
+
+async def invalidate(redis: Redis, *keys: str):
+    """
+    Delete keys from Redis and tell every worker to drop its local copy.
+    Failures are logged, not raised: the write that triggered the
+    invalidation has already succeeded, and entries expire on their own.
+    """
+    if not keys:
+        return
+    try:
+        pipe = redis.pipeline(transaction=False)
+        queue_invalidation(pipe, *keys)
+        await pipe.execute()
+    except RedisError as e:
+        logger.warning("cache_invalidation_failed", extra={"keys": len(keys), "error": str(e)})
+
+
+def queue_invalidation(pipe: Pipeline, *keys: str):
+    """Drop local copies now and add the Redis side of invalidate() to a caller's pipeline"""
+    for key in keys:
+        _drop(key)
+    pipe.delete(*keys)
+    pipe.publish(INVALIDATION_CHANNEL, json.dumps(list(keys)))
+
+
+def _on_invalidation(data: str):
+    """Drop local entries named in an invalidation message"""
+    for key in json.loads(data):
+        _drop(key)
+
+
+async def _on_subscribe():
+    # Messages may have been missed while (re)connecting
+    global _epoch
+    _epoch += 1
+    _local_cache.clear()
+
+
+async def start_cache_listener(redis: Redis):
+    """Start listening for cache invalidations from other workers"""
+    global _listener_task
+    _listener_task = asyncio.create_task(
+        listen(redis, INVALIDATION_CHANNEL, _on_invalidation, _on_subscribe)
+    )
+
+
+async def stop_cache_listener():
+    """Stop the cache invalidation listener"""
+    global _listener_task
+    if _listener_task:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
+    _local_cache.clear()
+    _generations.clear()
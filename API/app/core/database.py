@@ -1,8 +1,15 @@
+import asyncio
+import os
+from functools import lru_cache
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError, ProgrammingError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from app.core.log import get_logger
 from app.config import get_settings
 
 settings = get_settings()
+logger = get_logger(__name__)
 
 # Create async engine
 engine = create_async_engine(
@@ -22,6 +29,68 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+
+class ReplicaSession(AsyncSession):
+    """
+    Session on the read replica. If the replica fails mid-request, the
+    failing read is retried once on the primary (and so is the rest of the
+    session) instead of failing the request.
+    """
+
+    async def execute(self, *args, **kwargs):
+        return await self._with_fallback(super().execute, *args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        return await self._with_fallback(super().get, *args, **kwargs)
+
+    async def _with_fallback(self, call, *args, **kwargs):
+        try:
+            return await call(*args, **kwargs)
+        except Exception as e:
+            if self.bind is not read_engine or not is_db_unavailable(e):
+                raise
+            # Stop routing to the replica until the monitor sees it recover
+            global _replica_usable
+            _replica_usable = False
+            logger.warning("read_replica_failed_over", extra={"error": str(e)})
+        await self.close()
+        self.bind = engine
+        self.sync_session.bind = engine.sync_engine
+        return await call(*args, **kwargs)
+
+
+# Optional read replica with its own pool, so read-heavy endpoints
+# can't starve the ping write path of connections
+read_engine = None
+ReadSessionLocal = None
+if settings.DATABASE_READ_URL:
+    read_engine = create_async_engine(
+        settings.DATABASE_READ_URL,
+        echo=settings.DB_ECHO,
+        pool_pre_ping=True,
+        pool_size=settings.DB_READ_POOL_SIZE,
+        max_overflow=settings.DB_READ_MAX_OVERFLOW,
+    )
+    ReadSessionLocal = async_sessionmaker(
+        read_engine,
+        class_=ReplicaSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+
+# Whether reads may currently go to the replica (kept up to date by the monitor)
+_replica_usable = False
+_replica_monitor_task: asyncio.Task | None = None
+
+REPLICA_LAG_QUERY = text("""
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+""")
+
 # Base class for models
 Base = declarative_base()
 
@@ -35,7 +104,111 @@ async def get_db():
             await session.close()
 
 
-async def init_db():
-    """Initialize database tables"""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+def read_session() -> AsyncSession:
+    """
+    A new read-only session: on the replica when configured, reachable and
+    within DB_READ_MAX_LAG_SECONDS, otherwise on the primary.
+    """
+    session_factory = ReadSessionLocal if _replica_usable else AsyncSessionLocal
+    return session_factory()
+
+
+async def get_read_db():
+    """Dependency for a read-only session (see read_session)"""
+    async with read_session() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+async def _check_replica() -> bool:
+    """Whether the replica is reachable and within the staleness bound"""
+    try:
+        async with read_engine.connect() as conn:
+            result = await conn.execute(REPLICA_LAG_QUERY)
+            lag_seconds = float(result.scalar() or 0)
+    except Exception as e:
+        logger.warning("read_replica_unavailable", extra={"error": str(e)})
+        return False
+
+    if lag_seconds > settings.DB_READ_MAX_LAG_SECONDS:
+        logger.warning("read_replica_lagging", extra={"lag_seconds": round(lag_seconds, 1)})
+        return False
+    return True
+
+
+async def _monitor_replica():
+    global _replica_usable
+    while True:
+        _replica_usable = await _check_replica()
+        await asyncio.sleep(settings.DB_READ_CHECK_INTERVAL_SECONDS)
+
+
+async def start_replica_monitor():
+    """Start tracking replica health and lag (no-op without DATABASE_READ_URL)"""
+    global _replica_monitor_task, _replica_usable
+    if read_engine is None:
+        return
+    _replica_usable = await _check_replica()
+    _replica_monitor_task = asyncio.create_task(_monitor_replica())
+
+
+async def stop_replica_monitor():
+    """Stop the replica monitor and close the replica pool"""
+    global _replica_monitor_task
+    if _replica_monitor_task:
+        _replica_monitor_task.cancel()
+        try:
+            await _replica_monitor_task
+        except asyncio.CancelledError:
+            pass
+        _replica_monitor_task = None
+    if read_engine is not None:
+        await read_engine.dispose()
+
+
+@lru_cache()
+def expected_schema_revision() -> str:
+    """Alembic head revision this code was written against"""
+    from alembic.script import ScriptDirectory
+
+    alembic_dir = os.path.join(os.path.dirname(__file__), "..", "..", "alembic")
+    return ScriptDirectory(os.path.realpath(alembic_dir)).get_current_head()
+
+
+async def check_schema_revision():
+    """
+    Fail fast unless the database is at the expected Alembic revision.
+    A single-row lookup instead of create_all, so workers start quickly and
+    never race to create tables; migrations run once per deploy via
+    `alembic upgrade head`. If Postgres is unreachable the check is skipped,
+    so the worker can still start and journal pings.
+    """
+    expected = await asyncio.to_thread(expected_schema_revision)
+    try:
+        async with engine.connect() as conn:
+            try:
+                result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+                current = list(result.scalars().all())
+            except ProgrammingError:
+                current = []
+    except Exception as e:
+        if not is_db_unavailable(e):
+            raise
+        logger.warning("schema_check_skipped", extra={"error": str(e)})
+        return
+
+    if current != [expected]:
+        found = ", ".join(current) or "none"
+        raise RuntimeError(
+            f"Database schema revision is {found}, expected {expected}. "
+            "Run `alembic upgrade head` before starting the API."
+        )
+
+
+def is_db_unavailable(error: Exception) -> bool:
+    """Whether an exception means Postgres is unreachable (as opposed to a bad query)"""
+    if isinstance(error, (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
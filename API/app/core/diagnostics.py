@@ -0,0 +1,166 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Coroutine, Dict, Optional, Set
+from app.config import get_settings
+
+settings = get_settings()
+
+# Fire-and-forget tasks (e.g. failed-auth alerts). Holding a reference keeps
+# them from being garbage collected mid-flight and lets diagnostics count them.
+_background_tasks: Set[asyncio.Task] = set()
+
+# Recent event-loop lag samples in seconds
+_lag_samples: deque = deque(maxlen=120)
+_lag_monitor_task: asyncio.Task | None = None
+
+# The worker's event loop thread, sampled by the profiler
+_loop_thread_id: Optional[int] = None
+
+# One profile per worker at a time
+_profile_lock = asyncio.Lock()
+
+
+def spawn(coro: Coroutine, name: str) -> asyncio.Task:
+    """Run a coroutine in the background without awaiting it"""
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def _monitor_loop_lag():
+    """Measure how late the loop wakes a sleeper; that delay is time spent blocked"""
+    interval = settings.LOOP_LAG_CHECK_INTERVAL_SECONDS
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        _lag_samples.append(max(0.0, time.perf_counter() - started - interval))
+
+
+def loop_stats() -> Dict:
+    """Event-loop lag and task counts for this worker"""
+    samples = sorted(_lag_samples)
+    background = Counter(task.get_name() for task in _background_tasks)
+    return {
+        "pid": os.getpid(),
+        "lag_ms": {
+            "last": round(_lag_samples[-1] * 1000, 2) if samples else None,
+            "p50": round(samples[len(samples) // 2] * 1000, 2) if samples else None,
+            "p99": round(samples[int(len(samples) * 0.99)] * 1000, 2) if samples else None,
+            "max": round(samples[-1] * 1000, 2) if samples else None,
+            "samples": len(samples),
+        },
+        "tasks": len(asyncio.all_tasks()),
+        "background_tasks": len(_background_tasks),
+        "background_tasks_by_name": dict(background),
+    }
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> str:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+def _sample_stacks(seconds: float, interval: float, all_threads: bool) -> Counter:
+    """
+    Sample thread stacks every interval for seconds, counting identical stacks.
+    Runs in its own thread so the loop thread is observed, not blocked.
+    """
+    me = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks: Counter = Counter()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            if thread_id == _loop_thread_id:
+                stacks[_collapse(frame)] += 1
+            elif all_threads:
+                stacks[f"{names.get(thread_id, thread_id)};{_collapse(frame)}"] += 1
+        time.sleep(interval)
+    return stacks
+
+
+async def sample_profile(seconds: float, all_threads: bool = False) -> str:
+    """
+    Sampling profile of this worker as collapsed stacks
+    ("frame;frame;frame count" per line), ready for flamegraph.pl or speedscope.
+    Time the loop spends idle shows up under the selector's select()/poll().
+    """
+    interval = settings.PROFILE_SAMPLE_INTERVAL_MS / 1000
+    async with _profile_lock:
+        # A dedicated thread, so a busy default executor can't delay sampling
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+
+        def run():
+            try:
+                result = _sample_stacks(seconds, interval, all_threads)
+            except Exception as e:
+                loop.call_soon_threadsafe(done.set_exception, e)
+            else:
+                loop.call_soon_threadsafe(done.set_result, result)
+
+        threading.Thread(target=run, name="profile-sampler", daemon=True).start()
+        stacks = await done
+
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+
+
+async def cprofile(seconds: float, sort: str = "cumulative", limit: int = 100) -> str:
+    """
+    Deterministic cProfile of everything the event loop runs for seconds,
+    as pstats text. Slows the worker noticeably while running.
+    """
+    async with _profile_lock:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats(sort).print_stats(limit)
+    return output.getvalue()
+
+
+def is_profiling() -> bool:
+    return _profile_lock.locked()
+
+
+async def start_loop_monitor():
+    """Start measuring event-loop lag"""
+    global _lag_monitor_task, _loop_thread_id
+    _loop_thread_id = threading.get_ident()
+    _lag_monitor_task = asyncio.create_task(_monitor_loop_lag(), name="loop_lag_monitor")
+
+
+async def stop_loop_monitor():
+    """Stop the loop lag monitor and wait briefly for background tasks"""
+    global _lag_monitor_task
+    if _lag_monitor_task:
+        _lag_monitor_task.cancel()
+        try:
+            await _lag_monitor_task
+        except asyncio.CancelledError:
+            pass
+        _lag_monitor_task = None
+    if _background_tasks:
+        await asyncio.wait(list(_background_tasks), timeout=5)
@@ -1,9 +1,11 @@
 import aiosmtplib
 from email.message import EmailMessage
 from datetime import datetime
+from app.core.log import get_logger
 from app.config import get_settings
 
 settings = get_settings()
+logger = get_logger(__name__)
 
 
 async def send_failed_auth_alert(
@@ -57,4 +59,4 @@ Status Indicator API
         )
     except Exception as e:
         # Don't crash the API if email fails, just log it
-        print(f"Failed to send email alert: {e}")
+        logger.error("auth_alert_email_failed", extra={"error": str(e)})
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+from uuid import UUID
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from app.core.log import get_logger
+from app.config import get_settings
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+# Redis list of journaled pings, used while only Postgres is down
+JOURNAL_KEY = "ping_journal"
+
+# Redis list of journaled pings that could not be replayed for a reason other
+# than Postgres being down (e.g. malformed), kept for inspection
+DEAD_LETTER_KEY = "ping_journal:dead"
+
+# Epoch seconds until which the checker must not mark devices offline
+DEGRADED_UNTIL_KEY = "ping_journal:degraded_until"
+
+# Set locally when Redis was unreachable too, so this worker still knows
+_degraded_until: float = 0
+
+
+def _mark_degraded():
+    global _degraded_until
+    _degraded_until = time.time() + settings.OFFLINE_THRESHOLD_MINUTES * 60
+
+
+def _append_to_file(line: str, path: Optional[str] = None):
+    path = path or settings.PING_JOURNAL_PATH
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+async def journal_ping(redis: Optional[Redis], ping_id: UUID, device_id: UUID, ping_timestamp: datetime):
+    """
+    Record a ping that could not be written to Postgres.
+    Goes to a Redis list when Redis is reachable, otherwise to the local
+    append-only journal file. Either way it is replayed once Postgres is back.
+    """
+    entry = json.dumps({
+        "ping_id": str(ping_id),
+        "device_id": str(device_id),
+        "ping_timestamp": ping_timestamp.isoformat(),
+    })
+    _mark_degraded()
+
+    if redis:
+        try:
+            pipe = redis.pipeline(transaction=False)
+            pipe.rpush(JOURNAL_KEY, entry)
+            pipe.set(DEGRADED_UNTIL_KEY, int(_degraded_until))
+            await pipe.execute()
+            return
+        except RedisError as e:
+            logger.warning("journal_redis_unavailable", extra={"error": str(e)})
+
+    await asyncio.to_thread(_append_to_file, entry)
+
+
+async def is_degraded(redis: Optional[Redis]) -> bool:
+    """Whether pings were journaled recently (on any worker)"""
+    if _degraded_until > time.time():
+        return True
+    if redis:
+        try:
+            degraded_until = await redis.get(DEGRADED_UNTIL_KEY)
+            return degraded_until is not None and float(degraded_until) > time.time()
+        except RedisError:
+            # Can't tell; err on the side of not marking devices offline
+            return True
+    return False
+
+
+async def pop_redis_entries(redis: Redis, count: int) -> List[dict]:
+    """Atomically take up to count journaled pings from Redis"""
+    entries = await redis.lpop(JOURNAL_KEY, count)
+    return [json.loads(entry) for entry in entries or []]
+
+
+async def restore_redis_entries(redis: Redis, entries: List[dict]):
+    """
+    Put entries back at the head of the Redis journal after a failed replay,
+    or in the local journal file if Redis has gone away meanwhile.
+    """
+    if not entries:
+        return
+    try:
+        await redis.lpush(JOURNAL_KEY, *[json.dumps(entry) for entry in reversed(entries)])
+    except RedisError as e:
+        logger.warning("journal_restore_to_file", extra={"entries": len(entries), "error": str(e)})
+        await asyncio.to_thread(_append_to_file, "\n".join(json.dumps(entry) for entry in entries))
+
+
+async def dead_letter_entries(redis: Optional[Redis], entries: List[dict]):
+    """
+    Set aside journaled pings that cannot be replayed, in a Redis list or,
+    without Redis, a .dead file next to the journal.
+    """
+    lines = [json.dumps(entry) for entry in entries]
+    if redis:
+        try:
+            await redis.rpush(DEAD_LETTER_KEY, *lines)
+            return
+        except RedisError as e:
+            logger.warning("journal_redis_unavailable", extra={"error": str(e)})
+    await asyncio.to_thread(_append_to_file, "\n".join(lines), f"{settings.PING_JOURNAL_PATH}.dead")
+
+
+def _claim_file() -> Optional[str]:
+    # Renaming is atomic and new pings start a fresh file in the meantime.
+    # A claimed file left by an interrupted replay is picked up again; replay
+    # is idempotent (ping IDs are primary keys), so overlapping workers are harmless
+    claimed = f"{settings.PING_JOURNAL_PATH}.replaying"
+    if not os.path.exists(claimed):
+        try:
+            os.rename(settings.PING_JOURNAL_PATH, claimed)
+        except FileNotFoundError:
+            return None
+    return claimed
+
+
+def _read_file(path: str) -> List[dict]:
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # e.g. torn by a crash mid-write; set aside rather than block the replay
+                _append_to_file(line, f"{settings.PING_JOURNAL_PATH}.dead")
+    return entries
+
+
+async def claim_file_entries() -> Tuple[Optional[str], List[dict]]:
+    """
+    Claim the local journal file for replay.
+    Returns the claimed path (delete it with release_file once replayed) and its entries.
+    """
+    path = await asyncio.to_thread(_claim_file)
+    if path is None:
+        return None, []
+    return path, await asyncio.to_thread(_read_file, path)
+
+
+async def release_file(path: str):
+    """Delete a claimed journal file after a successful replay"""
+    try:
+        await asyncio.to_thread(os.remove, path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,57 @@
+import base64
+import json
+import sys
+from typing import Any, List
+from sqlalchemy import and_, func
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of the last returned row as an opaque cursor"""
+    raw = json.dumps([str(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str, size: int) -> List[str]:
+    """
+    Decode a cursor produced by encode_cursor.
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+    # encode_cursor only ever writes strings; anything else would fail later
+    # in UUID() or fromisoformat() with a TypeError instead of a 400
+    if (
+        not isinstance(values, list)
+        or len(values) != size
+        or not all(isinstance(value, str) for value in values)
+    ):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _next_code_point(char: str) -> str:
+    code_point = ord(char) + 1
+    if 0xD800 <= code_point <= 0xDFFF:
+        # Surrogates can't be encoded for Postgres; skip past them
+        code_point = 0xE000
+    return chr(code_point)
+
+
+def name_prefix_filter(column, prefix: str):
+    """
+    Case-insensitive prefix match on column.
+    Written as a range with the pattern operators (~>=~, ~<~) rather than
+    LIKE, so the lower(column) text_pattern_ops index is used even when the
+    prefix arrives as a bind parameter in a generic plan.
+    """
+    lowered = prefix.lower()
+    expression = func.lower(column)
+    # U+10FFFF has no successor: bump the last character before the run of them
+    stem = lowered.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return expression.op("~>=~")(lowered)
+    upper_bound = stem[:-1] + _next_code_point(stem[-1])
+    return and_(expression.op("~>=~")(lowered), expression.op("~<~")(upper_bound))
@@ -1,7 +1,11 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
 from redis.asyncio import Redis
+from app.core.log import get_logger
 from app.config import get_settings
 
 settings = get_settings()
+logger = get_logger(__name__)
 
 redis_client: Redis | None = None
 
@@ -26,3 +30,32 @@ async def close_redis():
     global redis_client
     if redis_client:
         await redis_client.close()
+
+
+async def listen(
+    redis: Redis,
+    channel: str,
+    on_message: Callable[[str], None],
+    on_subscribe: Optional[Callable[[], Awaitable[None]]] = None,
+):
+    """
+    Subscribe to a pub/sub channel and pass each message to on_message.
+    Reconnects on errors; on_subscribe runs after every (re)subscribe so
+    callers can resync state that may have been missed. Runs until cancelled.
+    """
+    while True:
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            if on_subscribe:
+                await on_subscribe()
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    on_message(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("redis_listener_error", extra={"channel": channel, "error": str(e)})
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.close()
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import time
+from typing import Dict
+from uuid import UUID
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from app.core.redis import listen
+from app.core.log import get_logger
+from app.config import get_settings
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+# Redis hash of device_id -> epoch milliseconds; tokens (and fallback auth
+# entries) issued or verified at or before it are rejected. Milliseconds, so a
+# token issued just after a revocation is not caught by it.
+REVOCATIONS_KEY = "device_token_revocations"
+REVOCATION_CHANNEL = "device_token_revocations"
+
+# How often revocations nothing valid can predate are dropped
+PRUNE_INTERVAL_SECONDS = 300
+
+# Deletes the entries older than ARGV[1] in one step, so a revocation
+# written meanwhile is never removed
+PRUNE_SCRIPT = """
+local entries = redis.call('hgetall', KEYS[1])
+local removed = 0
+for i = 1, #entries, 2 do
+    if tonumber(entries[i + 1]) < tonumber(ARGV[1]) then
+        removed = removed + redis.call('hdel', KEYS[1], entries[i])
+    end
+end
+return removed
+"""
+
+# Process-local copy of the revocation hash, checked on every token-authenticated ping
+_revoked_before: Dict[str, int] = {}
+
+_listener_task: asyncio.Task | None = None
+_prune_task: asyncio.Task | None = None
+
+
+def now_ms() -> int:
+    """Current time in epoch milliseconds, the unit of revocation and issue times"""
+    return time.time_ns() // 1_000_000
+
+
+def is_token_revoked(device_id: UUID, issued_at: int) -> bool:
+    """Check a token against the in-memory revocation set (no I/O)"""
+    revoked_at = _revoked_before.get(str(device_id))
+    return revoked_at is not None and issued_at <= revoked_at
+
+
+async def revoke_device_tokens(redis: Redis, *device_ids: UUID):
+    """Reject every token issued so far for the given devices, on all workers"""
+    if not device_ids:
+        return
+    pipe = redis.pipeline(transaction=False)
+    queue_revocation(pipe, *device_ids)
+    await pipe.execute()
+
+
+def queue_revocation(pipe: Pipeline, *device_ids: UUID):
+    """Revoke locally now and add the Redis side of revoke_device_tokens() to a caller's pipeline"""
+    revoked_at = now_ms()
+    entries = {str(device_id): revoked_at for device_id in device_ids}
+    _revoked_before.update(entries)
+    pipe.hset(REVOCATIONS_KEY, mapping=entries)
+    pipe.publish(REVOCATION_CHANNEL, json.dumps(entries))
+
+
+def _oldest_valid() -> int:
+    """Epoch ms before which no token or fallback auth entry is still accepted"""
+    retention = max(settings.DEVICE_TOKEN_EXPIRE_MINUTES * 60, settings.AUTH_FALLBACK_TTL_SECONDS)
+    return now_ms() - retention * 1000
+
+
+async def _sync_revocations(redis: Redis):
+    """Merge the revocation hash from Redis into the local set, pruning entries nothing valid can predate"""
+    oldest_valid = _oldest_valid()
+    await redis.eval(PRUNE_SCRIPT, 1, REVOCATIONS_KEY, oldest_valid)
+    entries = await redis.hgetall(REVOCATIONS_KEY)
+
+    # Merged rather than replaced, so a revocation received while reading is kept
+    for device_id, revoked_at in entries.items():
+        _on_revocation_entry(device_id, int(revoked_at))
+    for device_id in [device_id for device_id, revoked_at in _revoked_before.items() if revoked_at < oldest_valid]:
+        del _revoked_before[device_id]
+
+
+async def _prune_revocations(redis: Redis):
+    """Periodically drop expired revocations, locally and in Redis"""
+    while True:
+        await asyncio.sleep(PRUNE_INTERVAL_SECONDS)
+        try:
+            await _sync_revocations(redis)
+        except Exception as e:
+            logger.warning("revocation_prune_failed", extra={"error": str(e)})
+
+
+def _on_revocation_entry(device_id: str, revoked_at: int):
+    _revoked_before[device_id] = max(revoked_at, _revoked_before.get(device_id, 0))
+
+
+def _on_revocation(data: str):
+    for device_id, revoked_at in json.loads(data).items():
+        _on_revocation_entry(device_id, revoked_at)
+
+
+async def start_revocation_listener(redis: Redis):
+    """Load the revocation set and keep it in sync with other workers"""
+    global _listener_task, _prune_task
+    await _sync_revocations(redis)
+    _listener_task = asyncio.create_task(
+        listen(redis, REVOCATION_CHANNEL, _on_revocation, lambda: _sync_revocations(redis))
+    )
+    _prune_task = asyncio.create_task(_prune_revocations(redis))
+
+
+async def stop_revocation_listener():
+    """Stop the revocation listener"""
+    global _listener_task, _prune_task
+    for task in (_listener_task, _prune_task):
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    _listener_task = None
+    _prune_task = None
@@ -1,7 +1,15 @@
 import secrets
 import hashlib
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+from uuid import UUID
+from jose import jwt
+from app.core.revocation import now_ms
+from app.config import get_settings
+
+settings = get_settings()
+
+DEVICE_TOKEN_ALGORITHM = "HS256"
 
 
 def generate_api_key(length: int = 32) -> str:
@@ -17,3 +25,27 @@ def hash_api_key(api_key: str) -> str:
 def verify_api_key(plain_key: str, hashed_key: str) -> bool:
     """Verify an API key against its hash"""
     return hash_api_key(plain_key) == hashed_key
+
+
+def create_device_token(device_id: UUID) -> Tuple[str, datetime]:
+    """Create a short-lived signed token for a device, returning it with its expiry"""
+    issued_at_ms = now_ms()
+    issued_at = datetime(1970, 1, 1) + timedelta(milliseconds=issued_at_ms)
+    expires_at = issued_at + timedelta(minutes=settings.DEVICE_TOKEN_EXPIRE_MINUTES)
+    payload = {
+        "sub": str(device_id),
+        # NumericDate may be fractional; milliseconds match revocation times
+        "iat": issued_at_ms / 1000,
+        "exp": int((expires_at - datetime(1970, 1, 1)).total_seconds()),
+    }
+    token = jwt.encode(payload, settings.SECRET_KEY, algorithm=DEVICE_TOKEN_ALGORITHM)
+    return token, expires_at
+
+
+def decode_device_token(token: str) -> Tuple[UUID, int]:
+    """
+    Verify a device token's signature and expiry, returning (device_id, issued_at in epoch ms).
+    Raises jose.JWTError (ExpiredSignatureError when expired) or ValueError.
+    """
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[DEVICE_TOKEN_ALGORITHM])
+    return UUID(payload["sub"]), round(float(payload["iat"]) * 1000)
@@ -0,0 +1,61 @@
+import os
+import time
+from typing import Awaitable, Dict, Optional, TypeVar
+from app.core.log import get_logger
+
+T = TypeVar("T")
+logger = get_logger(__name__)
+
+
+def _process_start_time() -> float:
+    """Epoch seconds when this process started (Linux /proc), else now"""
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the command name, which may itself contain spaces
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/stat") as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot_time + int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return time.time()
+
+
+PROCESS_STARTED_AT = _process_start_time()
+
+# Startup step -> seconds taken
+_steps: Dict[str, float] = {}
+_ready_seconds: Optional[float] = None
+_first_health_seconds: Optional[float] = None
+
+
+async def timed(step: str, awaitable: Awaitable[T]) -> T:
+    """Await one startup step, recording how long it took"""
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        _steps[step] = time.perf_counter() - started
+
+
+def mark_ready():
+    """Lifespan startup finished; the worker is about to accept requests"""
+    global _ready_seconds
+    _ready_seconds = time.time() - PROCESS_STARTED_AT
+    logger.info("worker_ready", extra={"pid": os.getpid(), **startup_report()})
+
+
+def mark_health():
+    """Record the first /health served, the end-to-end cold start time"""
+    global _first_health_seconds
+    if _first_health_seconds is None and _ready_seconds is not None:
+        _first_health_seconds = time.time() - PROCESS_STARTED_AT
+
+
+def startup_report() -> Dict:
+    return {
+        "ready_seconds": round(_ready_seconds, 3) if _ready_seconds is not None else None,
+        "first_health_seconds": (
+            round(_first_health_seconds, 3) if _first_health_seconds is not None else None
+        ),
+        "steps_ms": {step: round(seconds * 1000, 1) for step, seconds in _steps.items()},
+    }
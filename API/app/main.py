@@ -1,26 +1,90 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import Depends, FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession
 from contextlib import asynccontextmanager
 from datetime import datetime
 from app.config import get_settings
-from app.core.database import init_db
-from app.core.redis import init_redis, close_redis
-from app.api.routes import devices, ping, status, history
+from app.core.log import get_logger, setup_logging, stop_logging
+from app.core.database import (
+    AsyncSessionLocal,
+    check_schema_revision,
+    get_read_db,
+    is_db_unavailable,
+    start_replica_monitor,
+    stop_replica_monitor,
+)
+from app.core.redis import init_redis, close_redis, get_redis
+from app.core.cache import start_cache_listener, stop_cache_listener
+from app.core.revocation import now_ms, start_revocation_listener, stop_revocation_listener
+from app.core.admission import admission_stats
+from app.api.middleware.admission import AdmissionControlMiddleware
+from app.api.middleware.request_log import RequestLogMiddleware
+from app.core.diagnostics import start_loop_monitor, stop_loop_monitor
+from app.core.auth_cache import load_api_key_snapshot, prewarm_api_keys, save_api_key_snapshot
+from app.core.startup import timed, mark_ready, mark_health, startup_report
+from app.services.device_service import DeviceService
+from app.services.status_service import StatusService
+from app.api.routes import devices, groups, ping, status, history, webhooks, diagnostics
 from app.tasks.status_checker import start_status_checker, stop_status_checker
+from app.tasks.device_cleanup import stop_device_cleanup
+from app.tasks.webhook_dispatcher import start_webhook_dispatcher, stop_webhook_dispatcher
 
 settings = get_settings()
+setup_logging()
+logger = get_logger(__name__)
+
+
+async def prewarm_auth_cache(redis):
+    """
+    Load recently active API keys into the outage fallback cache and publish
+    them to Redis. If Postgres is down, load the last published snapshot
+    instead, so a worker started during an outage can still accept pings.
+    """
+    verified_at = now_ms()
+    try:
+        async with AsyncSessionLocal() as session:
+            entries = await DeviceService(session).get_recent_api_keys(settings.AUTH_FALLBACK_MAX_ENTRIES)
+    except Exception as e:
+        if not is_db_unavailable(e):
+            raise
+        entries, verified_at = await load_api_key_snapshot(redis)
+        logger.warning("auth_cache_from_snapshot", extra={"entries": len(entries)})
+        prewarm_api_keys(entries, verified_at)
+        return
+    prewarm_api_keys(entries, verified_at)
+    await save_api_key_snapshot(redis, entries, verified_at)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
-    # Startup
-    await init_redis()
-    await init_db()
-    await start_status_checker()
+    # Startup: independent steps run concurrently, each one timed
+    await start_loop_monitor()
+    await asyncio.gather(
+        timed("redis", init_redis()),
+        timed("schema_check", check_schema_revision()),
+    )
+    redis = await get_redis()
+    await asyncio.gather(
+        timed("cache_listener", start_cache_listener(redis)),
+        timed("revocations", start_revocation_listener(redis)),
+        timed("replica_monitor", start_replica_monitor()),
+        timed("auth_cache", prewarm_auth_cache(redis)),
+    )
+    await timed("scheduler", start_status_checker())
+    await timed("webhooks", start_webhook_dispatcher(redis))
+    mark_ready()
     yield
     # Shutdown
     await stop_status_checker()
+    await stop_webhook_dispatcher()
+    await stop_device_cleanup()
+    await stop_revocation_listener()
+    await stop_cache_listener()
+    await stop_replica_monitor()
     await close_redis()
+    await stop_loop_monitor()
+    stop_logging()
 
 
 app = FastAPI(
@@ -30,23 +94,51 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+# Outermost, so shed requests are logged and carry a request ID too
+app.add_middleware(RequestLogMiddleware)
+
 # Include routers
 app.include_router(
     devices.router, prefix=f"/api/{settings.API_VERSION}", tags=["devices"]
 )
+app.include_router(
+    groups.router, prefix=f"/api/{settings.API_VERSION}", tags=["groups"]
+)
 app.include_router(ping.router, prefix=f"/api/{settings.API_VERSION}", tags=["ping"])
 app.include_router(
     status.router, prefix=f"/api/{settings.API_VERSION}", tags=["status"]
 )
+app.include_router(
+    webhooks.router, prefix=f"/api/{settings.API_VERSION}", tags=["webhooks"]
+)
 app.include_router(
     history.router, prefix=f"/api/{settings.API_VERSION}", tags=["history"]
 )
+app.include_router(
+    diagnostics.router, prefix=f"/api/{settings.API_VERSION}", tags=["diagnostics"]
+)
 
 
 @app.get("/health")
-async def health_check():
+async def health_check(db: AsyncSession = Depends(get_read_db)):
     """Health check endpoint"""
-    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+    mark_health()
+    try:
+        fleet = await StatusService(db, None).get_fleet_counts(datetime.utcnow())
+    except Exception as e:
+        # Stay healthy through a database outage; pings are being journaled
+        if not is_db_unavailable(e):
+            raise
+        fleet = None
+    return {
+        "status": "healthy",
+        "timestamp": datetime.utcnow().isoformat(),
+        "startup": startup_report(),
+        "admission": admission_stats(),
+        "fleet": fleet,
+    }
 
 
 @app.get("/")
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, Index
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.database import Base
+
+
+class ArchivedMonth(Base):
+    """One device-month of pings moved to the cold archive, with its row count"""
+    __tablename__ = "archived_ping_months"
+
+    device_id = Column(UUID(as_uuid=True), ForeignKey("devices.device_id", ondelete="CASCADE"), primary_key=True)
+    month = Column(DateTime, primary_key=True)
+    ping_count = Column(Integer, nullable=False)
+    newest_ping_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Newest archived pings across all devices: read files newest first, stop early
+        Index("ix_archived_ping_months_newest_ping_at", newest_ping_at.desc()),
+    )
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy import Column, String, Boolean, Integer, DateTime, ForeignKey, Index, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -15,7 +15,24 @@ class Device(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
+    group_id = Column(UUID(as_uuid=True), ForeignKey("device_groups.group_id", ondelete="SET NULL"), nullable=True, index=True)
+    # Overrides the group's threshold (and the global default) when set
+    offline_threshold_seconds = Column(Integer, nullable=True)
 
     # Relationships
-    pings = relationship("StatusPing", back_populates="device", cascade="all, delete-orphan")
-    status = relationship("DeviceStatus", back_populates="device", uselist=False, cascade="all, delete-orphan")
+    # passive_deletes: rely on ON DELETE CASCADE instead of loading children to delete them
+    pings = relationship("StatusPing", back_populates="device", cascade="all, delete-orphan", passive_deletes=True)
+    status = relationship("DeviceStatus", back_populates="device", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
+    group = relationship("DeviceGroup", back_populates="devices")
+
+    __table_args__ = (
+        # Keyset pagination for device listing (newest first) and status listing (by name)
+        Index("ix_devices_created_at_device_id", created_at, device_id),
+        Index("ix_devices_device_name_device_id", device_name, device_id),
+        # Case-insensitive name prefix search
+        Index(
+            "ix_devices_device_name_lower",
+            func.lower(device_name).label("device_name_lower"),
+            postgresql_ops={"device_name_lower": "text_pattern_ops"},
+        ),
+    )
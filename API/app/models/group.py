@@ -0,0 +1,20 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+
+
+class DeviceGroup(Base):
+    __tablename__ = "device_groups"
+
+    group_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    name = Column(String(255), unique=True, nullable=False)
+    heartbeat_interval_seconds = Column(Integer, nullable=False)
+    offline_threshold_seconds = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    # Relationships
+    devices = relationship("Device", back_populates="group", passive_deletes=True)
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, DateTime, ForeignKey
+from sqlalchemy import Column, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -10,9 +10,27 @@ class StatusPing(Base):
     __tablename__ = "status_pings"
 
     ping_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    device_id = Column(UUID(as_uuid=True), ForeignKey("devices.device_id", ondelete="CASCADE"), nullable=False, index=True)
-    ping_timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    device_id = Column(UUID(as_uuid=True), ForeignKey("devices.device_id", ondelete="CASCADE"), nullable=False)
+    ping_timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationships
     device = relationship("Device", back_populates="pings")
+
+    __table_args__ = (
+        # One device's pings, newest first: filter and order from a single index,
+        # index-only with ping_id included. Also serves cascades and chunked deletes
+        Index(
+            "ix_status_pings_device_id_ping_timestamp",
+            device_id,
+            ping_timestamp.desc(),
+            postgresql_include=["ping_id"],
+        ),
+        # All devices by time (history, timeline, archiver); device_id included so
+        # distinct-device counts per bucket don't visit the heap
+        Index(
+            "ix_status_pings_ping_timestamp",
+            ping_timestamp,
+            postgresql_include=["device_id"],
+        ),
+    )
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, String, Float, DateTime, ForeignKey, Enum, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import enum
@@ -19,8 +19,30 @@ class DeviceStatus(Base):
     device_id = Column(UUID(as_uuid=True), ForeignKey("devices.device_id", ondelete="CASCADE"), unique=True, nullable=False, index=True)
     status = Column(Enum(StatusEnum), default=StatusEnum.OFFLINE, nullable=False)
     last_ping_at = Column(DateTime, nullable=True, index=True)
+    # last_ping_at plus the device's offline window, kept up to date on every ping
+    expires_at = Column(DateTime, nullable=True)
+    # Learned ping inter-arrival time and its jitter (EWMAs, seconds)
+    ping_interval_seconds = Column(Float, nullable=True)
+    ping_jitter_seconds = Column(Float, nullable=True)
     status_changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     # Relationships
     device = relationship("Device", back_populates="status")
+
+    __table_args__ = (
+        # The offline sweep only ever looks at online devices past their expiry,
+        # so it reads as many index entries as there are devices expiring
+        Index(
+            "ix_device_status_expires_at_online",
+            expires_at,
+            postgresql_where=text("status = 'ONLINE'"),
+        ),
+        # Online count and the online device list read only online rows
+        # (stored by enum name, hence 'ONLINE')
+        Index(
+            "ix_device_status_device_id_online",
+            device_id,
+            postgresql_where=text("status = 'ONLINE'"),
+        ),
+    )
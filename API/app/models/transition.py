@@ -0,0 +1,27 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, DateTime, ForeignKey, Enum, Index
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.database import Base
+from app.models.status import StatusEnum
+
+
+class StatusTransition(Base):
+    """Append-only log of device status changes, for point-in-time queries"""
+    __tablename__ = "status_transitions"
+
+    transition_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    device_id = Column(UUID(as_uuid=True), ForeignKey("devices.device_id", ondelete="CASCADE"), nullable=False)
+    status = Column(Enum(StatusEnum), nullable=False)
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Status at a point in time is the newest transition at or before it:
+        # one backward index-only probe per device
+        Index(
+            "ix_status_transitions_device_id_changed_at",
+            device_id,
+            changed_at.desc(),
+            postgresql_include=["status"],
+        ),
+    )
@@ -0,0 +1,18 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.database import Base
+
+
+class Webhook(Base):
+    __tablename__ = "webhooks"
+
+    webhook_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    url = Column(String(2048), nullable=False)
+    # Used to sign deliveries (X-Webhook-Signature); optional
+    secret = Column(String(255), nullable=True)
+    description = Column(String(255), nullable=True)
+    is_active = Column(Boolean, default=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
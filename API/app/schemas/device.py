@@ -1,10 +1,42 @@
 from datetime import datetime
 from uuid import UUID
 from pydantic import BaseModel, Field
+from typing import Annotated, List, Optional
+
+# Upper bound on items accepted by a single bulk request
+MAX_BULK_ITEMS = 5000
+
+DeviceName = Annotated[str, Field(min_length=1, max_length=255)]
 
 
 class DeviceCreate(BaseModel):
     device_name: str = Field(..., min_length=1, max_length=255, description="Name of the device")
+    group_id: Optional[UUID] = Field(None, description="Group whose offline threshold applies")
+    offline_threshold_seconds: Optional[int] = Field(
+        None, gt=0, description="Per-device offline threshold, overriding the group's"
+    )
+
+
+class DeviceUpdate(BaseModel):
+    """Fields left out are unchanged; explicit nulls clear them"""
+    group_id: Optional[UUID] = None
+    offline_threshold_seconds: Optional[int] = Field(None, gt=0)
+
+
+class DeviceBulkCreate(BaseModel):
+    device_names: List[DeviceName] = Field(
+        ..., min_length=1, max_length=MAX_BULK_ITEMS, description="Names of the devices to create"
+    )
+    group_id: Optional[UUID] = Field(None, description="Group for every device created")
+    offline_threshold_seconds: Optional[int] = Field(
+        None, gt=0, description="Offline threshold override for every device created"
+    )
+
+
+class DeviceBulkIds(BaseModel):
+    device_ids: List[UUID] = Field(
+        ..., min_length=1, max_length=MAX_BULK_ITEMS, description="IDs of the devices"
+    )
 
 
 class DeviceResponse(BaseModel):
@@ -13,6 +45,8 @@ class DeviceResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     is_active: bool
+    group_id: Optional[UUID] = None
+    offline_threshold_seconds: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -20,3 +54,17 @@ class DeviceResponse(BaseModel):
 
 class DeviceWithApiKey(DeviceResponse):
     api_key: str = Field(..., description="API key (only returned once on creation)")
+
+
+class DeviceDeletionProgress(BaseModel):
+    device_id: UUID
+    state: str = Field(..., description="pending, running, completed or failed")
+    deleted_pings: int = 0
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+
+class DeviceBulkDeleteResponse(BaseModel):
+    deletions: List[DeviceDeletionProgress]
+    not_found_ids: List[UUID]
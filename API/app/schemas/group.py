@@ -0,0 +1,36 @@
+from datetime import datetime
+from uuid import UUID
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional
+
+
+class DeviceGroupCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=255, description="Name of the group")
+    heartbeat_interval_seconds: int = Field(..., gt=0, description="How often devices in the group ping")
+    offline_threshold_seconds: int = Field(
+        ..., gt=0, description="Time without a ping after which a device is marked offline"
+    )
+
+    @model_validator(mode="after")
+    def check_threshold(self):
+        if self.offline_threshold_seconds <= self.heartbeat_interval_seconds:
+            raise ValueError("offline_threshold_seconds must be longer than heartbeat_interval_seconds")
+        return self
+
+
+class DeviceGroupUpdate(BaseModel):
+    name: Optional[str] = Field(None, min_length=1, max_length=255)
+    heartbeat_interval_seconds: Optional[int] = Field(None, gt=0)
+    offline_threshold_seconds: Optional[int] = Field(None, gt=0)
+
+
+class DeviceGroupResponse(BaseModel):
+    group_id: UUID
+    name: str
+    heartbeat_interval_seconds: int
+    offline_threshold_seconds: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -2,6 +2,7 @@ from datetime import datetime
 from uuid import UUID
 from pydantic import BaseModel
 from typing import List, Optional
+from app.models.status import StatusEnum
 
 
 class PingHistoryItem(BaseModel):
@@ -19,3 +20,20 @@ class PingHistoryResponse(BaseModel):
     device_name: Optional[str] = None
     total_pings: int
     pings: List[PingHistoryItem]
+
+
+class TimelineBucket(BaseModel):
+    bucket_start: datetime
+    ping_count: int
+    device_count: int
+    last_ping_at: Optional[datetime] = None
+    status: Optional[StatusEnum] = None
+
+
+class TimelineResponse(BaseModel):
+    device_id: Optional[UUID] = None
+    device_name: Optional[str] = None
+    start: datetime
+    end: datetime
+    bucket_minutes: int
+    buckets: List[TimelineBucket]
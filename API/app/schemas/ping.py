@@ -1,6 +1,7 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from uuid import UUID
-from pydantic import BaseModel
+from typing import List
+from pydantic import BaseModel, Field, field_validator
 
 
 class PingResponse(BaseModel):
@@ -11,3 +12,27 @@ class PingResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class BufferedPing(BaseModel):
+    ping_id: UUID
+    ping_timestamp: datetime
+
+    @field_validator("ping_timestamp")
+    @classmethod
+    def to_naive_utc(cls, value: datetime) -> datetime:
+        if value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+class PingBatchRequest(BaseModel):
+    """Pings a device buffered while it could not reach the API (naive UTC timestamps)"""
+    pings: List[BufferedPing] = Field(..., min_length=1)
+
+
+class PingBatchResponse(BaseModel):
+    device_id: UUID
+    accepted: int
+    rejected: int = 0
+    message: str = "Pings recorded successfully"
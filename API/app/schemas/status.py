@@ -1,18 +1,58 @@
 from datetime import datetime
 from uuid import UUID
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from app.models.status import StatusEnum
 
 
-class DeviceStatusResponse(BaseModel):
+class DeviceStatusSnapshot(BaseModel):
+    """Point-in-time device status, safe to cache (no fields relative to now)"""
     device_id: UUID
     device_name: str
     status: StatusEnum
     last_ping_at: Optional[datetime]
+    expires_at: Optional[datetime] = None
+    ping_interval_seconds: Optional[float] = None
+    ping_jitter_seconds: Optional[float] = None
     status_changed_at: datetime
     updated_at: datetime
-    time_since_last_ping_seconds: Optional[int] = None
 
     class Config:
         from_attributes = True
+
+
+class DeviceStatusResponse(DeviceStatusSnapshot):
+    time_since_last_ping_seconds: Optional[int] = None
+
+    @classmethod
+    def from_snapshot(
+        cls, snapshot: DeviceStatusSnapshot, now: Optional[datetime] = None
+    ) -> "DeviceStatusResponse":
+        """Build a response, deriving relative fields at serve time"""
+        now = now or datetime.utcnow()
+        time_since_last_ping_seconds = None
+        if snapshot.last_ping_at:
+            time_since_last_ping_seconds = int((now - snapshot.last_ping_at).total_seconds())
+
+        return cls(
+            **snapshot.model_dump(),
+            time_since_last_ping_seconds=time_since_last_ping_seconds,
+        )
+
+
+class DeviceStatusAt(BaseModel):
+    """A device's status at a past point in time, from the transition log"""
+    device_id: UUID
+    device_name: str
+    status: StatusEnum
+    status_changed_at: datetime
+
+
+class StatusQueryRequest(BaseModel):
+    device_ids: List[UUID] = Field(..., min_length=1)
+
+
+class StatusQueryResponse(BaseModel):
+    """Statuses in request order; unknown device IDs are listed in not_found"""
+    statuses: List[DeviceStatusResponse]
+    not_found: List[UUID] = []
@@ -0,0 +1,10 @@
+from datetime import datetime
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class DeviceTokenResponse(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    device_id: UUID
+    expires_at: datetime
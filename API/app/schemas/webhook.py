@@ -0,0 +1,40 @@
+from datetime import datetime
+from uuid import UUID
+from pydantic import BaseModel, Field, HttpUrl
+from typing import Optional
+
+
+class WebhookCreate(BaseModel):
+    url: HttpUrl = Field(..., description="Endpoint that receives status transition batches")
+    secret: Optional[str] = Field(
+        None, min_length=16, max_length=255, description="Shared secret for HMAC-SHA256 signatures"
+    )
+    description: Optional[str] = Field(None, max_length=255)
+
+
+class WebhookUpdate(BaseModel):
+    url: Optional[HttpUrl] = None
+    secret: Optional[str] = Field(None, min_length=16, max_length=255)
+    description: Optional[str] = Field(None, max_length=255)
+    is_active: Optional[bool] = None
+
+
+class WebhookResponse(BaseModel):
+    webhook_id: UUID
+    url: str
+    description: Optional[str]
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class StatusChangeEvent(BaseModel):
+    """One device status transition, as delivered to webhooks"""
+    event: str = Field(..., description="device.online or device.offline")
+    device_id: UUID
+    device_name: Optional[str] = None
+    status: str
+    changed_at: datetime
@@ -1,12 +1,26 @@
+import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, delete, tuple_
 from redis.asyncio import Redis
-from typing import List, Optional
-from uuid import UUID
+from typing import AsyncIterator, List, Optional, Tuple
+from uuid import UUID, uuid4
+from datetime import datetime
 from app.models.device import Device
+from app.models.ping import StatusPing
 from app.models.status import DeviceStatus, StatusEnum
+from app.models.group import DeviceGroup
 from app.core.security import generate_api_key, hash_api_key
 from app.schemas.device import DeviceResponse, DeviceWithApiKey
+from app.core.cache import invalidate, device_status_key, queue_invalidation
+from app.core.revocation import revoke_device_tokens, queue_revocation
+from app.core.archive import delete_device_archives
+from app.services.group_service import GroupService
+from app.services.status_service import record_transitions
+from app.core.pagination import encode_cursor, decode_cursor, name_prefix_filter
+
+
+# Devices created and committed per multi-row insert by bulk_create_devices
+BULK_CREATE_CHUNK = 500
 
 
 class DeviceService:
@@ -14,8 +28,18 @@ class DeviceService:
         self.db = db
         self.redis = redis
 
-    async def create_device(self, device_name: str) -> DeviceWithApiKey:
-        """Create a new device with an API key"""
+    async def create_device(
+        self,
+        device_name: str,
+        group_id: Optional[UUID] = None,
+        offline_threshold_seconds: Optional[int] = None,
+    ) -> DeviceWithApiKey:
+        """
+        Create a new device with an API key.
+        Raises ValueError if group_id does not exist.
+        """
+        await self.check_group(group_id)
+
         # Generate API key
         api_key = generate_api_key()
         api_key_hash = hash_api_key(api_key)
@@ -24,16 +48,21 @@ class DeviceService:
         new_device = Device(
             device_name=device_name,
             api_key_hash=api_key_hash,
+            group_id=group_id,
+            offline_threshold_seconds=offline_threshold_seconds,
         )
         self.db.add(new_device)
         await self.db.flush()
 
         # Create initial status record
+        current_time = datetime.utcnow()
         device_status = DeviceStatus(
             device_id=new_device.device_id,
             status=StatusEnum.OFFLINE,
+            status_changed_at=current_time,
         )
         self.db.add(device_status)
+        await record_transitions(self.db, [new_device.device_id], StatusEnum.OFFLINE, current_time)
         await self.db.commit()
         await self.db.refresh(new_device)
 
@@ -44,9 +73,131 @@ class DeviceService:
             created_at=new_device.created_at,
             updated_at=new_device.updated_at,
             is_active=new_device.is_active,
+            group_id=new_device.group_id,
+            offline_threshold_seconds=new_device.offline_threshold_seconds,
             api_key=api_key,
         )
 
+    async def check_group(self, group_id: Optional[UUID]):
+        """Raise ValueError if group_id is given and does not exist"""
+        if group_id and not await self.db.get(DeviceGroup, group_id):
+            raise ValueError(f"Group {group_id} not found")
+
+    async def bulk_create_devices(
+        self,
+        device_names: List[str],
+        group_id: Optional[UUID] = None,
+        offline_threshold_seconds: Optional[int] = None,
+    ) -> AsyncIterator[DeviceWithApiKey]:
+        """
+        Create many devices, all in the same group and with the same threshold
+        override, yielding each one once its chunk is committed.
+        Call check_group first; an unknown group_id fails the first insert.
+        """
+        for start in range(0, len(device_names), BULK_CREATE_CHUNK):
+            chunk = device_names[start:start + BULK_CREATE_CHUNK]
+            for device in await self._create_device_chunk(chunk, group_id, offline_threshold_seconds):
+                yield device
+
+    async def _create_device_chunk(
+        self,
+        device_names: List[str],
+        group_id: Optional[UUID],
+        offline_threshold_seconds: Optional[int],
+    ) -> List[DeviceWithApiKey]:
+        """Create devices with one multi-row insert per table and commit them"""
+        current_time = datetime.utcnow()
+        device_rows = []
+        status_rows = []
+        created = []
+
+        for device_name in device_names:
+            api_key = generate_api_key()
+            device_id = uuid4()
+
+            device_rows.append({
+                "device_id": device_id,
+                "device_name": device_name,
+                "api_key_hash": hash_api_key(api_key),
+                "created_at": current_time,
+                "updated_at": current_time,
+                "is_active": True,
+                "group_id": group_id,
+                "offline_threshold_seconds": offline_threshold_seconds,
+            })
+            status_rows.append({
+                "status_id": uuid4(),
+                "device_id": device_id,
+                "status": StatusEnum.OFFLINE,
+                "status_changed_at": current_time,
+                "updated_at": current_time,
+            })
+            created.append(DeviceWithApiKey(
+                device_id=device_id,
+                device_name=device_name,
+                created_at=current_time,
+                updated_at=current_time,
+                is_active=True,
+                group_id=group_id,
+                offline_threshold_seconds=offline_threshold_seconds,
+                api_key=api_key,
+            ))
+
+        # One multi-row INSERT per table; BULK_CREATE_CHUNK keeps these well
+        # under Postgres' 32767 bind-parameter limit
+        await self.db.execute(insert(Device).values(device_rows))
+        await self.db.execute(insert(DeviceStatus).values(status_rows))
+        await record_transitions(
+            self.db, [row["device_id"] for row in status_rows], StatusEnum.OFFLINE, current_time
+        )
+        await self.db.commit()
+
+        return created
+
+    async def rotate_api_keys(self, device_ids: List[UUID]) -> List[DeviceWithApiKey]:
+        """Issue new API keys for existing devices, invalidating the old ones"""
+        query = select(Device).where(Device.device_id.in_(device_ids))
+        result = await self.db.execute(query)
+        devices = result.scalars().all()
+
+        if not devices:
+            return []
+
+        current_time = datetime.utcnow()
+        updates = []
+        rotated = []
+
+        for device in devices:
+            api_key = generate_api_key()
+            updates.append({
+                "device_id": device.device_id,
+                "api_key_hash": hash_api_key(api_key),
+                "updated_at": current_time,
+            })
+            rotated.append(DeviceWithApiKey(
+                device_id=device.device_id,
+                device_name=device.device_name,
+                created_at=device.created_at,
+                updated_at=current_time,
+                is_active=device.is_active,
+                api_key=api_key,
+            ))
+
+        # Bulk UPDATE by primary key
+        await self.db.execute(update(Device), updates)
+        await self.db.commit()
+
+        # Tokens issued under the old keys stop working too
+        if self.redis:
+            await revoke_device_tokens(self.redis, *[device.device_id for device in devices])
+
+        return rotated
+
+    async def rotate_api_key(self, device_id: UUID) -> Optional[DeviceWithApiKey]:
+        """Issue a new API key for a single device"""
+        rotated = await self.rotate_api_keys([device_id])
+        return rotated[0] if rotated else None
+
     async def get_device_by_id(self, device_id: UUID) -> Optional[DeviceResponse]:
         """Get a device by ID"""
         query = select(Device).where(Device.device_id == device_id)
@@ -57,28 +208,160 @@ class DeviceService:
             return DeviceResponse.model_validate(device)
         return None
 
-    async def get_all_devices(self) -> List[DeviceResponse]:
-        """Get all devices"""
-        query = select(Device).order_by(Device.created_at.desc())
+    async def update_device(self, device_id: UUID, changes: dict) -> Optional[DeviceResponse]:
+        """
+        Change a device's group or threshold override and recompute its expiry.
+        Raises ValueError if the new group_id does not exist.
+        """
+        await self.check_group(changes.get("group_id"))
+
+        query = (
+            update(Device)
+            .where(Device.device_id == device_id)
+            .values(**changes, updated_at=datetime.utcnow())
+            .returning(Device)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(query)
+        device = result.scalar_one_or_none()
+        await self.db.commit()
+
+        if not device:
+            return None
+
+        await GroupService(self.db, self.redis).refresh_expiry(
+            select(Device.device_id).where(Device.device_id == device_id)
+        )
+
+        return DeviceResponse.model_validate(device)
+
+    async def get_recent_api_keys(self, limit: int) -> List[Tuple[str, UUID]]:
+        """(api_key_hash, device_id) of active devices, most recently pinged first"""
+        query = (
+            select(Device.api_key_hash, Device.device_id)
+            .outerjoin(DeviceStatus, DeviceStatus.device_id == Device.device_id)
+            .where(Device.is_active == True)
+            .order_by(DeviceStatus.last_ping_at.desc().nulls_last())
+            .limit(limit)
+        )
         result = await self.db.execute(query)
+        return [(api_key_hash, device_id) for api_key_hash, device_id in result.all()]
+
+    async def get_all_devices(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        is_active: Optional[bool] = None,
+        name_prefix: Optional[str] = None,
+    ) -> Tuple[List[DeviceResponse], Optional[str]]:
+        """
+        Get a page of devices, newest first, using keyset pagination
+
+        Args:
+            limit: Maximum number of devices to return
+            cursor: Cursor returned with the previous page
+            is_active: Optional filter on the active flag
+            name_prefix: Optional case-insensitive device name prefix
+
+        Returns the page and the cursor for the next page (None on the last page).
+        Raises ValueError if the cursor is malformed.
+        """
+        query = select(Device).order_by(Device.created_at.desc(), Device.device_id.desc())
+
+        if cursor:
+            created_at, device_id = decode_cursor(cursor, 2)
+            query = query.where(
+                tuple_(Device.created_at, Device.device_id)
+                < tuple_(datetime.fromisoformat(created_at), UUID(device_id))
+            )
+        if is_active is not None:
+            query = query.where(Device.is_active == is_active)
+        if name_prefix:
+            query = query.where(name_prefix_filter(Device.device_name, name_prefix))
+
+        # Fetch one extra row to know whether there is a next page
+        result = await self.db.execute(query.limit(limit + 1))
         devices = result.scalars().all()
 
-        return [DeviceResponse.model_validate(device) for device in devices]
+        next_cursor = None
+        if len(devices) > limit:
+            devices = devices[:limit]
+            next_cursor = encode_cursor(devices[-1].created_at, devices[-1].device_id)
+
+        return [DeviceResponse.model_validate(device) for device in devices], next_cursor
+
+    async def deactivate_device(self, device_id: UUID) -> bool:
+        """Mark a device inactive so it can no longer authenticate"""
+        return bool(await self.deactivate_devices([device_id]))
+
+    async def deactivate_devices(self, device_ids: List[UUID]) -> List[UUID]:
+        """
+        Mark devices inactive so they can no longer authenticate, ahead of
+        their background deletion. Returns the IDs that exist.
+        """
+        query = (
+            update(Device)
+            .where(Device.device_id.in_(device_ids))
+            .values(is_active=False, updated_at=datetime.utcnow())
+            .returning(Device.device_id)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(query)
+        deactivated_ids = list(result.scalars().all())
+        await self.db.commit()
+
+        # Invalidate cached statuses and outstanding tokens
+        if self.redis and deactivated_ids:
+            await self._forget_devices(deactivated_ids)
+
+        return deactivated_ids
+
+    async def _forget_devices(self, device_ids: List[UUID]):
+        """Drop cached statuses and revoke tokens of devices in one pipelined round trip"""
+        pipe = self.redis.pipeline(transaction=False)
+        queue_invalidation(pipe, *[device_status_key(device_id) for device_id in device_ids])
+        queue_revocation(pipe, *device_ids)
+        await pipe.execute()
+
+    async def delete_ping_chunk(self, device_id: UUID, chunk_size: int) -> int:
+        """Delete up to chunk_size pings of a device, returning how many were deleted"""
+        chunk = (
+            select(StatusPing.ping_id)
+            .where(StatusPing.device_id == device_id)
+            .limit(chunk_size)
+            .scalar_subquery()
+        )
+        query = (
+            delete(StatusPing)
+            .where(StatusPing.ping_id.in_(chunk))
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(query)
+        await self.db.commit()
+
+        return result.rowcount
 
     async def delete_device(self, device_id: UUID) -> bool:
-        """Delete a device"""
-        query = select(Device).where(Device.device_id == device_id)
+        """
+        Delete a device row.
+        Remaining pings and the status row are removed by ON DELETE CASCADE,
+        without loading them into the session; archived pings are removed from disk.
+        """
+        query = (
+            delete(Device)
+            .where(Device.device_id == device_id)
+            .execution_options(synchronize_session=False)
+        )
         result = await self.db.execute(query)
-        device = result.scalar_one_or_none()
+        await self.db.commit()
 
-        if device:
-            await self.db.delete(device)
-            await self.db.commit()
-            
-            # Invalidate Redis cache for this device
-            if self.redis:
-                cache_key = f"device_status:{device_id}"
-                await self.redis.delete(cache_key)
-            
-            return True
-        return False
+        if result.rowcount == 0:
+            return False
+
+        await asyncio.to_thread(delete_device_archives, device_id)
+
+        # Invalidate cached status for this device
+        if self.redis:
+            await invalidate(self.redis, device_status_key(device_id))
+
+        return True
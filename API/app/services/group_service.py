@@ -0,0 +1,181 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, func, literal_column
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.types import Interval
+from redis.asyncio import Redis
+from typing import List, Optional
+from uuid import UUID
+from datetime import datetime
+from app.models.device import Device
+from app.models.group import DeviceGroup
+from app.models.status import DeviceStatus
+from app.schemas.group import DeviceGroupCreate, DeviceGroupUpdate, DeviceGroupResponse
+from app.core.cache import invalidate, device_status_key
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def offline_threshold_seconds(device_id_column):
+    """
+    Correlated subquery for a device's effective offline threshold:
+    its own override, else its group's, else OFFLINE_THRESHOLD_MINUTES
+    """
+    return (
+        select(
+            func.coalesce(
+                Device.offline_threshold_seconds,
+                DeviceGroup.offline_threshold_seconds,
+                settings.OFFLINE_THRESHOLD_MINUTES * 60,
+            )
+        )
+        .select_from(Device)
+        .outerjoin(DeviceGroup, DeviceGroup.group_id == Device.group_id)
+        .where(Device.device_id == device_id_column)
+        .scalar_subquery()
+    )
+
+
+def expiry_window_seconds(device_id_column, interval=None, jitter=None):
+    """
+    SQL expression for how long a device may go without pinging.
+
+    With a learned ping interval and jitter, the window is
+    MISSED_PINGS_BEFORE_OFFLINE intervals of (interval + 4 * jitter), never
+    shorter than the configured threshold and at most
+    ADAPTIVE_EXPIRY_MAX_FACTOR times it. Without one, it is the threshold.
+    """
+    threshold = offline_threshold_seconds(device_id_column)
+    if interval is None or settings.MISSED_PINGS_BEFORE_OFFLINE <= 0:
+        return threshold
+
+    learned = settings.MISSED_PINGS_BEFORE_OFFLINE * (interval + 4 * func.coalesce(jitter, 0))
+    return func.greatest(
+        threshold,
+        func.least(func.coalesce(learned, 0), threshold * settings.ADAPTIVE_EXPIRY_MAX_FACTOR),
+    )
+
+
+def expires_after(timestamp, device_id_column, interval=None, jitter=None):
+    """SQL expression for when a device pinging at timestamp goes offline"""
+    second = literal_column("INTERVAL '1 second'", Interval)
+    return timestamp + second * expiry_window_seconds(device_id_column, interval, jitter)
+
+
+class GroupService:
+    def __init__(self, db: AsyncSession, redis: Redis = None):
+        self.db = db
+        self.redis = redis
+
+    async def create_group(self, group_data: DeviceGroupCreate) -> DeviceGroupResponse:
+        """
+        Create a device group.
+        Raises ValueError if the name is taken.
+        """
+        group = DeviceGroup(**group_data.model_dump())
+        self.db.add(group)
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+            raise ValueError(f"Group {group_data.name!r} already exists")
+        await self.db.refresh(group)
+
+        return DeviceGroupResponse.model_validate(group)
+
+    async def get_all_groups(self) -> List[DeviceGroupResponse]:
+        """Get all device groups ordered by name"""
+        query = select(DeviceGroup).order_by(DeviceGroup.name)
+        result = await self.db.execute(query)
+        return [DeviceGroupResponse.model_validate(group) for group in result.scalars().all()]
+
+    async def get_group(self, group_id: UUID) -> Optional[DeviceGroupResponse]:
+        """Get a device group by ID"""
+        group = await self.db.get(DeviceGroup, group_id)
+        return DeviceGroupResponse.model_validate(group) if group else None
+
+    async def update_group(
+        self, group_id: UUID, group_data: DeviceGroupUpdate
+    ) -> Optional[DeviceGroupResponse]:
+        """
+        Update a device group, recomputing member expiries if the threshold changed.
+        Raises ValueError if the result is invalid or the name is taken.
+        """
+        group = await self.db.get(DeviceGroup, group_id)
+        if not group:
+            return None
+
+        changes = group_data.model_dump(exclude_unset=True, exclude_none=True)
+        for field, value in changes.items():
+            setattr(group, field, value)
+        if group.offline_threshold_seconds <= group.heartbeat_interval_seconds:
+            await self.db.rollback()
+            raise ValueError("offline_threshold_seconds must be longer than heartbeat_interval_seconds")
+
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+            raise ValueError(f"Group {group_data.name!r} already exists")
+        await self.db.refresh(group)
+
+        if "offline_threshold_seconds" in changes:
+            await self.refresh_expiry(
+                select(Device.device_id).where(Device.group_id == group_id)
+            )
+
+        return DeviceGroupResponse.model_validate(group)
+
+    async def delete_group(self, group_id: UUID) -> bool:
+        """Delete a device group; its devices fall back to the default threshold"""
+        query = (
+            update(Device)
+            .where(Device.group_id == group_id)
+            .values(group_id=None, updated_at=datetime.utcnow())
+            .returning(Device.device_id)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(query)
+        member_ids = list(result.scalars().all())
+
+        query = delete(DeviceGroup).where(DeviceGroup.group_id == group_id)
+        result = await self.db.execute(query)
+        await self.db.commit()
+
+        if result.rowcount == 0:
+            return False
+
+        if member_ids:
+            await self.refresh_expiry(
+                select(Device.device_id).where(Device.device_id.in_(member_ids))
+            )
+
+        return True
+
+    async def refresh_expiry(self, device_ids):
+        """
+        Recompute expires_at for the devices selected by device_ids (a select
+        of device IDs) after their effective threshold changed.
+        Devices now past their expiry are marked offline by the next sweep.
+        """
+        query = (
+            update(DeviceStatus)
+            .where(DeviceStatus.device_id.in_(device_ids))
+            .values(
+                expires_at=expires_after(
+                    DeviceStatus.last_ping_at,
+                    DeviceStatus.device_id,
+                    DeviceStatus.ping_interval_seconds,
+                    DeviceStatus.ping_jitter_seconds,
+                ),
+                updated_at=datetime.utcnow(),
+            )
+            .returning(DeviceStatus.device_id)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(query)
+        updated_ids = result.scalars().all()
+        await self.db.commit()
+
+        if self.redis and updated_ids:
+            await invalidate(self.redis, *[device_status_key(device_id) for device_id in updated_ids])
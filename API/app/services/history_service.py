@@ -1,11 +1,92 @@
+import asyncio
+import os
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc, func
-from typing import List, Optional
+from sqlalchemy import select, delete, desc, func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Dict, List, Optional, Tuple
 from uuid import UUID
 from datetime import datetime, timedelta
+import numpy as np
 from app.models.ping import StatusPing
 from app.models.device import Device
-from app.schemas.history import PingHistoryItem, PingHistoryResponse
+from app.models.status import StatusEnum
+from app.models.archive import ArchivedMonth
+from app.services.group_service import offline_threshold_seconds
+from app.core.archive import (
+    archive_horizon,
+    archive_path,
+    archive_summary,
+    count_archive,
+    from_micros,
+    iter_archives,
+    month_start,
+    next_month,
+    read_archive,
+    to_micros,
+    write_archive,
+)
+from app.schemas.history import (
+    PingHistoryItem,
+    PingHistoryResponse,
+    TimelineBucket,
+    TimelineResponse,
+)
+from app.config import get_settings
+
+settings = get_settings()
+
+# Upper bound on points returned by a single timeline query
+MAX_TIMELINE_BUCKETS = 2000
+
+# Fixed origin so bucket boundaries are stable across requests
+TIMELINE_ORIGIN = datetime(2000, 1, 1)
+
+ESTIMATED_PING_COUNT_QUERY = text(
+    f"SELECT CAST(greatest(reltuples, 0) AS bigint) FROM pg_class "
+    f"WHERE oid = CAST('{StatusPing.__tablename__}' AS regclass)"
+)
+
+# One index range scan per bucket. Distinct devices are counted by grouping
+# (hashed) rather than count(DISTINCT), which would sort every ping in range
+TIMELINE_QUERY = """
+WITH params AS (
+    SELECT
+        CAST(:width AS interval) AS width,
+        CAST(:start AS timestamp) AS range_start,
+        CAST(:end AS timestamp) AS range_end,
+        CAST(:origin AS timestamp) AS origin
+)
+SELECT
+    b.bucket_start,
+    coalesce(c.ping_count, 0) AS ping_count,
+    c.device_count,
+    c.last_ping_at
+FROM params p
+CROSS JOIN generate_series(
+    date_bin(p.width, p.range_start, p.origin), p.range_end - interval '1 microsecond', p.width
+) AS b(bucket_start)
+CROSS JOIN LATERAL (
+    SELECT
+        sum(d.ping_count) AS ping_count,
+        count(*) AS device_count,
+        max(d.last_ping_at) AS last_ping_at
+    FROM (
+        SELECT count(*) AS ping_count, max(sp.ping_timestamp) AS last_ping_at
+        FROM status_pings sp
+        WHERE sp.ping_timestamp >= b.bucket_start
+          AND sp.ping_timestamp < b.bucket_start + p.width
+          AND sp.ping_timestamp < p.range_end
+          {device_filter}
+        GROUP BY sp.device_id
+    ) d
+) c
+"""
+
+
+def timeline_bucket_count(start: datetime, end: datetime, width: timedelta) -> int:
+    """Buckets TIMELINE_QUERY returns for [start, end): start is rounded down like date_bin"""
+    first_bucket = TIMELINE_ORIGIN + (start - TIMELINE_ORIGIN) // width * width
+    return -((first_bucket - end) // width)
 
 
 class HistoryService:
@@ -26,16 +107,18 @@ class HistoryService:
             limit: Maximum number of pings to return (default 100)
             days: Optional number of days to look back
         """
-        # Build query
-        query = (
-            select(StatusPing, Device.device_name)
-            .join(Device, StatusPing.device_id == Device.device_id)
-            .order_by(desc(StatusPing.ping_timestamp))
-        )
+        columns = (StatusPing.ping_id, StatusPing.device_id, StatusPing.ping_timestamp)
 
-        # Filter by device if specified
+        # Build query. For one device, filter and order come straight from
+        # ix_status_pings_device_id_ping_timestamp and the name is looked up once
+        # instead of joined per row
         if device_id:
-            query = query.where(StatusPing.device_id == device_id)
+            query = select(*columns).where(StatusPing.device_id == device_id)
+        else:
+            query = select(*columns, Device.device_name).join(
+                Device, StatusPing.device_id == Device.device_id
+            )
+        query = query.order_by(desc(StatusPing.ping_timestamp))
 
         # Filter by date range if specified
         if days:
@@ -49,13 +132,25 @@ class HistoryService:
         result = await self.db.execute(query)
         rows = result.all()
 
-        # Count total pings
-        count_query = select(func.count(StatusPing.ping_id))
-        if device_id:
-            count_query = count_query.where(StatusPing.device_id == device_id)
-        if days:
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
-            count_query = count_query.where(StatusPing.ping_timestamp >= cutoff_date)
+        if device_id and rows:
+            result = await self.db.execute(
+                select(Device.device_name).where(Device.device_id == device_id)
+            )
+            name = result.scalar()
+            rows = [(*row, name) for row in rows]
+
+        # Count total pings. An exact count of the whole table would scan every
+        # ping on each call, so with no device or date range the planner's row
+        # estimate (kept current by autovacuum) is reported instead
+        if device_id or days:
+            count_query = select(func.count()).select_from(StatusPing)
+            if device_id:
+                count_query = count_query.where(StatusPing.device_id == device_id)
+            if days:
+                cutoff_date = datetime.utcnow() - timedelta(days=days)
+                count_query = count_query.where(StatusPing.ping_timestamp >= cutoff_date)
+        else:
+            count_query = ESTIMATED_PING_COUNT_QUERY
 
         count_result = await self.db.execute(count_query)
         total_pings = count_result.scalar()
@@ -63,14 +158,24 @@ class HistoryService:
         # Format results
         pings = [
             PingHistoryItem(
-                ping_id=ping.ping_id,
-                device_id=ping.device_id,
+                ping_id=ping_id,
+                device_id=row_device_id,
                 device_name=device_name,
-                ping_timestamp=ping.ping_timestamp,
+                ping_timestamp=ping_timestamp,
             )
-            for ping, device_name in rows
+            for ping_id, row_device_id, ping_timestamp, device_name in rows
         ]
 
+        # Reach into the cold archive only when the range extends past the hot
+        # window; archived rows are read only to fill a short page
+        horizon = archive_horizon()
+        cutoff_date = datetime.utcnow() - timedelta(days=days) if days else None
+        if horizon and (cutoff_date is None or cutoff_date < horizon):
+            archived_total = await self._count_archived(device_id, cutoff_date)
+            total_pings += archived_total
+            if archived_total and len(pings) < limit:
+                pings = await self._merge_archived_pings(pings, device_id, cutoff_date, limit)
+
         # Get device name if filtering by device
         device_name = None
         if device_id and pings:
@@ -82,3 +187,357 @@ class HistoryService:
             total_pings=total_pings,
             pings=pings,
         )
+
+    async def _count_archived(self, device_id: Optional[UUID], start: Optional[datetime]) -> int:
+        """
+        Archived pings since start, summed from the archived_ping_months manifest.
+        Only a month that start cuts in two is counted from its files.
+        """
+        query = select(func.coalesce(func.sum(ArchivedMonth.ping_count), 0))
+        if device_id:
+            query = query.where(ArchivedMonth.device_id == device_id)
+        boundary = month_start(start) if start and month_start(start) < start else None
+        if start:
+            query = query.where((ArchivedMonth.month > boundary) if boundary else (ArchivedMonth.month >= start))
+        result = await self.db.execute(query)
+        total = result.scalar()
+
+        if boundary:
+            query = select(ArchivedMonth.device_id).where(ArchivedMonth.month == boundary)
+            if device_id:
+                query = query.where(ArchivedMonth.device_id == device_id)
+            result = await self.db.execute(query)
+            paths = [archive_path(archived_device_id, boundary) for archived_device_id in result.scalars()]
+            start_us = to_micros(start)
+            total += await asyncio.to_thread(lambda: sum(count_archive(path, start_us) for path in paths))
+        return total
+
+    async def _newest_archived(
+        self, device_id: Optional[UUID], start: Optional[datetime], count: int
+    ) -> List[Tuple[UUID, UUID, datetime]]:
+        """Newest archived (ping_id, device_id, ping_timestamp) rows, at most count"""
+        # Every file holds at least one row no older than the files after it, so
+        # the newest count rows are always within the count newest files
+        query = (
+            select(ArchivedMonth.device_id, ArchivedMonth.month, ArchivedMonth.newest_ping_at)
+            .order_by(ArchivedMonth.newest_ping_at.desc())
+            .limit(count)
+        )
+        if device_id:
+            query = query.where(ArchivedMonth.device_id == device_id)
+        if start:
+            query = query.where(ArchivedMonth.newest_ping_at >= start)
+        result = await self.db.execute(query)
+        months = result.all()
+        if not months:
+            return []
+        return await asyncio.to_thread(self._read_newest_archived, months, start, count)
+
+    @staticmethod
+    def _read_newest_archived(
+        months: List[Tuple[UUID, datetime, datetime]], start: Optional[datetime], count: int
+    ) -> List[Tuple[UUID, UUID, datetime]]:
+        start_us = to_micros(start) if start else None
+        found = []
+        for archived_device_id, month, newest_ping_at in months:
+            # Files come newest first: stop once none of this one's rows can make the cut
+            if len(found) >= count and to_micros(newest_ping_at) < found[count - 1][2]:
+                break
+            timestamps, ids = read_archive(archive_path(archived_device_id, month), start_us)
+            # Only the newest count rows of each file can make the cut
+            for ping_timestamp, ping_id in zip(timestamps[-count:], ids[-count:]):
+                found.append((UUID(bytes=ping_id.tobytes()), archived_device_id, int(ping_timestamp)))
+            found.sort(key=lambda row: row[2], reverse=True)
+            del found[count:]
+
+        return [
+            (ping_id, archived_device_id, from_micros(ping_timestamp))
+            for ping_id, archived_device_id, ping_timestamp in found
+        ]
+
+    async def _merge_archived_pings(
+        self,
+        pings: List[PingHistoryItem],
+        device_id: Optional[UUID],
+        start: Optional[datetime],
+        limit: int,
+    ) -> List[PingHistoryItem]:
+        """Fill a short page of hot pings with the newest archived ones"""
+        archived = await self._newest_archived(device_id, start, limit)
+        if not archived:
+            return pings
+
+        device_ids = {archived_device_id for _, archived_device_id, _ in archived}
+        result = await self.db.execute(
+            select(Device.device_id, Device.device_name).where(Device.device_id.in_(device_ids))
+        )
+        names = dict(result.all())
+
+        seen = {ping.ping_id for ping in pings}
+        merged = pings + [
+            PingHistoryItem(
+                ping_id=ping_id,
+                device_id=archived_device_id,
+                device_name=names[archived_device_id],
+                ping_timestamp=ping_timestamp,
+            )
+            for ping_id, archived_device_id, ping_timestamp in archived
+            if archived_device_id in names and ping_id not in seen
+        ]
+        merged.sort(key=lambda ping: ping.ping_timestamp, reverse=True)
+        return merged[:limit]
+
+    async def get_timeline(
+        self,
+        start: datetime,
+        end: datetime,
+        bucket_minutes: int,
+        device_id: Optional[UUID] = None,
+    ) -> Optional[TimelineResponse]:
+        """
+        Get ping counts bucketed over a time range, computed in SQL
+
+        Args:
+            start: Start of the range (UTC), rounded down to a bucket boundary
+            end: End of the range (UTC), exclusive
+            bucket_minutes: Width of each bucket in minutes
+            device_id: Optional device ID to filter by
+
+        Returns None if device_id is given and the device does not exist.
+        When filtering by device, each bucket also carries the device status:
+        online if it pinged in the bucket or was still within the offline
+        threshold of its previous ping when the bucket started.
+        """
+        width = timedelta(minutes=bucket_minutes)
+
+        device_name = None
+        if device_id:
+            query = select(Device.device_name).where(Device.device_id == device_id)
+            result = await self.db.execute(query)
+            device_name = result.scalar_one_or_none()
+            if device_name is None:
+                return None
+
+        device_filter = "AND sp.device_id = CAST(:device_id AS uuid)" if device_id else ""
+        params = {"width": width, "start": start, "end": end, "origin": TIMELINE_ORIGIN}
+        if device_id:
+            params["device_id"] = device_id
+
+        result = await self.db.execute(
+            text(TIMELINE_QUERY.format(device_filter=device_filter)), params
+        )
+        # Ordered here rather than in SQL, which would add a Sort node to the plan
+        rows = sorted(result.all(), key=lambda row: row.bucket_start)
+
+        buckets = [
+            TimelineBucket(
+                bucket_start=row.bucket_start,
+                ping_count=row.ping_count,
+                device_count=row.device_count,
+                last_ping_at=row.last_ping_at,
+            )
+            for row in rows
+        ]
+
+        if archive_horizon() and buckets:
+            await self._merge_archived_buckets(buckets, width, end, device_id)
+
+        if device_id:
+            await self._apply_device_status(device_id, buckets)
+
+        return TimelineResponse(
+            device_id=device_id,
+            device_name=device_name,
+            start=start,
+            end=end,
+            bucket_minutes=bucket_minutes,
+            buckets=buckets,
+        )
+
+    @staticmethod
+    def _archived_buckets(
+        first_bucket: datetime,
+        bucket_count: int,
+        width: timedelta,
+        end: datetime,
+        device_id: Optional[UUID],
+    ) -> Dict[int, list]:
+        """Per bucket index: [ping_count, device IDs, last ping (epoch us)] from the archive"""
+        first_us = to_micros(first_bucket)
+        width_us = width // timedelta(microseconds=1)
+        buckets: Dict[int, list] = {}
+        for archived_device_id, path in iter_archives(first_bucket, end, device_id):
+            timestamps, _ = read_archive(path, first_us, to_micros(end))
+            if not len(timestamps):
+                continue
+            # Timestamps are sorted, so each bucket is a contiguous run
+            indexes = (timestamps - first_us) // width_us
+            starts = np.flatnonzero(np.diff(indexes, prepend=-1))
+            counts = np.diff(np.append(starts, len(indexes)))
+            for index, run_start, count in zip(indexes[starts], starts, counts):
+                if index >= bucket_count:
+                    break
+                bucket = buckets.setdefault(int(index), [0, set(), 0])
+                bucket[0] += int(count)
+                bucket[1].add(archived_device_id)
+                bucket[2] = max(bucket[2], int(timestamps[run_start + count - 1]))
+        return buckets
+
+    async def _merge_archived_buckets(
+        self,
+        buckets: List[TimelineBucket],
+        width: timedelta,
+        end: datetime,
+        device_id: Optional[UUID],
+    ):
+        """Add archived pings to timeline buckets"""
+        archived = await asyncio.to_thread(
+            self._archived_buckets, buckets[0].bucket_start, len(buckets), width, end, device_id
+        )
+        for index, (ping_count, device_ids, last_ping_us) in archived.items():
+            bucket = buckets[index]
+            if bucket.ping_count:
+                # Rare: a bucket straddling the archive boundary. Count devices across both
+                query = select(StatusPing.device_id).distinct().where(
+                    StatusPing.ping_timestamp >= bucket.bucket_start,
+                    StatusPing.ping_timestamp < bucket.bucket_start + width,
+                )
+                if device_id:
+                    query = query.where(StatusPing.device_id == device_id)
+                result = await self.db.execute(query)
+                device_ids = device_ids | set(result.scalars().all())
+
+            last_ping_at = from_micros(last_ping_us)
+            bucket.ping_count += ping_count
+            bucket.device_count = len(device_ids)
+            if bucket.last_ping_at is None or last_ping_at > bucket.last_ping_at:
+                bucket.last_ping_at = last_ping_at
+
+    @staticmethod
+    def _last_archived_ping(device_id: UUID, start: datetime, end: datetime) -> Optional[datetime]:
+        for _, path in iter_archives(start, end, device_id):
+            timestamps, _ = read_archive(path, to_micros(start), to_micros(end))
+            if len(timestamps):
+                return from_micros(timestamps[-1])
+        return None
+
+    async def get_archivable_months(self, horizon: datetime) -> List[Tuple[UUID, datetime]]:
+        """(device_id, month) pairs with pings older than horizon, oldest first"""
+        month = func.date_trunc("month", StatusPing.ping_timestamp)
+        query = (
+            select(StatusPing.device_id, month)
+            .where(StatusPing.ping_timestamp < horizon)
+            .group_by(StatusPing.device_id, month)
+            .order_by(month)
+        )
+        result = await self.db.execute(query)
+        return [(device_id, month) for device_id, month in result.all()]
+
+    async def archive_device_month(self, device_id: UUID, month: datetime, horizon: datetime) -> int:
+        """
+        Move one device's pings for one month (before horizon) into the archive.
+        The rows are deleted and written out in one transaction: if writing the
+        file fails the delete is rolled back. Returns the number of pings moved.
+        """
+        query = (
+            delete(StatusPing)
+            .where(
+                StatusPing.device_id == device_id,
+                StatusPing.ping_timestamp >= month,
+                StatusPing.ping_timestamp < min(next_month(month), horizon),
+            )
+            .returning(StatusPing.ping_id, StatusPing.ping_timestamp)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(query)
+        rows = result.all()
+        if not rows:
+            return 0
+
+        ping_ids = [ping_id for ping_id, _ in rows]
+        timestamps = [ping_timestamp for _, ping_timestamp in rows]
+        try:
+            ping_count, newest_us = await asyncio.to_thread(
+                write_archive, archive_path(device_id, month), ping_ids, timestamps
+            )
+            await self._record_archived_month(device_id, month, ping_count, newest_us)
+        except Exception:
+            await self.db.rollback()
+            raise
+        await self.db.commit()
+
+        return len(rows)
+
+    async def _record_archived_month(self, device_id: UUID, month: datetime, ping_count: int, newest_us: int):
+        """Upsert a device-month's manifest row with its archive file's totals (does not commit)"""
+        query = pg_insert(ArchivedMonth).values(
+            device_id=device_id,
+            month=month,
+            ping_count=ping_count,
+            newest_ping_at=from_micros(newest_us),
+        )
+        query = query.on_conflict_do_update(
+            index_elements=[ArchivedMonth.device_id, ArchivedMonth.month],
+            set_={"ping_count": query.excluded.ping_count, "newest_ping_at": query.excluded.newest_ping_at},
+        )
+        await self.db.execute(query)
+
+    async def index_unlisted_archives(self) -> int:
+        """
+        Add manifest rows for archive files written before the manifest existed
+        (or whose transaction was lost after the file was written).
+        Reads only each file's header and block index. Returns the number added.
+        """
+        result = await self.db.execute(select(ArchivedMonth.device_id, ArchivedMonth.month))
+        listed = set(result.all())
+        device_ids = set((await self.db.execute(select(Device.device_id))).scalars())
+
+        def summarize():
+            found = []
+            for archived_device_id, path in iter_archives(None, datetime.max):
+                month = datetime.strptime(os.path.basename(os.path.dirname(path)), "%Y-%m")
+                if (archived_device_id, month) not in listed and archived_device_id in device_ids:
+                    found.append((archived_device_id, month, *archive_summary(path)))
+            return found
+
+        unlisted = await asyncio.to_thread(summarize)
+        for archived_device_id, month, ping_count, newest_us in unlisted:
+            await self._record_archived_month(archived_device_id, month, ping_count, newest_us)
+        await self.db.commit()
+        return len(unlisted)
+
+    async def _apply_device_status(
+        self,
+        device_id: UUID,
+        buckets: List[TimelineBucket],
+    ):
+        """Derive online/offline state per bucket for a single device"""
+        if not buckets:
+            return
+
+        # Seed with the last ping before the first bucket
+        query = select(func.max(StatusPing.ping_timestamp)).where(
+            StatusPing.device_id == device_id,
+            StatusPing.ping_timestamp < buckets[0].bucket_start,
+        )
+        result = await self.db.execute(query)
+        last_ping_at = result.scalar()
+
+        # The device's own or group threshold, as used by the status checker
+        result = await self.db.execute(select(offline_threshold_seconds(device_id)))
+        threshold = timedelta(seconds=result.scalar())
+
+        # An archived ping only matters if it is within the threshold of the first bucket
+        if archive_horizon() and last_ping_at is None:
+            last_ping_at = await asyncio.to_thread(
+                self._last_archived_ping, device_id, buckets[0].bucket_start - threshold, buckets[0].bucket_start
+            )
+
+        for bucket in buckets:
+            if bucket.ping_count > 0:
+                bucket.status = StatusEnum.ONLINE
+                last_ping_at = bucket.last_ping_at
+            elif last_ping_at and bucket.bucket_start - last_ping_at < threshold:
+                bucket.status = StatusEnum.ONLINE
+            else:
+                bucket.status = StatusEnum.OFFLINE
@@ -1,11 +1,25 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, values, column, func, case, literal, extract
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.types import DateTime
 from redis.asyncio import Redis
-from datetime import datetime
-from uuid import UUID
+from datetime import datetime, timedelta
+from typing import List
+from uuid import UUID, uuid4
+from app.models.device import Device
 from app.models.ping import StatusPing
 from app.models.status import DeviceStatus, StatusEnum
-from app.schemas.ping import PingResponse
+from app.schemas.ping import BufferedPing, PingBatchResponse, PingResponse
+from app.core.cache import invalidate, device_status_key
+from app.core.database import is_db_unavailable
+from app.core.journal import journal_ping
+from app.services.group_service import expires_after
+from app.services.status_service import record_transitions
+from app.tasks.webhook_dispatcher import emit_status_events, status_event
+from app.config import get_settings
+
+settings = get_settings()
 
 
 class PingService:
@@ -14,42 +28,281 @@ class PingService:
         self.redis = redis
 
     async def record_ping(self, device_id: UUID) -> PingResponse:
-        """Record a ping from a device and update its status"""
+        """
+        Record a ping from a device and update its status.
+        If Postgres is unreachable the ping is journaled for later replay.
+        """
         current_time = datetime.utcnow()
+        ping_id = uuid4()
+
+        try:
+            came_online = await self._write_ping(ping_id, device_id, current_time)
+        except Exception as e:
+            if not is_db_unavailable(e):
+                raise
+            await journal_ping(self.redis, ping_id, device_id, current_time)
+            return PingResponse(
+                ping_id=ping_id,
+                device_id=device_id,
+                ping_timestamp=current_time,
+                message="Ping queued (database unavailable)",
+            )
+
+        # Invalidate cached status for this device
+        await invalidate(self.redis, device_status_key(device_id))
 
-        # Create ping record
-        new_ping = StatusPing(
+        if came_online:
+            result = await self.db.execute(
+                select(Device.device_name).where(Device.device_id == device_id)
+            )
+            await emit_status_events(self.redis, [
+                status_event(device_id, result.scalar(), StatusEnum.ONLINE, current_time)
+            ])
+
+        return PingResponse(
+            ping_id=ping_id,
             device_id=device_id,
             ping_timestamp=current_time,
         )
-        self.db.add(new_ping)
-        await self.db.flush()
 
-        # Update device status
-        query = select(DeviceStatus).where(DeviceStatus.device_id == device_id)
-        result = await self.db.execute(query)
-        device_status = result.scalar_one_or_none()
+    async def record_ping_batch(self, device_id: UUID, pings: List[BufferedPing]) -> PingBatchResponse:
+        """
+        Record pings a device buffered while offline, with their original timestamps.
+        Goes through the same path as journal replay: idempotent on ping_id, never
+        moves last_ping_at backwards, and doesn't train the learned interval.
+        Pings older than PING_BATCH_MAX_AGE_HOURS or too far in the future are skipped.
+        """
+        current_time = datetime.utcnow()
+        oldest = current_time - timedelta(hours=settings.PING_BATCH_MAX_AGE_HOURS)
+        newest = current_time + timedelta(seconds=settings.PING_BATCH_MAX_CLOCK_SKEW_SECONDS)
+        entries = [
+            {
+                "ping_id": str(ping.ping_id),
+                "device_id": str(device_id),
+                # Clamp small clock skew so a ping is never ahead of the server
+                "ping_timestamp": min(ping.ping_timestamp, current_time).isoformat(),
+            }
+            for ping in pings
+            if oldest <= ping.ping_timestamp <= newest
+        ]
+        rejected = len(pings) - len(entries)
+
+        try:
+            device_ids = await self.replay_pings(entries)
+        except Exception as e:
+            if not is_db_unavailable(e):
+                raise
+            for entry in entries:
+                await journal_ping(
+                    self.redis,
+                    UUID(entry["ping_id"]),
+                    device_id,
+                    datetime.fromisoformat(entry["ping_timestamp"]),
+                )
+            return PingBatchResponse(
+                device_id=device_id,
+                accepted=len(entries),
+                rejected=rejected,
+                message="Pings queued (database unavailable)",
+            )
+
+        if self.redis and device_ids:
+            await invalidate(self.redis, *[device_status_key(id) for id in device_ids])
 
-        if device_status:
-            # Check if status is changing
-            old_status = device_status.status
-            device_status.last_ping_at = current_time
-            device_status.status = StatusEnum.ONLINE
-            device_status.updated_at = current_time
+        return PingBatchResponse(device_id=device_id, accepted=len(entries), rejected=rejected)
 
-            if old_status != StatusEnum.ONLINE:
-                device_status.status_changed_at = current_time
+    async def _write_ping(
+        self, ping_id: UUID, device_id: UUID, current_time: datetime
+    ) -> bool:
+        """
+        Insert the ping and mark the device online.
+        Returns whether it just came online.
+        """
+        await self.db.execute(
+            insert(StatusPing).values(
+                ping_id=ping_id,
+                device_id=device_id,
+                ping_timestamp=current_time,
+                created_at=current_time,
+            )
+        )
+
+        # Update device status in one statement: fold this ping's inter-arrival
+        # time into the learned interval/jitter and push expires_at out by the
+        # resulting window. All right-hand sides see the row as it was
+        now = literal(current_time, DateTime())
+        online = literal(StatusEnum.ONLINE, DeviceStatus.status.type)
+        interval, jitter = self._learn_interval(now, online)
+        query = (
+            update(DeviceStatus)
+            .where(DeviceStatus.device_id == device_id)
+            .values(
+                last_ping_at=current_time,
+                ping_interval_seconds=interval,
+                ping_jitter_seconds=jitter,
+                expires_at=expires_after(now, DeviceStatus.device_id, interval, jitter),
+                status=online,
+                updated_at=current_time,
+                status_changed_at=case(
+                    (DeviceStatus.status != online, current_time),
+                    else_=DeviceStatus.status_changed_at,
+                ),
+            )
+            .returning(DeviceStatus.status_changed_at)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(query)
+        came_online = result.scalar_one_or_none() == current_time
+        if came_online:
+            await record_transitions(self.db, [device_id], StatusEnum.ONLINE, current_time)
 
         await self.db.commit()
-        
-        # Invalidate Redis cache for this device
-        cache_key = f"device_status:{device_id}"
-        await self.redis.delete(cache_key)
-        
-        await self.db.refresh(new_ping)
 
-        return PingResponse(
-            ping_id=new_ping.ping_id,
-            device_id=new_ping.device_id,
-            ping_timestamp=new_ping.ping_timestamp,
+        return came_online
+
+    @staticmethod
+    def _learn_interval(now, online):
+        """
+        SQL expressions for the updated interval and jitter EWMAs (O(1) per ping).
+
+        Only gaps between pings while the device was online and unexpired are
+        sampled, so an outage doesn't teach the device to be slow. Jitter is the
+        smoothed absolute deviation from the interval, as in TCP's RTO estimate.
+        """
+        previous = DeviceStatus.ping_interval_seconds
+        previous_jitter = DeviceStatus.ping_jitter_seconds
+        sample = extract("epoch", now - DeviceStatus.last_ping_at)
+        sampled = (
+            (DeviceStatus.status == online)
+            & DeviceStatus.last_ping_at.is_not(None)
+            & (now <= DeviceStatus.expires_at)
+        )
+        alpha = settings.PING_INTERVAL_EWMA_ALPHA
+        beta = settings.PING_JITTER_EWMA_BETA
+
+        interval = case(
+            (sampled, func.coalesce(previous + alpha * (sample - previous), sample)),
+            else_=previous,
         )
+        jitter = case(
+            (
+                sampled,
+                func.coalesce(
+                    previous_jitter + beta * (func.abs(sample - previous) - previous_jitter),
+                    sample / 2,
+                ),
+            ),
+            else_=previous_jitter,
+        )
+        return interval, jitter
+
+    async def replay_pings(self, entries: List[dict]) -> List[UUID]:
+        """
+        Bulk-insert journaled pings and advance last_ping_at.
+        Idempotent: pings already stored are skipped, and pings of devices
+        deleted in the meantime are dropped. Returns the affected device IDs.
+        """
+        if not entries:
+            return []
+
+        journal = values(
+            column("ping_id", PG_UUID(as_uuid=True)),
+            column("device_id", PG_UUID(as_uuid=True)),
+            column("ping_timestamp", DateTime()),
+            name="journal",
+        ).data([
+            (
+                UUID(entry["ping_id"]),
+                UUID(entry["device_id"]),
+                datetime.fromisoformat(entry["ping_timestamp"]),
+            )
+            for entry in entries
+        ])
+
+        # Only keep pings of devices that still exist
+        rows = select(
+            journal.c.ping_id,
+            journal.c.device_id,
+            journal.c.ping_timestamp,
+            journal.c.ping_timestamp,
+        ).join(Device, Device.device_id == journal.c.device_id)
+
+        insert_query = pg_insert(StatusPing).from_select(
+            ["ping_id", "device_id", "ping_timestamp", "created_at"], rows
+        ).on_conflict_do_nothing(index_elements=["ping_id"])
+        await self.db.execute(insert_query)
+
+        # Latest journaled ping per device
+        latest = {}
+        for entry in entries:
+            device_id = UUID(entry["device_id"])
+            ping_timestamp = datetime.fromisoformat(entry["ping_timestamp"])
+            if device_id not in latest or ping_timestamp > latest[device_id]:
+                latest[device_id] = ping_timestamp
+
+        current_time = datetime.utcnow()
+
+        latest_pings = values(
+            column("device_id", PG_UUID(as_uuid=True)),
+            column("last_ping_at", DateTime()),
+            name="latest_pings",
+        ).data(list(latest.items()))
+        # Replayed pings don't train the learned interval (their spacing
+        # reflects the outage), but the window still uses it
+        expires_at = expires_after(
+            latest_pings.c.last_ping_at,
+            latest_pings.c.device_id,
+            DeviceStatus.ping_interval_seconds,
+            DeviceStatus.ping_jitter_seconds,
+        )
+        recent = expires_at >= current_time
+        online = literal(StatusEnum.ONLINE, DeviceStatus.status.type)
+
+        # One UPDATE ... FROM (VALUES ...); never move last_ping_at backwards,
+        # and mark devices online if their latest ping hasn't expired yet
+        query = (
+            update(DeviceStatus)
+            .where(DeviceStatus.device_id == latest_pings.c.device_id)
+            .where(
+                func.coalesce(DeviceStatus.last_ping_at, latest_pings.c.last_ping_at)
+                <= latest_pings.c.last_ping_at
+            )
+            .values(
+                last_ping_at=latest_pings.c.last_ping_at,
+                expires_at=expires_at,
+                updated_at=current_time,
+                status=case((recent, online), else_=DeviceStatus.status),
+                status_changed_at=case(
+                    (recent & (DeviceStatus.status != online), current_time),
+                    else_=DeviceStatus.status_changed_at,
+                ),
+            )
+            .returning(
+                DeviceStatus.device_id,
+                DeviceStatus.status,
+                DeviceStatus.status_changed_at,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(query)
+        updated = result.all()
+
+        came_online = [
+            device_id
+            for device_id, status, status_changed_at in updated
+            if status == StatusEnum.ONLINE and status_changed_at == current_time
+        ]
+        await record_transitions(self.db, came_online, StatusEnum.ONLINE, current_time)
+
+        await self.db.commit()
+
+        if came_online:
+            result = await self.db.execute(
+                select(Device.device_id, Device.device_name).where(Device.device_id.in_(came_online))
+            )
+            await emit_status_events(self.redis, [
+                status_event(device_id, device_name, StatusEnum.ONLINE, current_time)
+                for device_id, device_name in result.all()
+            ])
+
+        return list(latest.keys())
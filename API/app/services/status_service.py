@@ -1,18 +1,41 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, func, tuple_, any_, bindparam, true
+from sqlalchemy.dialects.postgresql import ARRAY
 from redis.asyncio import Redis
-from typing import List, Optional
-from uuid import UUID
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
 from datetime import datetime
-import json
 from app.models.device import Device
 from app.models.status import DeviceStatus, StatusEnum
-from app.schemas.status import DeviceStatusResponse
+from app.models.transition import StatusTransition
+from app.schemas.status import DeviceStatusAt, DeviceStatusResponse, DeviceStatusSnapshot
 from app.schemas.online import OnlineDevicesResponse
+from app.core.database import read_session
+from app.core.cache import get_or_load, get_many_or_load, device_status_key
+from app.core.pagination import encode_cursor, decode_cursor, name_prefix_filter
 from app.config import get_settings
 
 settings = get_settings()
 
+TRANSITION_INSERT_CHUNK = 5000
+
+
+async def record_transitions(
+    db: AsyncSession, device_ids: List[UUID], status: StatusEnum, changed_at: datetime
+):
+    """
+    Append status changes to the transition log, in the caller's transaction
+    so the log never disagrees with device_status. Does not commit.
+    """
+    # Four bind parameters per row; chunks stay under Postgres' 32767 limit
+    for i in range(0, len(device_ids), TRANSITION_INSERT_CHUNK):
+        await db.execute(
+            insert(StatusTransition).values([
+                {"transition_id": uuid4(), "device_id": device_id, "status": status, "changed_at": changed_at}
+                for device_id in device_ids[i:i + TRANSITION_INSERT_CHUNK]
+            ])
+        )
+
 
 class StatusService:
     def __init__(self, db: AsyncSession, redis: Redis):
@@ -20,96 +43,263 @@ class StatusService:
         self.redis = redis
 
     async def get_device_status(self, device_id: UUID) -> Optional[DeviceStatusResponse]:
-        """Get status for a specific device with Redis caching"""
-        # Try cache first
-        cache_key = f"device_status:{device_id}"
-        cached = await self.redis.get(cache_key)
+        """Get status for a specific device with two-tier (local + Redis) caching"""
+        data = await get_or_load(
+            self.redis,
+            device_status_key(device_id),
+            lambda: self._load_device_status(device_id),
+        )
+
+        if data is None:
+            return None
 
-        if cached:
-            data = json.loads(cached)
-            return DeviceStatusResponse(**data)
+        # Only the snapshot is cached; relative fields are derived per request
+        return DeviceStatusResponse.from_snapshot(DeviceStatusSnapshot(**data))
 
-        # Query database
+    async def _load_device_status(self, device_id: UUID) -> Optional[dict]:
+        """
+        Load a device status snapshot from the database as a cacheable dict.
+        Uses its own session: the load is shared by concurrent requests and
+        may outlive the request that started it.
+        """
         query = select(Device, DeviceStatus).join(
             DeviceStatus, Device.device_id == DeviceStatus.device_id
         ).where(Device.device_id == device_id)
 
-        result = await self.db.execute(query)
-        row = result.first()
+        async with read_session() as session:
+            result = await session.execute(query)
+            row = result.first()
 
         if not row:
             return None
 
         device, status = row
-        
-        # Calculate time since last ping in seconds
-        time_since_last_ping_seconds = None
-        if status.last_ping_at:
-            time_since_last_ping_seconds = int((datetime.utcnow() - status.last_ping_at).total_seconds())
-        
-        response = DeviceStatusResponse(
-            device_id=device.device_id,
-            device_name=device.device_name,
-            status=status.status,
-            last_ping_at=status.last_ping_at,
-            status_changed_at=status.status_changed_at,
-            updated_at=status.updated_at,
-            time_since_last_ping_seconds=time_since_last_ping_seconds,
+        return self._build_snapshot(device, status).model_dump(mode="json")
+
+    async def get_fleet_counts(self, now: datetime) -> Dict[str, int]:
+        """
+        Active, online and overdue device counts in one round trip.
+        Online and overdue read only the partial indexes over online devices.
+        """
+        online = DeviceStatus.status == StatusEnum.ONLINE
+        query = select(
+            select(func.count()).select_from(Device).where(Device.is_active == True).scalar_subquery(),
+            select(func.count()).select_from(DeviceStatus).where(online).scalar_subquery(),
+            select(func.count())
+            .select_from(DeviceStatus)
+            .where(online, DeviceStatus.expires_at < now)
+            .scalar_subquery(),
         )
+        result = await self.db.execute(query)
+        devices, online_count, overdue = result.one()
+        return {"devices": devices, "online": online_count, "overdue": overdue}
 
-        # Cache the result
-        await self.redis.setex(
-            cache_key,
-            settings.REDIS_CACHE_TTL,
-            response.model_dump_json(),
+    async def get_device_statuses(
+        self, device_ids: List[UUID]
+    ) -> Tuple[List[DeviceStatusResponse], List[UUID]]:
+        """
+        Get statuses for a list of devices in two round trips: one Redis MGET,
+        then one query for every cache miss.
+
+        Returns the statuses in request order (duplicates removed) and the
+        IDs of devices that don't exist.
+        """
+        keys = {device_status_key(device_id): device_id for device_id in device_ids}
+        found = await get_many_or_load(
+            self.redis,
+            list(keys),
+            lambda missing: self._load_device_statuses([keys[key] for key in missing]),
         )
 
-        return response
+        now = datetime.utcnow()
+        responses = []
+        not_found = []
+        for key, device_id in keys.items():
+            data = found.get(key)
+            if data is None:
+                not_found.append(device_id)
+            else:
+                responses.append(DeviceStatusResponse.from_snapshot(DeviceStatusSnapshot(**data), now))
+        return responses, not_found
 
-    async def get_all_device_statuses(self) -> List[DeviceStatusResponse]:
-        """Get status for all devices"""
+    async def _load_device_statuses(self, device_ids: List[UUID]) -> Dict[str, dict]:
+        """Load snapshots keyed by cache key with a single = ANY() query"""
+        # One uuid[] parameter, so the statement is the same for any number of IDs
+        ids = bindparam("device_ids", device_ids, type_=ARRAY(Device.device_id.type))
         query = select(Device, DeviceStatus).join(
             DeviceStatus, Device.device_id == DeviceStatus.device_id
-        ).order_by(Device.device_name)
+        ).where(Device.device_id == any_(ids))
 
         result = await self.db.execute(query)
-        rows = result.all()
+        return {
+            device_status_key(device.device_id): self._build_snapshot(device, status).model_dump(mode="json")
+            for device, status in result.all()
+        }
 
-        responses = []
-        for device, status in rows:
-            # Calculate time since last ping in seconds
-            time_since_last_ping_seconds = None
-            if status.last_ping_at:
-                time_since_last_ping_seconds = int((datetime.utcnow() - status.last_ping_at).total_seconds())
-            
-            responses.append(
-                DeviceStatusResponse(
-                    device_id=device.device_id,
-                    device_name=device.device_name,
-                    status=status.status,
-                    last_ping_at=status.last_ping_at,
-                    status_changed_at=status.status_changed_at,
-                    updated_at=status.updated_at,
-                    time_since_last_ping_seconds=time_since_last_ping_seconds,
-                )
+    async def get_all_device_statuses(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        status: Optional[StatusEnum] = None,
+        is_active: Optional[bool] = None,
+        name_prefix: Optional[str] = None,
+    ) -> Tuple[List[DeviceStatusResponse], Optional[str]]:
+        """
+        Get a page of device statuses ordered by name, using keyset pagination
+
+        Returns the page and the cursor for the next page (None on the last page).
+        Raises ValueError if the cursor is malformed.
+        """
+        query = self._paginated_status_query(limit, cursor, name_prefix)
+
+        if status is not None:
+            query = query.where(DeviceStatus.status == status)
+        if is_active is not None:
+            query = query.where(Device.is_active == is_active)
+
+        result = await self.db.execute(query)
+        rows, next_cursor = self._split_page(result.all(), limit)
+
+        now = datetime.utcnow()
+        responses = [
+            DeviceStatusResponse.from_snapshot(self._build_snapshot(device, status), now)
+            for device, status in rows
+        ]
+        return responses, next_cursor
+
+    async def get_statuses_at(
+        self,
+        at: datetime,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        status: Optional[StatusEnum] = None,
+        name_prefix: Optional[str] = None,
+    ) -> Tuple[List[DeviceStatusAt], Optional[str]]:
+        """
+        Get a page of device statuses as they were at a point in time, ordered by name.
+
+        Each device's state is its newest transition at or before `at`, found
+        with one index probe per device (LATERAL ... ORDER BY changed_at DESC
+        LIMIT 1), so the cost depends on the page size, not on ping volume.
+        Devices with no transition by then (created later) are left out.
+        History from before the transition log existed was reconstructed
+        from pings by migration 11447d111205 using the device or group
+        threshold as it was at upgrade time (or the 20-minute default). It
+        ignores learned ping intervals and STATUS_MIN_DWELL_SECONDS, so it
+        can show offline spells the live sweep would not have recorded; months
+        already archived out of Postgres were not replayed, so a device reads
+        offline from its creation through them.
+        Raises ValueError if the cursor is malformed.
+        """
+        latest = (
+            select(StatusTransition.status, StatusTransition.changed_at)
+            .where(
+                StatusTransition.device_id == Device.device_id,
+                StatusTransition.changed_at <= at,
             )
+            .order_by(StatusTransition.changed_at.desc())
+            .limit(1)
+            .lateral("latest_transition")
+        )
+        query = self._paginate_by_name(
+            select(Device, latest.c.status, latest.c.changed_at).join(latest, true()),
+            limit,
+            cursor,
+            name_prefix,
+        )
+        if status is not None:
+            query = query.where(latest.c.status == status)
 
-        return responses
+        result = await self.db.execute(query)
+        rows, next_cursor = self._split_page(result.all(), limit)
 
-    async def get_online_devices(self) -> OnlineDevicesResponse:
-        """Get list of device names that are currently online"""
-        query = select(Device, DeviceStatus).join(
-            DeviceStatus, Device.device_id == DeviceStatus.device_id
-        ).where(
+        return [
+            DeviceStatusAt(
+                device_id=device.device_id,
+                device_name=device.device_name,
+                status=device_status,
+                status_changed_at=changed_at,
+            )
+            for device, device_status, changed_at in rows
+        ], next_cursor
+
+    @staticmethod
+    def _build_snapshot(device: Device, status: DeviceStatus) -> DeviceStatusSnapshot:
+        """Build the cacheable snapshot of a device status"""
+        return DeviceStatusSnapshot(
+            device_id=device.device_id,
+            device_name=device.device_name,
+            status=status.status,
+            last_ping_at=status.last_ping_at,
+            expires_at=status.expires_at,
+            ping_interval_seconds=status.ping_interval_seconds,
+            ping_jitter_seconds=status.ping_jitter_seconds,
+            status_changed_at=status.status_changed_at,
+            updated_at=status.updated_at,
+        )
+
+    async def get_online_devices(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        name_prefix: Optional[str] = None,
+    ) -> Tuple[OnlineDevicesResponse, Optional[str]]:
+        """
+        Get a page of device names that are currently online.
+        online_count is the total number of online devices, not the page size.
+        """
+        query = self._paginated_status_query(limit, cursor, name_prefix).where(
             DeviceStatus.status == StatusEnum.ONLINE
-        ).order_by(Device.device_name)
+        )
 
         result = await self.db.execute(query)
-        rows = result.all()
+        rows, next_cursor = self._split_page(result.all(), limit)
+
+        count_query = select(func.count()).select_from(DeviceStatus).where(
+            DeviceStatus.status == StatusEnum.ONLINE
+        )
+        count_result = await self.db.execute(count_query)
 
         online_names = [device.device_name for device, _ in rows]
 
         return OnlineDevicesResponse(
-            online_count=len(online_names),
+            online_count=count_result.scalar(),
             online_devices=online_names,
+        ), next_cursor
+
+    def _paginated_status_query(
+        self,
+        limit: int,
+        cursor: Optional[str],
+        name_prefix: Optional[str],
+    ):
+        """Base device/status query ordered by name with keyset cursor applied"""
+        query = select(Device, DeviceStatus).join(
+            DeviceStatus, Device.device_id == DeviceStatus.device_id
         )
+        return self._paginate_by_name(query, limit, cursor, name_prefix)
+
+    @staticmethod
+    def _paginate_by_name(query, limit: int, cursor: Optional[str], name_prefix: Optional[str]):
+        """Order a query on devices by name and apply the keyset cursor and name prefix"""
+        query = query.order_by(Device.device_name, Device.device_id)
+
+        if cursor:
+            device_name, device_id = decode_cursor(cursor, 2)
+            query = query.where(
+                tuple_(Device.device_name, Device.device_id) > tuple_(device_name, UUID(device_id))
+            )
+        if name_prefix:
+            query = query.where(name_prefix_filter(Device.device_name, name_prefix))
+
+        # Fetch one extra row to know whether there is a next page
+        return query.limit(limit + 1)
+
+    @staticmethod
+    def _split_page(rows, limit: int):
+        """Trim the look-ahead row and build the next cursor"""
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        device = rows[-1][0]
+        return rows, encode_cursor(device.device_name, device.device_id)
@@ -0,0 +1,59 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+from redis.asyncio import Redis
+from typing import List, Optional
+from uuid import UUID
+from app.models.webhook import Webhook
+from app.schemas.webhook import WebhookCreate, WebhookUpdate, WebhookResponse
+from app.tasks.webhook_dispatcher import reload_subscriptions
+
+
+class WebhookService:
+    def __init__(self, db: AsyncSession, redis: Redis = None):
+        self.db = db
+        self.redis = redis
+
+    async def create_webhook(self, webhook_data: WebhookCreate) -> WebhookResponse:
+        """Register a webhook subscription"""
+        webhook = Webhook(
+            url=str(webhook_data.url),
+            secret=webhook_data.secret,
+            description=webhook_data.description,
+        )
+        self.db.add(webhook)
+        await self.db.commit()
+        await self.db.refresh(webhook)
+        await reload_subscriptions(self.redis)
+
+        return WebhookResponse.model_validate(webhook)
+
+    async def get_all_webhooks(self) -> List[WebhookResponse]:
+        """Get all webhook subscriptions"""
+        query = select(Webhook).order_by(Webhook.created_at)
+        result = await self.db.execute(query)
+        return [WebhookResponse.model_validate(webhook) for webhook in result.scalars().all()]
+
+    async def update_webhook(
+        self, webhook_id: UUID, webhook_data: WebhookUpdate
+    ) -> Optional[WebhookResponse]:
+        """Update a webhook subscription"""
+        webhook = await self.db.get(Webhook, webhook_id)
+        if not webhook:
+            return None
+
+        for field, value in webhook_data.model_dump(exclude_unset=True, exclude_none=True).items():
+            setattr(webhook, field, str(value) if field == "url" else value)
+        await self.db.commit()
+        await self.db.refresh(webhook)
+        await reload_subscriptions(self.redis)
+
+        return WebhookResponse.model_validate(webhook)
+
+    async def delete_webhook(self, webhook_id: UUID) -> bool:
+        """Delete a webhook subscription; its pending deliveries are dropped"""
+        query = delete(Webhook).where(Webhook.webhook_id == webhook_id)
+        result = await self.db.execute(query)
+        await self.db.commit()
+        await reload_subscriptions(self.redis)
+
+        return result.rowcount > 0
@@ -0,0 +1,232 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from uuid import UUID, uuid4
+from app.core.database import AsyncSessionLocal
+from app.core.redis import get_redis
+from app.core.log import get_logger
+from app.schemas.device import DeviceDeletionProgress
+from app.services.device_service import DeviceService
+from app.config import get_settings
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+# How long finished deletion progress stays queryable
+PROGRESS_TTL_SECONDS = 86400
+
+# A device's deletion is leased in Redis by the worker running it, so no two
+# workers run the same job. Leases are renewed while the job is queued or
+# running and released when it ends; if the worker dies they expire, and a
+# new DELETE resumes the job.
+LEASE_TTL_SECONDS = 300
+LEASE_RENEW_SECONDS = LEASE_TTL_SECONDS / 3
+
+# Only touch a lease this worker still holds
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Identifies this worker's leases
+_owner = uuid4().hex
+
+# Deletions leased by this process, queued or running, with their live progress
+_running: Dict[UUID, DeviceDeletionProgress] = {}
+_tasks: Set[asyncio.Task] = set()
+_lease_keeper: Optional[asyncio.Task] = None
+
+
+def _progress_key(device_id: UUID) -> str:
+    return f"device_deletion:{device_id}"
+
+
+def _lease_key(device_id: UUID) -> str:
+    return f"device_deletion_lease:{device_id}"
+
+
+async def _save_progress(progress: DeviceDeletionProgress):
+    redis = await get_redis()
+    if redis:
+        await redis.set(
+            _progress_key(progress.device_id),
+            progress.model_dump_json(),
+            ex=PROGRESS_TTL_SECONDS,
+        )
+
+
+async def get_deletion_progress(device_id: UUID) -> Optional[DeviceDeletionProgress]:
+    """Get progress of a background device deletion (from any worker)"""
+    redis = await get_redis()
+    if not redis:
+        return None
+    cached = await redis.get(_progress_key(device_id))
+    if not cached:
+        return None
+    return DeviceDeletionProgress.model_validate_json(cached)
+
+
+async def _claim(device_ids: List[UUID]) -> List[bool]:
+    """Take the deletion leases for devices; False where another worker holds one"""
+    redis = await get_redis()
+    if not redis:
+        # Without Redis, only deletions in this process can be deduplicated
+        return [True] * len(device_ids)
+    pipe = redis.pipeline(transaction=False)
+    for device_id in device_ids:
+        pipe.set(_lease_key(device_id), _owner, nx=True, ex=LEASE_TTL_SECONDS)
+    return [bool(claimed) for claimed in await pipe.execute()]
+
+
+async def _release(device_id: UUID):
+    redis = await get_redis()
+    if redis:
+        await redis.eval(RELEASE_SCRIPT, 1, _lease_key(device_id), _owner)
+
+
+async def _keep_leases():
+    """Renew the leases of every deletion this process holds, until there are none"""
+    while _running:
+        await asyncio.sleep(LEASE_RENEW_SECONDS)
+        try:
+            redis = await get_redis()
+            if redis and _running:
+                pipe = redis.pipeline(transaction=False)
+                for device_id in list(_running):
+                    pipe.eval(RENEW_SCRIPT, 1, _lease_key(device_id), _owner, LEASE_TTL_SECONDS)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("deletion_lease_renewal_failed", extra={"error": str(e)})
+
+
+async def _delete_device_in_chunks(progress: DeviceDeletionProgress):
+    """Delete a device's ping history in bounded chunks, then the device itself"""
+    device_id = progress.device_id
+    try:
+        progress.state = "running"
+        await _save_progress(progress)
+
+        while True:
+            async with AsyncSessionLocal() as session:
+                deleted = await DeviceService(session).delete_ping_chunk(
+                    device_id, settings.DELETE_CHUNK_SIZE
+                )
+            if deleted == 0:
+                break
+            progress.deleted_pings += deleted
+            await _save_progress(progress)
+
+        async with AsyncSessionLocal() as session:
+            await DeviceService(session, await get_redis()).delete_device(device_id)
+
+        progress.state = "completed"
+    except asyncio.CancelledError:
+        # Shutdown; the device stays inactive and a new DELETE resumes the job
+        progress.state = "failed"
+        progress.error = "Interrupted by shutdown"
+        raise
+    except Exception as e:
+        progress.state = "failed"
+        progress.error = str(e)
+    finally:
+        progress.finished_at = datetime.utcnow()
+        _running.pop(device_id, None)
+        try:
+            await _release(device_id)
+        finally:
+            await _save_progress(progress)
+
+
+async def _delete_devices(progresses: List[DeviceDeletionProgress]):
+    """Work through queued deletions one device at a time"""
+    try:
+        for progress in progresses:
+            await _delete_device_in_chunks(progress)
+    finally:
+        # Cancelled part-way: let the queued jobs be resumed right away
+        for progress in progresses:
+            if progress.state == "pending":
+                _running.pop(progress.device_id, None)
+                progress.state = "failed"
+                progress.error = "Interrupted by shutdown"
+                progress.finished_at = datetime.utcnow()
+                await _release(progress.device_id)
+                await _save_progress(progress)
+
+
+async def start_device_deletions(device_ids: List[UUID]) -> List[DeviceDeletionProgress]:
+    """
+    Delete devices in the background, one at a time in a single task.
+    The devices must already be deactivated. A device whose deletion is
+    already queued or running, on this or another worker, is not queued
+    again; its current progress is returned instead.
+    """
+    global _lease_keeper
+    # Updated in place by the task, so current even if Redis is down
+    results = {device_id: _running[device_id] for device_id in device_ids if device_id in _running}
+    candidates = [device_id for device_id in dict.fromkeys(device_ids) if device_id not in results]
+
+    queued = []
+    held_elsewhere = []
+    for device_id, claimed in zip(candidates, await _claim(candidates)):
+        if not claimed:
+            held_elsewhere.append(device_id)
+            continue
+        progress = DeviceDeletionProgress(
+            device_id=device_id,
+            state="pending",
+            started_at=datetime.utcnow(),
+        )
+        _running[device_id] = progress
+        queued.append(progress)
+        results[device_id] = progress
+
+    try:
+        redis = await get_redis()
+        if redis and (queued or held_elsewhere):
+            pipe = redis.pipeline(transaction=False)
+            for progress in queued:
+                pipe.set(_progress_key(progress.device_id), progress.model_dump_json(), ex=PROGRESS_TTL_SECONDS)
+            for device_id in held_elsewhere:
+                pipe.get(_progress_key(device_id))
+            stored = (await pipe.execute())[len(queued):]
+            for device_id, cached in zip(held_elsewhere, stored):
+                results[device_id] = (
+                    DeviceDeletionProgress.model_validate_json(cached) if cached
+                    else DeviceDeletionProgress(device_id=device_id, state="pending", started_at=datetime.utcnow())
+                )
+    finally:
+        # Leased jobs must run even if recording them failed
+        if queued:
+            task = asyncio.create_task(_delete_devices(queued))
+            _tasks.add(task)
+            task.add_done_callback(_tasks.discard)
+            if _lease_keeper is None or _lease_keeper.done():
+                _lease_keeper = asyncio.create_task(_keep_leases())
+
+    return [results[device_id] for device_id in device_ids]
+
+
+async def start_device_deletion(device_id: UUID) -> DeviceDeletionProgress:
+    """Start deleting one device in the background (see start_device_deletions)"""
+    return (await start_device_deletions([device_id]))[0]
+
+
+async def stop_device_cleanup():
+    """Cancel deletions still running in this process and release their leases"""
+    global _lease_keeper
+    tasks = list(_tasks)
+    if _lease_keeper:
+        tasks.append(_lease_keeper)
+        _lease_keeper = None
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,81 @@
+from redis.exceptions import RedisError
+from app.core.database import AsyncSessionLocal, is_db_unavailable
+from app.core.redis import get_redis
+from app.core.cache import invalidate, device_status_key
+from app.core.journal import (
+    pop_redis_entries,
+    restore_redis_entries,
+    dead_letter_entries,
+    claim_file_entries,
+    release_file,
+)
+from app.core.log import get_logger
+from app.services.ping_service import PingService
+from app.config import get_settings
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+
+async def _replay_batch(redis, entries) -> bool:
+    """
+    Replay one batch of journaled pings; False if Postgres is still down.
+    If the batch fails for any other reason it is split to find the entries
+    at fault, which are dead-lettered so the rest still get replayed.
+    """
+    try:
+        async with AsyncSessionLocal() as session:
+            device_ids = await PingService(session, redis).replay_pings(entries)
+    except Exception as e:
+        if is_db_unavailable(e):
+            return False
+        if len(entries) == 1:
+            logger.error("journal_entry_dead_lettered", extra={"entry": entries[0], "error": str(e)})
+            await dead_letter_entries(redis, entries)
+            return True
+        # Replay is idempotent, so halves already stored are harmless to retry
+        middle = len(entries) // 2
+        return await _replay_batch(redis, entries[:middle]) and await _replay_batch(redis, entries[middle:])
+
+    if redis and device_ids:
+        try:
+            await invalidate(redis, *[device_status_key(device_id) for device_id in device_ids])
+        except RedisError as e:
+            # The pings are stored; cached statuses just expire on their own
+            logger.warning("journal_invalidate_failed", extra={"error": str(e)})
+    return True
+
+
+async def replay_ping_journal():
+    """Background task to replay pings journaled while Postgres was unavailable"""
+    redis = await get_redis()
+    batch_size = settings.JOURNAL_REPLAY_BATCH_SIZE
+
+    # Pings journaled to Redis (shared by all workers)
+    if redis:
+        while True:
+            try:
+                entries = await pop_redis_entries(redis, batch_size)
+            except RedisError:
+                break
+            if not entries:
+                break
+            replayed = False
+            try:
+                replayed = await _replay_batch(redis, entries)
+            finally:
+                # Also on an unexpected error or shutdown, so no popped ping is lost
+                if not replayed:
+                    await restore_redis_entries(redis, entries)
+            if not replayed:
+                return
+
+    # Pings journaled to this worker's local file while Redis was down too
+    path, entries = await claim_file_entries()
+    if path is None:
+        return
+    for start in range(0, len(entries), batch_size):
+        if not await _replay_batch(redis, entries[start:start + batch_size]):
+            # Keep the claimed file; the next run picks it up again
+            return
+    await release_file(path)
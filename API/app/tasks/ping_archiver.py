@@ -0,0 +1,45 @@
+from datetime import datetime
+from app.core.archive import archive_horizon
+from app.core.database import AsyncSessionLocal
+from app.core.redis import get_redis
+from app.services.history_service import HistoryService
+from app.core.log import get_logger
+from app.config import get_settings
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+# Only one worker archives at a time
+LOCK_KEY = "ping_archiver:lock"
+LOCK_TTL_SECONDS = 3600
+
+
+async def archive_old_pings():
+    """Background task to move whole months of old pings into the cold archive"""
+    horizon = archive_horizon()
+    if horizon is None:
+        return
+
+    redis = await get_redis()
+    if redis and not await redis.set(LOCK_KEY, datetime.utcnow().isoformat(), nx=True, ex=LOCK_TTL_SECONDS):
+        return
+
+    archived = 0
+    try:
+        async with AsyncSessionLocal() as session:
+            indexed = await HistoryService(session).index_unlisted_archives()
+            if indexed:
+                logger.info("archives_indexed", extra={"device_months": indexed})
+            months = await HistoryService(session).get_archivable_months(horizon)
+
+        for device_id, month in months:
+            async with AsyncSessionLocal() as session:
+                archived += await HistoryService(session).archive_device_month(device_id, month, horizon)
+            if redis:
+                await redis.expire(LOCK_KEY, LOCK_TTL_SECONDS)
+    finally:
+        if redis:
+            await redis.delete(LOCK_KEY)
+
+    if archived:
+        logger.info("pings_archived", extra={"pings": archived, "device_months": len(months), "horizon": horizon.isoformat()})
@@ -1,71 +1,78 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from sqlalchemy import select
+from sqlalchemy import select, update
 from app.core.database import AsyncSessionLocal
 from app.core.redis import get_redis
+from app.core.cache import invalidate, device_status_key
+from app.core.journal import is_degraded
+from app.tasks.journal_replay import replay_ping_journal
+from app.tasks.ping_archiver import archive_old_pings
+from app.tasks.webhook_dispatcher import emit_status_events, status_event
 from app.models.device import Device
 from app.models.status import DeviceStatus, StatusEnum
+from app.services.status_service import record_transitions
 from app.config import get_settings
 
 settings = get_settings()
 scheduler = AsyncIOScheduler()
 
 
+def expiry_sweep_query(current_time: datetime):
+    """
+    One set-based UPDATE over the partial index on expires_at (online rows
+    only), so the cost scales with the devices expiring, not the fleet.
+    expires_at already folds in each device's threshold and learned interval;
+    devices that only just came back online get a minimum dwell time.
+    """
+    dwell_cutoff = current_time - timedelta(seconds=settings.STATUS_MIN_DWELL_SECONDS)
+    return (
+        update(DeviceStatus)
+        .where(
+            DeviceStatus.status == StatusEnum.ONLINE,
+            DeviceStatus.expires_at < current_time,
+            DeviceStatus.status_changed_at <= dwell_cutoff,
+        )
+        .values(
+            status=StatusEnum.OFFLINE,
+            status_changed_at=current_time,
+            updated_at=current_time,
+        )
+        .returning(
+            DeviceStatus.device_id,
+            select(Device.device_name)
+            .where(Device.device_id == DeviceStatus.device_id)
+            .scalar_subquery(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
 async def check_device_statuses():
-    """Background task to check device statuses based on last ping time"""
+    """Background task to mark devices offline once they pass their expiry"""
+    current_time = datetime.utcnow()
+
+    # While pings are being journaled (or were until recently), expires_at
+    # lags reality; don't mark devices offline on the strength of it
+    if await is_degraded(await get_redis()):
+        return
+
     async with AsyncSessionLocal() as session:
-        # Get all devices with their last ping time
-        query = select(Device, DeviceStatus).join(
-            DeviceStatus, Device.device_id == DeviceStatus.device_id
-        ).where(Device.is_active == True)
-        
-        result = await session.execute(query)
-        devices_with_status = result.all()
-        
-        current_time = datetime.utcnow()
-        threshold_minutes = settings.OFFLINE_THRESHOLD_MINUTES
-        
-        # Track which devices changed status to invalidate cache
-        changed_device_ids = []
-        
-        for device, device_status in devices_with_status:
-            old_status = device_status.status
-            
-            if device_status.last_ping_at is None:
-                # Never pinged - mark as offline
-                if device_status.status != StatusEnum.OFFLINE:
-                    device_status.status = StatusEnum.OFFLINE
-                    device_status.status_changed_at = current_time
-                    device_status.updated_at = current_time
-                    changed_device_ids.append(device.device_id)
-            else:
-                # Check time since last ping
-                time_since_ping = (current_time - device_status.last_ping_at).total_seconds() / 60
-                
-                if time_since_ping > threshold_minutes:
-                    # Mark as offline
-                    if device_status.status != StatusEnum.OFFLINE:
-                        device_status.status = StatusEnum.OFFLINE
-                        device_status.status_changed_at = current_time
-                        device_status.updated_at = current_time
-                        changed_device_ids.append(device.device_id)
-                else:
-                    # Mark as online
-                    if device_status.status != StatusEnum.ONLINE:
-                        device_status.status = StatusEnum.ONLINE
-                        device_status.status_changed_at = current_time
-                        device_status.updated_at = current_time
-                        changed_device_ids.append(device.device_id)
-        
+        result = await session.execute(expiry_sweep_query(current_time))
+        went_offline = result.all()
+        changed_device_ids = [device_id for device_id, _ in went_offline]
+        await record_transitions(session, changed_device_ids, StatusEnum.OFFLINE, current_time)
         await session.commit()
-        
-        # Invalidate Redis cache for devices that changed status
-        if changed_device_ids:
-            redis = await get_redis()
-            if redis:
-                cache_keys = [f"device_status:{device_id}" for device_id in changed_device_ids]
-                if cache_keys:
-                    await redis.delete(*cache_keys)
+
+    # Invalidate cached status for devices that changed status
+    if changed_device_ids:
+        redis = await get_redis()
+        if redis:
+            cache_keys = [device_status_key(device_id) for device_id in changed_device_ids]
+            await invalidate(redis, *cache_keys)
+            await emit_status_events(redis, [
+                status_event(device_id, device_name, StatusEnum.OFFLINE, current_time)
+                for device_id, device_name in went_offline
+            ])
 
 
 async def start_status_checker():
@@ -77,6 +84,21 @@ async def start_status_checker():
         id='status_checker',
         replace_existing=True,
     )
+    scheduler.add_job(
+        replay_ping_journal,
+        'interval',
+        seconds=settings.JOURNAL_REPLAY_INTERVAL_SECONDS,
+        id='journal_replay',
+        replace_existing=True,
+    )
+    if settings.ARCHIVE_ENABLED:
+        scheduler.add_job(
+            archive_old_pings,
+            'interval',
+            hours=settings.ARCHIVE_INTERVAL_HOURS,
+            id='ping_archiver',
+            replace_existing=True,
+        )
     scheduler.start()
 
 
@@ -0,0 +1,290 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+from datetime import datetime
+from uuid import UUID, uuid4
+import httpx
+from redis.asyncio import Redis
+from sqlalchemy import select
+from app.core.database import AsyncSessionLocal
+from app.core.redis import listen
+from app.models.webhook import Webhook
+from app.models.status import StatusEnum
+from app.schemas.webhook import StatusChangeEvent
+from app.core.log import get_logger
+from app.config import get_settings
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+# Sorted set of pending deliveries (one event for one webhook each), scored by
+# when they are next due. Claimed deliveries are leased by pushing their score
+# into the future, so a worker that dies mid-delivery only delays them
+DELIVERIES_KEY = "webhook_deliveries"
+
+# Deliveries that exhausted their retries, newest first (capped)
+DEAD_LETTER_KEY = "webhook_dead_letter"
+DEAD_LETTER_MAX_ENTRIES = 1000
+
+# Atomically take due deliveries and lease them
+CLAIM_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, member in ipairs(due) do
+    redis.call('ZADD', KEYS[1], ARGV[3], member)
+end
+return due
+"""
+
+# Re-lease members whose score is still this claim's lease (ARGV[1]) until
+# ARGV[2]; ones another worker re-claimed after the lease ran out are left alone
+EXTEND_SCRIPT = """
+local kept = {}
+for i = 3, #ARGV do
+    if tonumber(redis.call('ZSCORE', KEYS[1], ARGV[i])) == tonumber(ARGV[1]) then
+        redis.call('ZADD', KEYS[1], ARGV[2], ARGV[i])
+        table.insert(kept, ARGV[i])
+    end
+end
+return kept
+"""
+
+# Tells every worker to reload subscriptions after an admin change
+RELOAD_CHANNEL = "webhook_subscriptions"
+
+# Active subscriptions: webhook_id -> (url, secret), refreshed periodically
+_subscriptions: Dict[str, tuple] = {}
+_subscriptions_loaded_at: float = 0
+
+_client: Optional[httpx.AsyncClient] = None
+_dispatcher_task: Optional[asyncio.Task] = None
+_listener_task: Optional[asyncio.Task] = None
+
+
+def _expire_subscriptions(_: str = ""):
+    global _subscriptions_loaded_at
+    _subscriptions_loaded_at = 0
+
+
+async def reload_subscriptions(redis: Optional[Redis]):
+    """Make every worker reload subscriptions on next use (after admin changes)"""
+    _expire_subscriptions()
+    if redis:
+        await redis.publish(RELOAD_CHANNEL, "")
+
+
+async def _get_subscriptions() -> Dict[str, tuple]:
+    global _subscriptions, _subscriptions_loaded_at
+    if time.monotonic() - _subscriptions_loaded_at > settings.WEBHOOK_SUBSCRIPTION_CACHE_SECONDS:
+        async with AsyncSessionLocal() as session:
+            query = select(Webhook.webhook_id, Webhook.url, Webhook.secret).where(Webhook.is_active == True)
+            result = await session.execute(query)
+            _subscriptions = {
+                str(webhook_id): (url, secret) for webhook_id, url, secret in result.all()
+            }
+        _subscriptions_loaded_at = time.monotonic()
+    return _subscriptions
+
+
+def status_event(
+    device_id: UUID, device_name: Optional[str], status: StatusEnum, changed_at: datetime
+) -> StatusChangeEvent:
+    """Build the webhook event for a device status transition"""
+    return StatusChangeEvent(
+        event=f"device.{status.value}",
+        device_id=device_id,
+        device_name=device_name,
+        status=status.value,
+        changed_at=changed_at,
+    )
+
+
+async def emit_status_events(redis: Optional[Redis], events: List[StatusChangeEvent]):
+    """
+    Log status transitions and queue them for delivery to every active webhook.
+    Never raises: a failure to queue must not fail the ping or sweep that caused it.
+    """
+    # Every transition is logged, unsampled
+    for event in events:
+        logger.info("status_changed", extra={
+            "device_id": str(event.device_id),
+            "status": event.status,
+            "changed_at": event.changed_at.isoformat(),
+        })
+    if not events or not redis:
+        return
+    try:
+        subscriptions = await _get_subscriptions()
+        if not subscriptions:
+            return
+
+        now = time.time()
+        deliveries = {}
+        for webhook_id in subscriptions:
+            for event in events:
+                delivery = {
+                    "id": str(uuid4()),
+                    "webhook_id": webhook_id,
+                    "event": event.model_dump(mode="json"),
+                    "attempt": 0,
+                }
+                deliveries[json.dumps(delivery)] = now
+        await redis.zadd(DELIVERIES_KEY, deliveries)
+    except Exception as e:
+        logger.error("webhook_enqueue_failed", extra={"events": len(events), "error": str(e)})
+
+
+def _sign(secret: str, body: bytes) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+async def deliver_batch(client: httpx.AsyncClient, url: str, secret: Optional[str], events: List[dict]) -> bool:
+    """POST one batch of events to an endpoint; True on a 2xx response"""
+    body = json.dumps({"events": events}).encode()
+    headers = {"Content-Type": "application/json"}
+    if secret:
+        headers["X-Webhook-Signature"] = _sign(secret, body)
+    try:
+        response = await client.post(url, content=body, headers=headers)
+    except httpx.HTTPError as e:
+        logger.warning("webhook_delivery_failed", extra={"url": url, "error": repr(e)})
+        return False
+    if not response.is_success:
+        logger.warning("webhook_delivery_failed", extra={"url": url, "status": response.status_code})
+    return response.is_success
+
+
+def _retry_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter: uniform in [0, min(cap, base * 2^attempt)]"""
+    ceiling = min(settings.WEBHOOK_RETRY_MAX_SECONDS, settings.WEBHOOK_RETRY_BASE_SECONDS * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+
+async def _settle(redis: Redis, members: List[str], delivered: bool):
+    """Remove delivered members, or reschedule/dead-letter failed ones"""
+    pipe = redis.pipeline(transaction=True)
+    pipe.zrem(DELIVERIES_KEY, *members)
+    if not delivered:
+        retries = {}
+        for member in members:
+            delivery = json.loads(member)
+            delivery["attempt"] += 1
+            if delivery["attempt"] >= settings.WEBHOOK_MAX_ATTEMPTS:
+                pipe.lpush(DEAD_LETTER_KEY, json.dumps(delivery))
+            else:
+                retries[json.dumps(delivery)] = time.time() + _retry_delay(delivery["attempt"])
+        if retries:
+            pipe.zadd(DELIVERIES_KEY, retries)
+        pipe.ltrim(DEAD_LETTER_KEY, 0, DEAD_LETTER_MAX_ENTRIES - 1)
+    await pipe.execute()
+
+
+async def dispatch_due(redis: Redis) -> int:
+    """
+    Claim due deliveries, batch them per endpoint and send them with bounded
+    concurrency. Returns the number of deliveries claimed.
+    """
+    now = time.time()
+    lease_until = now + settings.WEBHOOK_TIMEOUT_SECONDS * 2
+    claim = redis.register_script(CLAIM_SCRIPT)
+    extend = redis.register_script(EXTEND_SCRIPT)
+    members = await claim(
+        keys=[DELIVERIES_KEY],
+        args=[now, settings.WEBHOOK_MAX_CONCURRENCY * settings.WEBHOOK_BATCH_SIZE, lease_until],
+    )
+    if not members:
+        return 0
+
+    subscriptions = await _get_subscriptions()
+    by_webhook: Dict[str, List[str]] = defaultdict(list)
+    orphaned = []
+    for member in members:
+        webhook_id = json.loads(member)["webhook_id"]
+        if webhook_id in subscriptions:
+            by_webhook[webhook_id].append(member)
+        else:
+            # Webhook deleted or disabled since the event was queued
+            orphaned.append(member)
+    if orphaned:
+        await redis.zrem(DELIVERIES_KEY, *orphaned)
+
+    semaphore = asyncio.Semaphore(settings.WEBHOOK_MAX_CONCURRENCY)
+
+    async def send(webhook_id: str, batch: List[str]):
+        url, secret = subscriptions[webhook_id]
+        async with semaphore:
+            # The claim's lease may have run down while waiting for a slot;
+            # renew it for the send, dropping anything another worker now holds
+            batch = await extend(
+                keys=[DELIVERIES_KEY],
+                args=[lease_until, time.time() + settings.WEBHOOK_TIMEOUT_SECONDS * 2, *batch],
+            )
+            if not batch:
+                return
+            delivered = await deliver_batch(
+                _client, url, secret, [json.loads(member)["event"] for member in batch]
+            )
+        await _settle(redis, batch, delivered)
+
+    sends = []
+    for webhook_id, webhook_members in by_webhook.items():
+        for i in range(0, len(webhook_members), settings.WEBHOOK_BATCH_SIZE):
+            sends.append(send(webhook_id, webhook_members[i:i + settings.WEBHOOK_BATCH_SIZE]))
+    await asyncio.gather(*sends)
+
+    return len(members)
+
+
+async def _run_dispatcher(redis: Redis):
+    while True:
+        try:
+            claimed = await dispatch_due(redis)
+        except Exception:
+            # Redis or Postgres hiccup; leased deliveries come due again on their own
+            logger.exception("webhook_dispatcher_error")
+            claimed = 0
+        # Keep draining while there is a backlog
+        if not claimed:
+            await asyncio.sleep(settings.WEBHOOK_POLL_INTERVAL_SECONDS)
+
+
+async def _reload_after_subscribe():
+    _expire_subscriptions()
+
+
+async def start_webhook_dispatcher(redis: Redis):
+    """Start delivering queued webhook events and following subscription changes"""
+    global _client, _dispatcher_task, _listener_task
+    _client = httpx.AsyncClient(
+        timeout=settings.WEBHOOK_TIMEOUT_SECONDS,
+        limits=httpx.Limits(
+            max_connections=settings.WEBHOOK_MAX_CONCURRENCY,
+            max_keepalive_connections=settings.WEBHOOK_MAX_CONCURRENCY,
+        ),
+    )
+    _dispatcher_task = asyncio.create_task(_run_dispatcher(redis))
+    # Reload on every (re)subscribe too, in case a change was missed
+    _listener_task = asyncio.create_task(
+        listen(redis, RELOAD_CHANNEL, _expire_subscriptions, _reload_after_subscribe)
+    )
+
+
+async def stop_webhook_dispatcher():
+    """Stop the dispatcher; undelivered events stay queued in Redis"""
+    global _client, _dispatcher_task, _listener_task
+    for task in (_dispatcher_task, _listener_task):
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    _dispatcher_task = None
+    _listener_task = None
+    if _client:
+        await _client.aclose()
+        _client = None
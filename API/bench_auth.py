@@ -0,0 +1,106 @@
+"""
+Compare the cost of authenticating a ping by API key and by signed device token.
+
+Creates --devices throwaway devices in the database from DATABASE_URL (use a
+scratch database), then for each path measures single-call latency and how
+many authentications per second one worker (one event loop) sustains with
+--concurrency requests in flight. The devices are deleted afterwards.
+
+    DATABASE_URL=postgresql+asyncpg://... REDIS_URL=redis://localhost \\
+    SECRET_KEY=... MASTER_API_KEY=... python bench_auth.py --devices 10000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from app.api.middleware.auth import _authenticate_api_key, _authenticate_token
+from app.core.database import AsyncSessionLocal, engine
+from app.core.security import create_device_token
+from app.schemas.device import MAX_BULK_ITEMS
+from app.services.device_service import DeviceService
+
+
+async def create_devices(count: int):
+    created = []
+    async with AsyncSessionLocal() as session:
+        service = DeviceService(session)
+        for start in range(0, count, MAX_BULK_ITEMS):
+            names = [f"bench-{i}" for i in range(start, min(count, start + MAX_BULK_ITEMS))]
+            created += [device async for device in service.bulk_create_devices(names)]
+    return created
+
+
+async def delete_devices(device_ids):
+    async with AsyncSessionLocal() as session:
+        service = DeviceService(session)
+        for device_id in device_ids:
+            await service.delete_device(device_id)
+
+
+async def by_api_key(api_key: str):
+    # One session per request, as get_db does
+    async with AsyncSessionLocal() as session:
+        await _authenticate_api_key(None, api_key, session)
+
+
+async def by_token(token: str):
+    _authenticate_token(None, token)
+
+
+async def latency_us(check, credentials, calls: int):
+    samples = []
+    for _ in range(calls):
+        credential = random.choice(credentials)
+        started = time.perf_counter()
+        await check(credential)
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+async def throughput(check, credentials, concurrency: int, seconds: float) -> float:
+    done = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client():
+        nonlocal done
+        while time.perf_counter() < deadline:
+            await check(random.choice(credentials))
+            done += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return done / (time.perf_counter() - started)
+
+
+async def run(args):
+    devices = await create_devices(args.devices)
+    try:
+        paths = (
+            ("api key", by_api_key, [device.api_key for device in devices]),
+            ("token", by_token, [create_device_token(device.device_id)[0] for device in devices]),
+        )
+        print(f"{args.devices} devices, {args.concurrency} concurrent requests, one worker")
+        for name, check, credentials in paths:
+            await latency_us(check, credentials, 200)  # warm up pool and caches
+            p50, p99 = await latency_us(check, credentials, args.calls)
+            rate = await throughput(check, credentials, args.concurrency, args.seconds)
+            print(f"{name:<8} p50 {p50:8.1f} us   p99 {p99:8.1f} us   {rate:9.0f} auth/s")
+    finally:
+        await delete_devices([device.device_id for device in devices])
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--calls", type=int, default=2000, help="sequential calls for the latency figures")
+    parser.add_argument("--concurrency", type=int, default=30)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Compare the offline sweep done as an ORM loop with the set-based SQL sweep.
+
+The status checker used to load every active device with its status as ORM
+objects and compare timestamps in Python. An in-process columnar copy of
+the fleet (device index -> last-ping and status arrays, swept with NumPy)
+was considered to speed that loop up, but it is per worker, so it is wrong
+as soon as there is more than one, and it has to be written on every ping.
+The sweep is instead one UPDATE over the partial index on expires_at
+(expiry_sweep_query), whose cost follows the devices expiring rather than
+the fleet, and online counts read the same index. This measures both.
+
+Creates --devices throwaway devices in the database from DATABASE_URL (use a
+scratch database), all online, of which --expiring have passed their expiry.
+Each sweep runs in a transaction that is rolled back, so every run sees the
+same fleet. The devices are deleted afterwards.
+
+    DATABASE_URL=postgresql+asyncpg://... REDIS_URL=redis://localhost \\
+    SECRET_KEY=... MASTER_API_KEY=... python bench_sweep.py --devices 500000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime
+from sqlalchemy import select, text
+from app.core.database import AsyncSessionLocal, engine
+from app.models.device import Device
+from app.models.status import DeviceStatus, StatusEnum
+from app.services.status_service import StatusService
+from app.tasks.status_checker import expiry_sweep_query
+
+NAME_PREFIX = "bench-sweep-"
+
+
+async def create_fleet(devices: int, expiring: float):
+    async with engine.begin() as conn:
+        await conn.execute(text("""
+            INSERT INTO devices (device_id, device_name, api_key_hash, created_at, updated_at, is_active)
+            SELECT gen_random_uuid(), :prefix || i, md5(:prefix || i),
+                   timezone('utc', now()) - interval '1 day', timezone('utc', now()), true
+            FROM generate_series(1, :devices) i
+        """), {"prefix": NAME_PREFIX, "devices": devices})
+        await conn.execute(text("""
+            INSERT INTO device_status (status_id, device_id, status, last_ping_at, expires_at,
+                                       status_changed_at, updated_at)
+            SELECT gen_random_uuid(), d.device_id, CAST('ONLINE' AS statusenum), p.last_ping_at,
+                   p.last_ping_at + CASE WHEN random() < :expiring THEN interval '-1 minute'
+                                         ELSE interval '20 minutes' END,
+                   timezone('utc', now()) - interval '1 hour', p.last_ping_at
+            FROM devices d,
+                 LATERAL (SELECT timezone('utc', now()) - random() * interval '10 minutes' AS last_ping_at) p
+            WHERE d.device_name LIKE :prefix || '%'
+        """), {"prefix": NAME_PREFIX, "expiring": expiring})
+        await conn.execute(text("ANALYZE devices, device_status"))
+
+
+async def delete_fleet():
+    async with engine.begin() as conn:
+        await conn.execute(text("DELETE FROM devices WHERE device_name LIKE :prefix || '%'"), {"prefix": NAME_PREFIX})
+
+
+async def orm_loop():
+    """What check_device_statuses did before: load everything, compare in Python"""
+    current_time = datetime.utcnow()
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Device, DeviceStatus)
+            .join(DeviceStatus, Device.device_id == DeviceStatus.device_id)
+            .where(Device.is_active == True)
+        )
+        changed = 0
+        for _, device_status in result.all():
+            if device_status.status == StatusEnum.ONLINE and device_status.expires_at < current_time:
+                device_status.status = StatusEnum.OFFLINE
+                device_status.status_changed_at = current_time
+                changed += 1
+        await session.rollback()
+    return changed
+
+
+async def sql_sweep():
+    async with AsyncSessionLocal() as session:
+        changed = len((await session.execute(expiry_sweep_query(datetime.utcnow()))).all())
+        await session.rollback()
+    return changed
+
+
+async def orm_counts():
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(DeviceStatus))
+        return sum(1 for device_status in result.scalars() if device_status.status == StatusEnum.ONLINE)
+
+
+async def sql_counts():
+    async with AsyncSessionLocal() as session:
+        return (await StatusService(session, None).get_fleet_counts(datetime.utcnow()))["online"]
+
+
+async def timed_ms(call, runs: int):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = await call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+async def run(args):
+    await create_fleet(args.devices, args.expiring)
+    try:
+        print(f"{args.devices} devices online, {args.expiring:.1%} expiring, median of {args.runs} runs")
+        for name, call in (
+            ("sweep  orm loop", orm_loop),
+            ("sweep  sql", sql_sweep),
+            ("online orm loop", orm_counts),
+            ("online sql", sql_counts),
+        ):
+            await call()  # warm up pool and caches
+            ms, result = await timed_ms(call, args.runs)
+            print(f"{name:<16} {ms:10.1f} ms   result {result}")
+    finally:
+        await delete_fleet()
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=100000)
+    parser.add_argument("--expiring", type=float, default=0.01, help="fraction of devices past their expiry")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Shared test setup. Tests that run against Postgres are skipped unless
+TEST_DATABASE_URL points at a scratch database whose tables may be emptied:
+
+    TEST_DATABASE_URL=postgresql+asyncpg://postgres@localhost/status_test python -m pytest tests
+"""
+import os
+
+import pytest
+import pytest_asyncio
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+# Settings are read on import, so point the app at the test database first.
+# Tests that don't need Postgres never connect to the placeholder
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL or "postgresql+asyncpg://localhost/unused"
+os.environ["ARCHIVE_ENABLED"] = "false"
+os.environ.setdefault("REDIS_URL", "redis://localhost")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("MASTER_API_KEY", "test")
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def migrated():
+    """Bring the test database to the latest schema"""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(API_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(API_DIR, "alembic"))
+    command.upgrade(config, "head")
+
+
+@pytest_asyncio.fixture
+async def db(migrated):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    engine = create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
@@ -0,0 +1,153 @@
+"""
+Query plan checks for the hot history and status queries.
+
+Runs the real service calls against a seeded Postgres, captures the SQL they
+send and fails if EXPLAIN shows a sort, or a sequential scan of a table that
+grows with the fleet (small lookup tables such as device_groups are
+legitimately scanned). Needs TEST_DATABASE_URL (see conftest.py).
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+if not os.environ.get("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+import json
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.history_service import HistoryService
+from app.services.status_service import StatusService
+from app.tasks.status_checker import expiry_sweep_query
+
+DEVICES = 5000
+PINGS_PER_DEVICE = 100
+PING_SPACING_MINUTES = 100
+
+SORT_NODES = {"Sort", "Incremental Sort"}
+LARGE_TABLES = {"devices", "device_status", "status_pings", "status_transitions"}
+
+
+@pytest.fixture(scope="module")
+def seeded_device_id(migrated):
+    """Fill the test database with a fleet and its pings, and return one device"""
+    engine = create_engine(os.environ["TEST_DATABASE_URL"].replace("+asyncpg", ""), isolation_level="AUTOCOMMIT")
+    with engine.connect() as conn:
+        conn.execute(text("TRUNCATE devices, device_groups, webhooks CASCADE"))
+        conn.execute(text("""
+            INSERT INTO devices (device_id, device_name, api_key_hash, created_at, updated_at, is_active)
+            SELECT gen_random_uuid(), 'device-' || lpad(i::text, 5, '0'), md5(i::text) || md5('key' || i),
+                   timezone('utc', now()) - interval '30 days', timezone('utc', now()), true
+            FROM generate_series(1, :devices) i
+        """), {"devices": DEVICES})
+        # Pings every PING_SPACING_MINUTES, newest within the last interval
+        conn.execute(text("""
+            INSERT INTO status_pings (ping_id, device_id, ping_timestamp, created_at)
+            SELECT gen_random_uuid(), d.device_id, t.ts, t.ts
+            FROM devices d, generate_series(0, :pings - 1) n,
+                 LATERAL (
+                     SELECT timezone('utc', now())
+                            - make_interval(mins => n * :spacing)
+                            - random() * make_interval(mins => :spacing) AS ts
+                 ) t
+        """), {"pings": PINGS_PER_DEVICE, "spacing": PING_SPACING_MINUTES})
+        # A third of the fleet online, a few of those already past their expiry
+        conn.execute(text("""
+            INSERT INTO device_status (status_id, device_id, status, last_ping_at, expires_at,
+                                       status_changed_at, updated_at)
+            SELECT gen_random_uuid(), d.device_id,
+                   CAST(CASE WHEN d.rn % 3 = 0 THEN 'ONLINE' ELSE 'OFFLINE' END AS statusenum),
+                   p.last_ping_at,
+                   p.last_ping_at + CASE WHEN d.rn % 300 = 0 THEN interval '-1 hour' ELSE interval '1 day' END,
+                   p.last_ping_at, p.last_ping_at
+            FROM (SELECT device_id, row_number() OVER (ORDER BY device_id) AS rn FROM devices) d
+            JOIN (SELECT device_id, max(ping_timestamp) AS last_ping_at FROM status_pings GROUP BY device_id) p
+              ON p.device_id = d.device_id
+        """))
+        conn.execute(text("VACUUM ANALYZE"))
+        device_id = conn.execute(text("SELECT device_id FROM devices ORDER BY device_name LIMIT 1")).scalar()
+    engine.dispose()
+    return device_id
+
+
+async def plans_for(db: AsyncSession, call):
+    """Run call(), roll back, and return (statement, plan) for every statement it sent"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    sync_engine = db.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", capture)
+    try:
+        await call()
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", capture)
+    await db.rollback()
+
+    conn = await db.connection()
+    plans = []
+    for statement, parameters in statements:
+        result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        plan = result.scalar()
+        plans.append((statement, json.loads(plan) if isinstance(plan, str) else plan))
+    await db.rollback()
+    return plans
+
+
+def forbidden_nodes(plan):
+    """Node descriptions of every sort, and sequential scan of a large table, in a plan tree"""
+    found = []
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        seq_scan = node["Node Type"] == "Seq Scan" and node["Relation Name"] in LARGE_TABLES
+        if seq_scan or node["Node Type"] in SORT_NODES:
+            found.append(f'{node["Node Type"]} {node.get("Relation Name", "")}'.strip())
+        nodes.extend(node.get("Plans", []))
+    return found
+
+
+async def assert_index_plans(db: AsyncSession, call):
+    plans = await plans_for(db, call)
+    assert plans, "no statements were captured"
+    for statement, plan in plans:
+        found = forbidden_nodes(plan)
+        assert not found, f"{found} in plan for:\n{statement}\n{json.dumps(plan, indent=1)}"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("days", [None, 1])
+async def test_device_history(db, seeded_device_id, days):
+    service = HistoryService(db)
+    await assert_index_plans(db, lambda: service.get_ping_history(device_id=seeded_device_id, limit=100, days=days))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("days", [None, 1])
+async def test_fleet_history(db, seeded_device_id, days):
+    service = HistoryService(db)
+    await assert_index_plans(db, lambda: service.get_ping_history(limit=100, days=days))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("for_device", [False, True])
+async def test_timeline(db, seeded_device_id, for_device):
+    service = HistoryService(db)
+    end = datetime.utcnow()
+    device_id = seeded_device_id if for_device else None
+    await assert_index_plans(
+        db, lambda: service.get_timeline(end - timedelta(days=1), end, 60, device_id)
+    )
+
+
+@pytest.mark.asyncio
+async def test_online_devices(db, seeded_device_id):
+    service = StatusService(db, None)
+    await assert_index_plans(db, lambda: service.get_online_devices(limit=100))
+
+
+@pytest.mark.asyncio
+async def test_expiry_sweep(db, seeded_device_id):
+    await assert_index_plans(db, lambda: db.execute(expiry_sweep_query(datetime.utcnow())))
@@ -0,0 +1,121 @@
+"""
+Offline expiry against Postgres: a device pinging with jitter around its
+threshold must not flap, and the sweep must still catch it once it stops.
+Needs TEST_DATABASE_URL (see conftest.py).
+"""
+import os
+import random
+from datetime import timedelta
+from uuid import uuid4
+
+import pytest
+
+if not os.environ.get("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+import pytest_asyncio
+from sqlalchemy import delete, select
+from app.config import get_settings
+from app.models.device import Device
+from app.models.status import DeviceStatus
+from app.models.transition import StatusTransition
+from app.services.device_service import DeviceService
+from app.services.group_service import expiry_window_seconds
+from app.services.ping_service import PingService
+from app.tasks.status_checker import expiry_sweep_query
+
+settings = get_settings()
+
+THRESHOLD_SECONDS = 600
+NOMINAL_INTERVAL_SECONDS = 540
+JITTER_SECONDS = 90
+PINGS = 60
+
+
+@pytest_asyncio.fixture
+async def device_id(db):
+    device = await DeviceService(db).create_device(
+        f"expiry-{uuid4().hex[:8]}", offline_threshold_seconds=THRESHOLD_SECONDS
+    )
+    yield device.device_id
+    await db.execute(delete(Device).where(Device.device_id == device.device_id))
+    await db.commit()
+
+
+async def load_status(db, device_id) -> DeviceStatus:
+    result = await db.execute(
+        select(DeviceStatus)
+        .where(DeviceStatus.device_id == device_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one()
+
+
+async def swept_offline(db, device_id, at) -> bool:
+    """Run the offline sweep as of `at` and report whether it caught the device (rolled back)"""
+    result = await db.execute(expiry_sweep_query(at))
+    swept = device_id in {row[0] for row in result.all()}
+    await db.rollback()
+    return swept
+
+
+@pytest.mark.asyncio
+async def test_jittered_pings_do_not_flap(db, device_id):
+    rng = random.Random(37)
+    ping_service = PingService(db, None)
+    now = (await load_status(db, device_id)).status_changed_at
+
+    # Two steady gaps to learn from, then jitter that regularly overshoots the threshold
+    gaps = [NOMINAL_INTERVAL_SECONDS] * 2 + [
+        NOMINAL_INTERVAL_SECONDS + rng.uniform(-JITTER_SECONDS, JITTER_SECONDS) for _ in range(PINGS)
+    ]
+    assert sum(gap > THRESHOLD_SECONDS for gap in gaps) >= 5
+
+    await ping_service._write_ping(uuid4(), device_id, now)
+    for gap in gaps:
+        next_ping = now + timedelta(seconds=gap)
+        # The sweep only catches more as time passes, so the last instant before
+        # the next ping is the strictest check
+        assert not await swept_offline(db, device_id, next_ping - timedelta(microseconds=1)), (
+            f"flapped offline in a {gap:.0f}s gap"
+        )
+        now = next_ping
+        await ping_service._write_ping(uuid4(), device_id, now)
+
+        # expires_at is the ping plus the device's current expiry window
+        status = await load_status(db, device_id)
+        window = await db.scalar(
+            select(expiry_window_seconds(
+                DeviceStatus.device_id, DeviceStatus.ping_interval_seconds, DeviceStatus.ping_jitter_seconds
+            )).where(DeviceStatus.device_id == device_id)
+        )
+        assert status.expires_at == status.last_ping_at + timedelta(seconds=float(window))
+        assert THRESHOLD_SECONDS <= window <= THRESHOLD_SECONDS * settings.ADAPTIVE_EXPIRY_MAX_FACTOR
+
+    # Online once, never offline since
+    transitions = (await db.execute(
+        select(StatusTransition.status).where(StatusTransition.device_id == device_id)
+    )).scalars().all()
+    assert [status.value for status in transitions].count("offline") == 1
+    assert len(transitions) == 2
+
+    # Once the pings stop, the sweep catches it as soon as the window is up
+    expires_at = (await load_status(db, device_id)).expires_at
+    assert not await swept_offline(db, device_id, expires_at - timedelta(seconds=1))
+    assert await swept_offline(db, device_id, expires_at + timedelta(seconds=1))
+
+
+@pytest.mark.asyncio
+async def test_device_stays_online_for_min_dwell(db, device_id):
+    came_online = (await load_status(db, device_id)).status_changed_at + timedelta(seconds=1)
+    await PingService(db, None)._write_ping(uuid4(), device_id, came_online)
+
+    # Expired almost immediately, as with a window cut short
+    status = await load_status(db, device_id)
+    status.expires_at = came_online + timedelta(seconds=10)
+    await db.commit()
+
+    dwell = timedelta(seconds=settings.STATUS_MIN_DWELL_SECONDS)
+    assert not await swept_offline(db, device_id, came_online + timedelta(seconds=60))
+    assert not await swept_offline(db, device_id, came_online + dwell - timedelta(seconds=1))
+    assert await swept_offline(db, device_id, came_online + dwell + timedelta(seconds=1))
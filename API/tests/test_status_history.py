@@ -0,0 +1,125 @@
+"""
+The status transition log and /status/at against Postgres.
+Needs TEST_DATABASE_URL (see conftest.py).
+"""
+import os
+from datetime import timedelta, timezone
+from uuid import uuid4
+
+import pytest
+
+if not os.environ.get("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+import httpx
+import pytest_asyncio
+from sqlalchemy import delete, select
+from app.core.database import get_read_db
+from app.core.redis import get_redis
+from app.main import app
+from app.models.device import Device
+from app.models.status import StatusEnum
+from app.models.transition import StatusTransition
+from app.services import status_service
+from app.services.device_service import DeviceService
+from app.services.ping_service import PingService
+from app.services.status_service import record_transitions
+
+
+@pytest_asyncio.fixture
+async def fleet(db):
+    """Three new devices sharing a unique name prefix, with when they were created"""
+    prefix = f"history-{uuid4().hex[:8]}-"
+    devices = [await DeviceService(db).create_device(f"{prefix}{name}") for name in "abc"]
+    created_at = max(device.created_at for device in devices)
+    yield prefix, [device.device_id for device in devices], created_at
+    await db.execute(delete(Device).where(Device.device_name.startswith(prefix)))
+    await db.commit()
+
+
+@pytest_asyncio.fixture
+async def client(db):
+    async def test_db():
+        yield db
+
+    async def no_redis():
+        return None
+
+    app.dependency_overrides[get_read_db] = test_db
+    app.dependency_overrides[get_redis] = no_redis
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+async def transitions(db, device_id):
+    result = await db.execute(
+        select(StatusTransition.status, StatusTransition.changed_at)
+        .where(StatusTransition.device_id == device_id)
+        .order_by(StatusTransition.changed_at)
+    )
+    return result.all()
+
+
+@pytest.mark.asyncio
+async def test_record_transitions_in_chunks(db, fleet, monkeypatch):
+    _, device_ids, created_at = fleet
+    monkeypatch.setattr(status_service, "TRANSITION_INSERT_CHUNK", 2)
+    changed_at = created_at + timedelta(minutes=5)
+
+    await record_transitions(db, device_ids, StatusEnum.ONLINE, changed_at)
+    await db.commit()
+
+    for device_id in device_ids:
+        # Registration logged the device as offline; then the recorded change
+        assert [status for status, _ in await transitions(db, device_id)] == [StatusEnum.OFFLINE, StatusEnum.ONLINE]
+        assert (await transitions(db, device_id))[-1].changed_at == changed_at
+
+
+@pytest.mark.asyncio
+async def test_ping_logs_only_status_changes(db, fleet):
+    _, (device_id, *_), created_at = fleet
+    ping_service = PingService(db, None)
+
+    await ping_service._write_ping(uuid4(), device_id, created_at + timedelta(minutes=1))
+    await ping_service._write_ping(uuid4(), device_id, created_at + timedelta(minutes=2))
+
+    assert [status for status, _ in await transitions(db, device_id)] == [StatusEnum.OFFLINE, StatusEnum.ONLINE]
+
+
+@pytest.mark.asyncio
+async def test_status_at(db, fleet, client):
+    prefix, (a, b, c), created_at = fleet
+    await record_transitions(db, [a, b], StatusEnum.ONLINE, created_at + timedelta(minutes=10))
+    await record_transitions(db, [a], StatusEnum.OFFLINE, created_at + timedelta(minutes=40))
+    await db.commit()
+
+    async def statuses_at(ts, **params):
+        response = await client.get(
+            "/api/v1/status/at", params={"ts": ts.isoformat(), "name_prefix": prefix, **params}
+        )
+        assert response.status_code == 200
+        return {row["device_name"][len(prefix):]: row for row in response.json()}, response
+
+    # Before the devices existed
+    assert (await statuses_at(created_at - timedelta(minutes=1)))[0] == {}
+
+    page, _ = await statuses_at(created_at + timedelta(minutes=20))
+    assert {name: row["status"] for name, row in page.items()} == {"a": "online", "b": "online", "c": "offline"}
+
+    page, _ = await statuses_at(created_at + timedelta(minutes=50))
+    assert {name: row["status"] for name, row in page.items()} == {"a": "offline", "b": "online", "c": "offline"}
+    assert page["a"]["status_changed_at"] == (created_at + timedelta(minutes=40)).isoformat()
+
+    # Filtered by status, and the same instant given with an offset
+    at = (created_at + timedelta(minutes=50)).replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=2)))
+    page, _ = await statuses_at(at, status="offline")
+    assert sorted(page) == ["a", "c"]
+
+    # Paged by name
+    page, response = await statuses_at(created_at + timedelta(minutes=50), limit=2)
+    assert sorted(page) == ["a", "b"]
+    page, _ = await statuses_at(
+        created_at + timedelta(minutes=50), limit=2, cursor=response.headers["X-Next-Cursor"]
+    )
+    assert sorted(page) == ["c"]
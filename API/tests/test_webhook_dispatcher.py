@@ -0,0 +1,199 @@
+"""
+Webhook delivery against a stub endpoint (httpx.MockTransport) and an
+in-memory Redis: batching, retry with full-jitter backoff, requeue, dead
+letters, lease renewal and subscription reloads across workers.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime
+from uuid import uuid4
+
+import fakeredis
+import httpx
+import pytest
+import pytest_asyncio
+from app.models.status import StatusEnum
+from app.tasks import webhook_dispatcher as dispatcher
+from app.tasks.webhook_dispatcher import DEAD_LETTER_KEY, DELIVERIES_KEY, RELOAD_CHANNEL
+
+SECRET = "s3cret"
+WEBHOOKS = {
+    str(uuid4()): ("https://a.example/hook", SECRET),
+    str(uuid4()): ("https://b.example/hook", None),
+}
+
+
+class Endpoint:
+    """Records each POSTed batch and answers with the current status code"""
+
+    def __init__(self):
+        self.batches = []
+        self.status_code = 200
+        self.on_request = None
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.batches.append((str(request.url), request.headers, request.content))
+        if self.on_request:
+            await self.on_request(request)
+        return httpx.Response(self.status_code)
+
+    def events(self, url=None):
+        return [
+            event
+            for batch_url, _, body in self.batches
+            if url in (None, batch_url)
+            for event in json.loads(body)["events"]
+        ]
+
+
+@pytest_asyncio.fixture
+async def redis():
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+def endpoint(monkeypatch):
+    endpoint = Endpoint()
+    monkeypatch.setattr(dispatcher, "_client", httpx.AsyncClient(transport=httpx.MockTransport(endpoint)))
+    monkeypatch.setattr(dispatcher, "_subscriptions", dict(WEBHOOKS))
+    monkeypatch.setattr(dispatcher, "_subscriptions_loaded_at", time.monotonic())
+    monkeypatch.setattr(dispatcher.settings, "WEBHOOK_BATCH_SIZE", 10)
+    return endpoint
+
+
+async def queue_events(redis, count):
+    await dispatcher.emit_status_events(redis, [
+        dispatcher.status_event(uuid4(), f"device-{i}", StatusEnum.OFFLINE, datetime.utcnow())
+        for i in range(count)
+    ])
+
+
+async def make_due(redis):
+    """Bring every queued retry forward to now"""
+    members = await redis.zrange(DELIVERIES_KEY, 0, -1)
+    if members:
+        await redis.zadd(DELIVERIES_KEY, {member: 0 for member in members})
+
+
+@pytest.mark.asyncio
+async def test_events_are_batched_per_endpoint(redis, endpoint):
+    await queue_events(redis, 25)
+
+    assert await dispatcher.dispatch_due(redis) == 50
+    assert await redis.zcard(DELIVERIES_KEY) == 0
+    for url, secret in WEBHOOKS.values():
+        batches = [(headers, body) for batch_url, headers, body in endpoint.batches if batch_url == url]
+        assert sorted(len(json.loads(body)["events"]) for _, body in batches) == [5, 10, 10]
+        assert len({event["device_id"] for event in endpoint.events(url)}) == 25
+        for headers, body in batches:
+            if secret:
+                expected = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+                assert headers["X-Webhook-Signature"] == expected
+            else:
+                assert "X-Webhook-Signature" not in headers
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_requeued_with_backoff_then_delivered(redis, endpoint, monkeypatch):
+    monkeypatch.setattr(dispatcher, "_subscriptions", dict(list(WEBHOOKS.items())[:1]))
+    await queue_events(redis, 5)
+    endpoint.status_code = 503
+
+    before = time.time()
+    await dispatcher.dispatch_due(redis)
+    after = time.time()
+
+    queued = await redis.zrange(DELIVERIES_KEY, 0, -1, withscores=True)
+    assert len(queued) == 5
+    ceiling = min(dispatcher.settings.WEBHOOK_RETRY_MAX_SECONDS, dispatcher.settings.WEBHOOK_RETRY_BASE_SECONDS * 2)
+    for member, due in queued:
+        assert json.loads(member)["attempt"] == 1
+        assert before <= due <= after + ceiling
+
+    # Not due yet, so nothing is sent until the backoff passes
+    assert await dispatcher.dispatch_due(redis) == 0
+
+    endpoint.status_code = 200
+    await make_due(redis)
+    assert await dispatcher.dispatch_due(redis) == 5
+    assert await redis.zcard(DELIVERIES_KEY) == 0
+    assert len(endpoint.batches) == 2
+    assert endpoint.events()[:5] == endpoint.events()[5:]
+
+
+@pytest.mark.asyncio
+async def test_exhausted_deliveries_are_dead_lettered(redis, endpoint, monkeypatch):
+    monkeypatch.setattr(dispatcher, "_subscriptions", dict(list(WEBHOOKS.items())[:1]))
+    monkeypatch.setattr(dispatcher.settings, "WEBHOOK_MAX_ATTEMPTS", 2)
+    await queue_events(redis, 3)
+    endpoint.status_code = 500
+
+    await dispatcher.dispatch_due(redis)
+    await make_due(redis)
+    await dispatcher.dispatch_due(redis)
+
+    assert await redis.zcard(DELIVERIES_KEY) == 0
+    dead = [json.loads(member) for member in await redis.lrange(DEAD_LETTER_KEY, 0, -1)]
+    assert len(dead) == 3
+    assert all(delivery["attempt"] == 2 for delivery in dead)
+
+
+def test_retry_delay_is_full_jitter(monkeypatch):
+    monkeypatch.setattr(dispatcher.settings, "WEBHOOK_RETRY_BASE_SECONDS", 5)
+    monkeypatch.setattr(dispatcher.settings, "WEBHOOK_RETRY_MAX_SECONDS", 100)
+
+    for attempt, ceiling in ((1, 10), (3, 40), (10, 100)):
+        delays = [dispatcher._retry_delay(attempt) for _ in range(2000)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        # Spread over the whole range, not clustered at the ceiling
+        assert min(delays) < ceiling * 0.05
+        assert max(delays) > ceiling * 0.95
+
+
+@pytest.mark.asyncio
+async def test_batches_reclaimed_while_waiting_for_a_slot_are_not_sent(redis, endpoint, monkeypatch):
+    monkeypatch.setattr(dispatcher.settings, "WEBHOOK_MAX_CONCURRENCY", 1)
+    await queue_events(redis, 5)
+    other_lease = time.time() + 999
+
+    async def lease_runs_out(request):
+        # While the first batch is sending, the other endpoint's lease runs out
+        # and another worker claims its deliveries
+        if len(endpoint.batches) == 1:
+            members = [
+                member for member in await redis.zrange(DELIVERIES_KEY, 0, -1)
+                if WEBHOOKS[json.loads(member)["webhook_id"]][0] != str(request.url)
+            ]
+            await redis.zadd(DELIVERIES_KEY, {member: other_lease for member in members})
+
+    endpoint.on_request = lease_runs_out
+    await dispatcher.dispatch_due(redis)
+
+    assert len(endpoint.batches) == 1
+    queued = await redis.zrange(DELIVERIES_KEY, 0, -1, withscores=True)
+    assert len(queued) == 5
+    assert all(due == other_lease for _, due in queued)
+
+
+@pytest.mark.asyncio
+async def test_subscription_reload_reaches_other_workers(redis, endpoint):
+    await dispatcher.start_webhook_dispatcher(redis)
+    try:
+        # Let the listener subscribe (which reloads once), then load fresh
+        await asyncio.sleep(0.1)
+        dispatcher._subscriptions_loaded_at = time.monotonic()
+
+        # As published by another worker's admin change
+        await redis.publish(RELOAD_CHANNEL, "")
+        for _ in range(50):
+            if dispatcher._subscriptions_loaded_at == 0:
+                break
+            await asyncio.sleep(0.02)
+        assert dispatcher._subscriptions_loaded_at == 0
+    finally:
+        await dispatcher.stop_webhook_dispatcher()
@@ -0,0 +1,69 @@
+"""
+Compare the server-side request rate of cron-driven curl pings with the agent.
+
+Simulates N devices for a few minutes of virtual time, using the agent's own
+scheduling (HeartbeatAgent.next_ping_delay), and reports requests per second
+as the API would see them, plus new connections per minute.
+
+    python loadtest.py --devices 5000 --minutes 10
+"""
+import argparse
+import random
+import secrets
+from collections import Counter
+import httpx
+from status_agent import HeartbeatAgent
+
+
+def cron_arrivals(devices: int, minutes: int, interval: float):
+    # cron fires on the minute everywhere; clocks differ by up to ~1s and
+    # process start plus the TLS handshake add a few hundred ms
+    for _ in range(devices):
+        skew = random.gauss(0, 0.5)
+        for minute in range(minutes):
+            yield minute * interval + skew + random.uniform(0.05, 0.4)
+
+
+def agent_arrivals(devices: int, minutes: int, interval: float):
+    # Scheduling only, nothing is sent
+    client = httpx.Client()
+    for _ in range(devices):
+        agent = HeartbeatAgent("http://loadtest", secrets.token_urlsafe(32), interval=interval, client=client)
+        # Clock skew doesn't matter: the phase is spread over the whole interval
+        now = random.uniform(0, interval)
+        end = minutes * interval
+        while True:
+            now += agent.next_ping_delay(now)
+            if now >= end:
+                break
+            yield now
+
+
+def report(name: str, arrivals, minutes: int, connections_per_minute: int):
+    per_second = Counter(int(t) for t in arrivals if 0 <= t < minutes * 60)
+    rates = [per_second.get(second, 0) for second in range(60, minutes * 60)]  # skip warm-up minute
+    rates.sort()
+    mean = sum(rates) / len(rates)
+    print(
+        f"{name:<6} mean {mean:7.1f} req/s   p50 {rates[len(rates) // 2]:6d}   "
+        f"p99 {rates[int(len(rates) * 0.99)]:6d}   peak {rates[-1]:6d}   "
+        f"peak/mean {rates[-1] / mean:5.1f}x   new connections/min {connections_per_minute}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=5000)
+    parser.add_argument("--minutes", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    print(f"{args.devices} devices, 60 s interval, {args.minutes} minutes")
+    # curl opens a fresh connection per ping; the agent keeps one open per device
+    report("cron", list(cron_arrivals(args.devices, args.minutes, 60)), args.minutes, args.devices)
+    report("agent", list(agent_arrivals(args.devices, args.minutes, 60)), args.minutes, 0)
+
+
+if __name__ == "__main__":
+    main()
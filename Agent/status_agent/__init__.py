@@ -0,0 +1,5 @@
+"""Heartbeat agent for the Status Indicator API"""
+from status_agent.agent import AuthenticationError, HeartbeatAgent, phase_offset
+from status_agent.buffer import OfflineBuffer
+
+__all__ = ["AuthenticationError", "HeartbeatAgent", "OfflineBuffer", "phase_offset"]
@@ -0,0 +1,34 @@
+import argparse
+import logging
+import os
+import signal
+from status_agent.agent import HeartbeatAgent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send heartbeats to a Status Indicator API")
+    parser.add_argument("--url", default=os.environ.get("STATUS_API_URL"), help="API base URL (STATUS_API_URL)")
+    parser.add_argument("--key", default=os.environ.get("STATUS_API_KEY"), help="Device API key (STATUS_API_KEY)")
+    parser.add_argument("--interval", type=float, default=60, help="Seconds between pings (default 60)")
+    parser.add_argument(
+        "--buffer",
+        default=os.environ.get("STATUS_AGENT_BUFFER", "status_agent_buffer.jsonl"),
+        help="File for pings buffered while the API is unreachable",
+    )
+    args = parser.parse_args()
+    if not args.url or not args.key:
+        parser.error("--url and --key (or STATUS_API_URL and STATUS_API_KEY) are required")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    agent = HeartbeatAgent(args.url, args.key, interval=args.interval, buffer_path=args.buffer)
+    signal.signal(signal.SIGTERM, lambda *_: agent.stop())
+    try:
+        agent.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        agent.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import hashlib
+import logging
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+from uuid import uuid4
+import httpx
+from status_agent.buffer import OfflineBuffer
+
+logger = logging.getLogger("status_agent")
+
+# Largest batch the API accepts on /ping/batch (PING_BATCH_MAX_SIZE)
+BATCH_SIZE = 1000
+
+# First retry delay after a failure; doubles per consecutive failure up to max_backoff
+BACKOFF_BASE_SECONDS = 5
+
+
+class AuthenticationError(Exception):
+    """The API rejected the key; retrying won't help"""
+
+
+def phase_offset(api_key: str, interval: float) -> float:
+    """
+    Deterministic offset within the interval, derived from the device key.
+    Devices spread evenly over the interval instead of all pinging on the
+    minute, and each device keeps the same slot across restarts.
+    """
+    digest = hashlib.sha256(api_key.encode()).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64 * interval
+
+
+class HeartbeatAgent:
+    """
+    Sends heartbeats to the Status Indicator API.
+
+    - One persistent HTTP/1.1 keep-alive connection, so there is a TLS
+      handshake per connection rather than per ping.
+    - Pings at a fixed per-device phase of the interval, plus a little random jitter.
+    - Backs off on 429/503 (honouring Retry-After) and on network errors,
+      with capped exponential backoff and full jitter.
+    - Pings that can't be delivered are buffered (on disk if buffer_path
+      is set) and sent to /ping/batch once the API is reachable again.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        interval: float = 60,
+        jitter: float = 0.05,
+        buffer_path: Optional[str] = None,
+        max_buffered: int = 10000,
+        timeout: float = 10,
+        max_backoff: float = 300,
+        client: Optional[httpx.Client] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.interval = interval
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.phase = phase_offset(api_key, interval)
+        self.buffer = OfflineBuffer(buffer_path, max_buffered)
+        self.client = client or httpx.Client(
+            base_url=self.base_url,
+            headers={"X-API-Key": api_key},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=1, max_keepalive_connections=1, keepalive_expiry=interval * 2),
+        )
+        self._failures = 0
+        self._stop = threading.Event()
+
+    def next_ping_delay(self, now: Optional[float] = None) -> float:
+        """Seconds until this device's next slot, with random jitter of +/- jitter * interval"""
+        now = time.time() if now is None else now
+        spread = self.jitter * self.interval
+        # First slot after now + spread, so a ping sent early by the jitter doesn't target its own slot again
+        slot = (now + spread - self.phase) // self.interval * self.interval + self.phase + self.interval
+        return max(0.0, slot - now + random.uniform(-spread, spread))
+
+    def _backoff_delay(self, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                # Spread retries so devices shed together don't come back together
+                return min(float(retry_after) * random.uniform(1, 1.5), self.max_backoff)
+            except ValueError:
+                pass
+        # Full jitter: uniform in [0, min(cap, base * 2^(failures - 1))]
+        return random.uniform(0, min(self.max_backoff, BACKOFF_BASE_SECONDS * 2 ** (self._failures - 1)))
+
+    def ping(self) -> Optional[float]:
+        """
+        Send one heartbeat, buffering it if it can't be delivered.
+        Returns None on success, else how long to back off before the next attempt.
+        """
+        ping_id, ping_timestamp = uuid4(), datetime.utcnow()
+        try:
+            response = self.client.post("/api/v1/ping")
+        except httpx.HTTPError as e:
+            logger.warning("Ping failed: %r", e)
+            return self._failed(ping_id, ping_timestamp, None)
+
+        if response.status_code == 401:
+            raise AuthenticationError(response.text)
+        if response.status_code >= 400:
+            logger.warning("Ping rejected: HTTP %s", response.status_code)
+            return self._failed(ping_id, ping_timestamp, response.headers.get("Retry-After"))
+
+        self._failures = 0
+        if len(self.buffer):
+            self.flush()
+        return None
+
+    def _failed(self, ping_id, ping_timestamp, retry_after: Optional[str]) -> float:
+        self.buffer.add(ping_id, ping_timestamp)
+        self._failures += 1
+        return self._backoff_delay(retry_after)
+
+    def flush(self) -> int:
+        """Send buffered pings in batches; returns how many the API accepted"""
+        sent = 0
+        while len(self.buffer):
+            entries = self.buffer.peek(BATCH_SIZE)
+            try:
+                response = self.client.post("/api/v1/ping/batch", json={"pings": entries})
+            except httpx.HTTPError as e:
+                logger.warning("Sending buffered pings failed: %r", e)
+                break
+            if response.status_code in (400, 413, 422):
+                # Malformed or too large; resending the same batch won't help
+                logger.warning("Dropping %d buffered pings: %s", len(entries), response.text)
+                self.buffer.discard(len(entries))
+                continue
+            if response.status_code >= 300:
+                logger.warning("Sending buffered pings rejected: HTTP %s", response.status_code)
+                break
+            self.buffer.discard(len(entries))
+            sent += response.json().get("accepted", len(entries))
+        return sent
+
+    def run(self):
+        """Ping until stop() is called"""
+        delay = self.next_ping_delay()
+        while not self._stop.wait(delay):
+            backoff = self.ping()
+            # Back to this device's slot once healthy; after a failure, wait out the backoff
+            delay = self.next_ping_delay() if backoff is None else backoff
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        self.stop()
+        self.client.close()
@@ -0,0 +1,67 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
+
+class OfflineBuffer:
+    """
+    Pings that could not be delivered, kept in an append-only JSON lines file
+    so they survive agent restarts. Bounded: beyond max_entries the oldest
+    pings are dropped (the server only accepts recent ones anyway).
+    """
+
+    def __init__(self, path: Optional[str], max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: List[dict] = self._load()
+
+    def _load(self) -> List[dict]:
+        if not self.path or not os.path.exists(self.path):
+            return []
+        entries = []
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Torn last line from a crash mid-write
+                    continue
+        return entries[-self.max_entries:]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, ping_id: UUID, ping_timestamp: datetime):
+        entry = {"ping_id": str(ping_id), "ping_timestamp": ping_timestamp.isoformat()}
+        with self._lock:
+            self._entries.append(entry)
+            if len(self._entries) > self.max_entries:
+                del self._entries[:len(self._entries) - self.max_entries]
+                self._rewrite()
+            elif self.path:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+
+    def peek(self, count: int) -> List[dict]:
+        """Oldest count entries, without removing them"""
+        with self._lock:
+            return list(self._entries[:count])
+
+    def discard(self, count: int):
+        """Remove the oldest count entries once the server has accepted them"""
+        with self._lock:
+            del self._entries[:count]
+            self._rewrite()
+
+    def _rewrite(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            for entry in self._entries:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_path, self.path)